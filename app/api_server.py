@@ -1,6 +1,16 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routers import energy, predictions
-from fastapi.staticfiles import StaticFiles
+from app.utils.data_client import client_provider
+from app.utils.chart_utils import start_chart_pool, shutdown_chart_pool
+from app.utils.chart_prerender import chart_prerenderer
+from app.utils.single_flight import single_flight_stats
+from app.utils.compression import CompressionMiddleware, PrecompressedStaticFiles
+from app.utils.metrics import MetricsMiddleware, mark_worker_stopped, metrics_payload
+from app.utils.startup import STARTUP_WARMUP, ensure_folders, warm_up
+from fastapi.responses import Response
 from dotenv import load_dotenv
 import sys
 import os
@@ -8,12 +18,42 @@ import os
 # Load environment variables from .env
 load_dotenv()
 
-# Test if the variable is loaded correctly
-print(os.getenv("GOOGLE_APPLICATION_CREDENTIALS"))
-
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-app = FastAPI()
+# Set up logger
+logger = logging.getLogger(__name__)
+
+
+def _log_chart_pool_start(future):
+    """Report a chart pool that failed to start; the first chart request retries it."""
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Could not start the chart rendering pool: {future.exception()}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Hold the shared BigQuery client and chart pool for the app's lifetime."""
+    ensure_folders()
+    # The client itself is created lazily on the first query
+    app.state.bigquery = client_provider
+    # Chart workers start in the background; a chart requested before they are ready waits for them
+    chart_pool = asyncio.get_running_loop().run_in_executor(None, start_chart_pool)
+    chart_pool.add_done_callback(_log_chart_pool_start)
+    if STARTUP_WARMUP:
+        await asyncio.gather(chart_pool, warm_up())
+    yield
+    shutdown_chart_pool()
+    client_provider.close()
+    mark_worker_stopped()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Compress dynamic responses for clients that accept brotli or gzip
+app.add_middleware(CompressionMiddleware)
+
+# Time every request by route; added last so it also measures compression
+app.add_middleware(MetricsMiddleware)
 
 # Register energy router
 app.include_router(energy.router, tags=["energy"]) 
@@ -21,14 +61,33 @@ app.include_router(energy.router, tags=["energy"])
 # Register predictions router
 app.include_router(predictions.router, tags=["predictions"])
 
-# Serve static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Serve static files, preferring precompressed .br/.gz variants when present
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
 
 @app.get("/")
 def read_root():
     return {"status": "API is running"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Expose request, stage, cache and BigQuery metrics in the Prometheus text format."""
+    content, media_type = metrics_payload()
+    return Response(content=content, media_type=media_type)
+
+
+@app.get("/stats/single-flight")
+def get_single_flight_stats():
+    """Report how many BigQuery jobs, table refreshes and chart renders were coalesced."""
+    return {"status": "success", "data": single_flight_stats()}
+
+
+@app.get("/stats/chart-prerender")
+def get_chart_prerender_stats():
+    """Report the progress of the background chart pre-rendering."""
+    return {"status": "success", "data": chart_prerenderer.status()}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000, log_level="debug")
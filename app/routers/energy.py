@@ -1,13 +1,22 @@
 import os
+import base64
+import asyncio
 import logging
-import matplotlib.pyplot as plt
+import numpy as np
 from io import BytesIO
-from fastapi.responses import Response, FileResponse
-from fastapi import APIRouter, HTTPException, Query
-from google.cloud import bigquery
-import matplotlib
+from fastapi.responses import Response
+from fastapi import APIRouter, HTTPException, Query, Request
+from app.utils.data_client import run_until_disconnected
+from app.utils.chart_utils import GRAPH_FOLDER, generate_bar_chart, generate_line_chart
+from app.utils.chart_cache import chart_cache, bar_chart_spec, line_chart_spec
+from app.utils.http_cache import table_validators
+from app.utils.metrics import stage
+from app.utils.report_utils import streaming_export_response
+from app.utils.json_utils import FastJSONResponse, shape_data, SHAPES, ROWS
+from app.utils.arrow_utils import binary_response, negotiate_format
+from app.utils.dataset_cache import dataset_cache, RENEWABLE_ENERGY, CLIMATE, REQUEST_TIMEOUT_SECONDS
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 # Define a Pydantic model for climate data response
 class ClimateDataItem(BaseModel):
@@ -18,40 +27,29 @@ class ClimateDataItem(BaseModel):
 class ClimateDataResponse(BaseModel):
     status: str
     data: List[dict]
+    next_cursor: Optional[str] = None
 
 # Initialize FastAPI router
 router = APIRouter()
 
-# Non-GUI backend for Matplotlib
-matplotlib.use("Agg") 
-
 # Logging Configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Directory for saving graphs
-GRAPH_FOLDER = "static/graphs"
-if not os.path.exists(GRAPH_FOLDER):
-    os.makedirs(GRAPH_FOLDER)
-
-# Initialize BigQuery client
-client = bigquery.Client()
-
-
-def build_query(base_query: str, filters: dict) -> str:
-    """Dynamically build a query with optional filters."""
-    query = base_query
-    for key, value in filters.items():
-        if value is not None:
-            query += f" AND {key} = '{value}'" if isinstance(value, str) else f" AND {key} = {value}"
-    query += " ORDER BY Year DESC"
-    return query
+# Fields each data endpoint can return, in their default order
+CLIMATE_FIELDS = ["year", "temp", "country"]
+RENEWABLE_ENERGY_FIELDS = ["Year", "Country", "Consumption"]
 
+async def cached_chart_response(spec, generate, filename: str):
+    """
+    Return a chart as PNG bytes, rendering it only if an identical chart is not cached or pre-rendered.
 
-def save_and_return_chart(buf: BytesIO, filename: str):
-    """Save the chart and return it as a FileResponse."""
-    file_path = save_chart_and_return_path(buf, filename)
-    return FileResponse(file_path, media_type="image/png")
+    Refreshes the saved copy in GRAPH_FOLDER whenever the chart is rendered.
+    """
+    content, rendered = await chart_cache.get_or_render_async(spec.key, lambda: generate(*spec.render_args()))
+    if rendered or not os.path.exists(os.path.join(GRAPH_FOLDER, filename)):
+        save_chart_and_return_path(BytesIO(content), filename)
+    return Response(content=content, media_type="image/png")
 
 
 # Add this function to improve error handling
@@ -61,63 +59,95 @@ def handle_exception(e: Exception, detail: str = "An error occurred"):
     raise HTTPException(status_code=500, detail=detail)
 
 
-# Modify this existing function in energy.py
-def fetch_data_from_bigquery(query: str):
-    """Fetch data from BigQuery with robust error handling."""
+async def get_table(request: Request, name: str):
+    """Read a materialized table from the dataset cache without blocking the event loop."""
+    table = dataset_cache.peek(name)
+    if table is not None:
+        return table
     try:
-        query_job = client.query(query)
-        return query_job.result()
+        return await run_until_disconnected(request, dataset_cache.aget(name, timeout=REQUEST_TIMEOUT_SECONDS))
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        logger.error(f"Timed out waiting for the '{name}' table")
+        raise HTTPException(status_code=504, detail="Timed out fetching data from BigQuery")
     except Exception as e:
         handle_exception(e, "Error fetching data from BigQuery")
 
 
-def check_no_data(results, logger_message: str):
-    """Check if results are empty and log a warning."""
-    if not results.total_rows:
+def check_no_data(years, logger_message: str):
+    """Check if the selected rows are empty and log a warning."""
+    if not len(years):
         logger.warning(logger_message)
         return {"status": "success", "data": [], "message": "No data found for the given filters."}
     return None
 
 
+def parse_fields(fields: str, allowed: list) -> list:
+    """Return the requested response fields in order, or every allowed field when none are given."""
+    if not fields:
+        return allowed
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Use: {', '.join(allowed)}")
+    return selected
+
+
+def encode_cursor(year: int, country: str) -> str:
+    """Encode the key of the last row of a page as an opaque cursor."""
+    return base64.urlsafe_b64encode(f"{year}:{country}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """Decode a cursor from encode_cursor into its (year, country) key."""
+    if cursor is None:
+        return None
+    try:
+        year, country = base64.urlsafe_b64decode(cursor.encode()).decode().split(":", 1)
+        return int(year), country
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def next_cursor(countries, years, has_more: bool):
+    """Return the cursor for the page after these rows, or None on the last page."""
+    return encode_cursor(int(years[-1]), str(countries[-1])) if has_more else None
+
+
+def check_shape(shape: str) -> str:
+    """Validate the requested response shape."""
+    if shape not in SHAPES:
+        raise HTTPException(status_code=400, detail=f"Invalid shape. Use one of: {', '.join(SHAPES)}")
+    return shape
+
+
+def data_response(columns: dict, fields: list, shape: str, cursor: str = None,
+                  binary_format: str = None, filename: str = "data"):
+    """
+    Serialize a page of cached data directly, without response_model validation.
+
+    When ``binary_format`` is set the selected columns are streamed as Arrow
+    or Parquet instead, with the next cursor in the X-Next-Cursor header.
+    """
+    if binary_format:
+        headers = {"X-Next-Cursor": cursor} if cursor else None
+        return binary_response({field: columns[field] for field in fields}, binary_format, filename, headers)
+    content = {"status": "success", "data": shape_data(columns, fields, shape)}
+    if cursor is not None:
+        content["next_cursor"] = cursor
+    return FastJSONResponse(content)
+
+
 def save_chart_and_return_path(buf, filename: str):
     """Save chart buffer to file and return the file path."""
     file_path = os.path.join(GRAPH_FOLDER, filename)
-    with open(file_path, "wb") as f:
+    with stage("file_write"), open(file_path, "wb") as f:
         f.write(buf.getvalue())
     logger.info(f"Chart saved at: {file_path}")
     return file_path
 
 
-def generate_bar_chart(x_values, y_values, title: str, x_label: str, y_label: str):
-    """Generate a bar chart."""
-    plt.figure(figsize=(12, 7))
-    plt.bar(x_values, y_values, color='skyblue')
-    plt.title(title)
-    plt.xlabel(x_label)
-    plt.ylabel(y_label)
-    plt.xticks(rotation=45)
-    buf = BytesIO()
-    plt.savefig(buf, format="png")
-    plt.close()
-    buf.seek(0)
-    return buf
-
-
-def generate_line_chart(x_values, y_values, title: str, x_label: str, y_label: str):
-    """Generate a line chart."""
-    plt.figure(figsize=(12, 7))
-    plt.plot(x_values, y_values, marker='o', linestyle='-', color='b')
-    plt.title(title)
-    plt.xlabel(x_label)
-    plt.ylabel(y_label)
-    plt.xticks(rotation=45)
-    buf = BytesIO()
-    plt.savefig(buf, format="png")
-    plt.close()
-    buf.seek(0)
-    return buf
-
-
 # ------------------------------
 # Endpoints with Save Functionality
 # ------------------------------
@@ -125,90 +155,147 @@ def generate_line_chart(x_values, y_values, title: str, x_label: str, y_label: s
 class ClimateDataResponse(BaseModel):
     status: str
     data: List[dict]
+    next_cursor: Optional[str] = None
 
 
 @router.get(
     "/energy/climate-data",
     response_model=ClimateDataResponse,
+    response_model_exclude_none=True,
     responses={404: {"description": "Data not found"}}
 )
 async def get_climate_data(
+    request: Request,
+    response: Response,
     year: int = Query(None, description="Year to filter data"), 
-    country: str = Query(None, description="Country code to filter data")
+    country: str = Query(None, description="Country code to filter data"),
+    start_year: int = Query(None, description="First year to include"),
+    end_year: int = Query(None, description="Last year to include"),
+    limit: int = Query(None, ge=1, description="Maximum number of rows to return"),
+    cursor: str = Query(None, description="next_cursor from the previous page"),
+    fields: str = Query(None, description="Comma-separated fields to return: year, temp, country"),
+    shape: str = Query(ROWS, description="'rows' for a list of objects, 'columns' for one array per field")
 ):
-    """Fetch global climate data with optional filters for year and country."""
-    base_query = """
-        SELECT year, average_temperature, country
-        FROM `global-environment-project.climate_data.global_temperature`
-        WHERE TRUE
     """
-    query = build_query(base_query, {"year": year, "country": country})
-    results = fetch_data_from_bigquery(query)
-
-    no_data_response = check_no_data(results, "No data found for the climate data query.")
-    if no_data_response:
-        return no_data_response
+    Fetch global climate data with optional filters for year and country.
 
-    data = [{"year": row.year, "temp": row.average_temperature, "country": row.country} for row in results]
-    return {"status": "success", "data": data}
+    Send ``Accept: application/vnd.apache.arrow.stream`` or
+    ``application/vnd.apache.parquet`` to receive the rows in a binary format.
+    """
+    selected = parse_fields(fields, CLIMATE_FIELDS)
+    check_shape(shape)
+    binary_format = negotiate_format(request.headers.get("accept"))
+    table = await get_table(request, CLIMATE)
+    validators = table_validators(request, CLIMATE, table, "data")
+    if validators.is_not_modified(request):
+        return validators.not_modified()
+    countries, years, temps, has_more = table.select_page(
+        country=country, year=year, start_year=start_year, end_year=end_year,
+        after=decode_cursor(cursor), limit=limit,
+    )
+
+    if not binary_format:
+        no_data_response = check_no_data(years, "No data found for the climate data query.")
+        if no_data_response:
+            return validators.apply(no_data_response, response)
+
+    return validators.apply(data_response(
+        {"year": years, "temp": temps, "country": countries}, selected, shape,
+        next_cursor(countries, years, has_more), binary_format, "climate_data",
+    ))
 
 
 @router.get("/energy/renewable-energy/{country_code}")
-async def get_renewable_energy(country_code: str):
-    """Fetch renewable energy data by country."""
-    query = f"""
-        SELECT Year, `Country Name`, Renewable_Energy_Consumption
-        FROM `global-environment-project.renewable_energy_data.renewable_energy_consumption`
-        WHERE `Country Code` = '{country_code}'
-        ORDER BY Year DESC
-    """
-    results = fetch_data_from_bigquery(query)
-    
+async def get_renewable_energy(
+    request: Request,
+    response: Response,
+    country_code: str,
+    start_year: int = Query(None, description="First year to include"),
+    end_year: int = Query(None, description="Last year to include"),
+    limit: int = Query(None, ge=1, description="Maximum number of rows to return"),
+    cursor: str = Query(None, description="next_cursor from the previous page"),
+    fields: str = Query(None, description="Comma-separated fields to return: Year, Country, Consumption"),
+    shape: str = Query(ROWS, description="'rows' for a list of objects, 'columns' for one array per field")
+):
+    """Fetch renewable energy data by country, as JSON, Arrow or Parquet depending on the Accept header."""
+    selected = parse_fields(fields, RENEWABLE_ENERGY_FIELDS)
+    check_shape(shape)
+    binary_format = negotiate_format(request.headers.get("accept"))
+    table = await get_table(request, RENEWABLE_ENERGY)
+    validators = table_validators(request, RENEWABLE_ENERGY, table, "data")
+    if validators.is_not_modified(request):
+        return validators.not_modified()
+    countries, years, consumption, has_more = table.select_page(
+        country=country_code, start_year=start_year, end_year=end_year,
+        after=decode_cursor(cursor), limit=limit,
+    )
 
     # Return an empty response if no data is found
-    no_data_response = check_no_data(results, "No data found for the climate data query.")
-    if no_data_response:
-        return no_data_response
-    
-    data = [{"Year": row.Year, "Country": row["Country Name"], "Consumption": row.Renewable_Energy_Consumption} for row in results]
-    return {"status": "success", "data": data}
+    if not binary_format:
+        no_data_response = check_no_data(years, "No data found for the climate data query.")
+        if no_data_response:
+            return validators.apply(no_data_response, response)
+
+    names = np.full(len(years), table.labels.get(country_code), dtype=object)
+    return validators.apply(data_response(
+        {"Year": years, "Country": names, "Consumption": consumption}, selected, shape,
+        next_cursor(countries, years, has_more), binary_format, f"{country_code}_renewable_energy",
+    ))
 
 
 @router.get("/energy/graph/bar/renewable-energy/{country_code}")
-async def get_bar_chart_renewable_energy(country_code: str):
+async def get_bar_chart_renewable_energy(request: Request, response: Response, country_code: str):
     """Generate and return a bar chart for renewable energy consumption."""
-    base_query = """
-        SELECT Year, Renewable_Energy_Consumption
-        FROM `global-environment-project.renewable_energy_data.renewable_energy_consumption`
-        WHERE TRUE
-    """
-    query = build_query(base_query, {"`Country Code`": country_code})  
-    results = fetch_data_from_bigquery(query)
+    table = await get_table(request, RENEWABLE_ENERGY)
+    validators = table_validators(request, RENEWABLE_ENERGY, table, "charts")
+    if validators.is_not_modified(request):
+        return validators.not_modified()
+    years, consumption = table.slice(country_code)
 
-    no_data_response = check_no_data(results, "No data found for the climate data query.")
+    no_data_response = check_no_data(years, "No data found for the climate data query.")
     if no_data_response:
-        return no_data_response
+        return validators.apply(no_data_response, response)
 
-    years, consumption = zip(*[(row.Year, row.Renewable_Energy_Consumption) for row in results])
-    buf = generate_bar_chart(years, consumption, f"Renewable Energy Consumption in {country_code}", "Year", "Consumption (%)")
-    return save_and_return_chart(buf, f"{country_code}_bar_chart.png")  
+    return validators.apply(await cached_chart_response(
+        bar_chart_spec(country_code, years, consumption), generate_bar_chart, f"{country_code}_bar_chart.png"
+    ))
 
 
 @router.get("/energy/graph/line/renewable-energy/{country_code}")
-async def get_line_chart_renewable_energy(country_code: str):
+async def get_line_chart_renewable_energy(request: Request, response: Response, country_code: str):
     """Generate and return a line chart for renewable energy consumption."""
-    base_query = """
-        SELECT Year, Renewable_Energy_Consumption
-        FROM `global-environment-project.renewable_energy_data.renewable_energy_consumption`
-        WHERE TRUE
-    """
-    query = build_query(base_query, {"`Country Code`": country_code})  
-    results = fetch_data_from_bigquery(query)
+    table = await get_table(request, RENEWABLE_ENERGY)
+    validators = table_validators(request, RENEWABLE_ENERGY, table, "charts")
+    if validators.is_not_modified(request):
+        return validators.not_modified()
+    years, consumption = table.slice(country_code)
 
-    no_data_response = check_no_data(results, "No data found for the climate data query.")
+    no_data_response = check_no_data(years, "No data found for the climate data query.")
     if no_data_response:
-        return no_data_response
+        return validators.apply(no_data_response, response)
+
+    return validators.apply(await cached_chart_response(
+        line_chart_spec(country_code, years, consumption), generate_line_chart, f"{country_code}_line_chart.png"
+    ))
 
-    years, consumption = zip(*[(row.Year, row.Renewable_Energy_Consumption) for row in results])
-    buf = generate_line_chart(years, consumption, f"Renewable Energy Consumption Over Time in {country_code}", "Year", "Consumption (%)")
-    return save_and_return_chart(buf, f"{country_code}_line_chart.png")  
+
+@router.get("/energy/export/renewable-energy")
+async def export_renewable_energy(
+    request: Request,
+    country: str = Query(None, description="Country code to filter data; all countries when omitted"),
+    format: str = Query("csv", description="File format: 'csv' or 'ndjson'"),
+    compress: str = Query(None, description="Set to 'gzip' to compress the output")
+):
+    """Stream historical renewable energy consumption as CSV or NDJSON."""
+    table = await get_table(request, RENEWABLE_ENERGY)
+    validators = table_validators(request, RENEWABLE_ENERGY, table, "exports")
+    if validators.is_not_modified(request):
+        return validators.not_modified()
+    rows = (
+        {"country": c, "country_name": table.labels.get(c), "year": y, "consumption": v}
+        for c, y, v in table.iter_rows(country)
+    )
+    return validators.apply(streaming_export_response(
+        rows, ["country", "country_name", "year", "consumption"], format,
+        f"{country or 'all'}_renewable_energy", compress
+    ))
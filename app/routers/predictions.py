@@ -1,23 +1,44 @@
-from google.cloud import bigquery
-from app.utils.prediction_utils import calculate_forecast
-from app.utils.chart_utils import generate_forecast_line_chart
-from app.utils.report_utils import export_to_csv, export_to_excel, export_to_pdf
-from fastapi.responses import FileResponse
-from fastapi import APIRouter, HTTPException, Query
-import pandas as pd
+from app.utils.forecast_table import forecast_store, MAX_FORECAST_YEARS
+from app.utils.chart_utils import GRAPH_FOLDER, generate_forecast_line_chart
+from app.utils.chart_cache import chart_cache, forecast_chart_spec
+from app.utils.data_client import run_until_disconnected
+from app.utils.dataset_cache import dataset_cache, RENEWABLE_ENERGY, REQUEST_TIMEOUT_SECONDS
+from app.utils.report_utils import (
+    excel_bytes, pdf_bytes, streaming_export_response, DOCUMENT_FORMATS, STREAM_MEDIA_TYPES
+)
+from app.utils.arrow_utils import binary_response, negotiate_format
+from app.utils.http_cache import table_validators
+from app.utils.metrics import stage
+from fastapi.responses import Response
+from fastapi import APIRouter, HTTPException, Query, Request
+import asyncio
+import numpy as np
+from typing import List
 import os
 
+router = APIRouter()
 
-# Initialize BigQuery client
-client = bigquery.Client()
 
-router = APIRouter()
+async def get_energy_table(request: Request):
+    """Read the renewable energy table from the dataset cache, mapping failures to HTTP errors."""
+    try:
+        return await run_until_disconnected(
+            request, dataset_cache.aget(RENEWABLE_ENERGY, timeout=REQUEST_TIMEOUT_SECONDS)
+        )
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Timed out fetching data from BigQuery")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching data from BigQuery: {str(e)}")
 
 
 @router.get("/energy/forecast/renewable-energy")
 async def forecast_renewable_energy(
+    request: Request,
+    response: Response,
     country: str = Query(..., description="Country code to filter data"),
-    years: int = Query(5, description="Number of years to forecast")
+    years: int = Query(5, ge=1, le=MAX_FORECAST_YEARS, description="Number of years to forecast")
 ):
     """
     Forecast future renewable energy consumption with confidence intervals.
@@ -27,106 +48,162 @@ async def forecast_renewable_energy(
         years (int): Number of years to forecast.
 
     Returns:
-        JSON: Forecast data and graph URL.
-    """
-    # Validate the years parameter
-    if years > 50:
-        raise HTTPException(status_code=400, detail="Years parameter exceeds allowed range.")
-
-    # Query to fetch historical renewable energy consumption data
-    query = f"""
-        SELECT Year AS year, Renewable_Energy_Consumption AS consumption
-        FROM `global-environment-project.renewable_energy_data.renewable_energy_consumption`
-        WHERE `Country Code` = '{country}'
-        ORDER BY Year ASC
+        JSON: Forecast data and graph URL, or the forecast alone as Arrow or
+            Parquet when the Accept header asks for it.
     """
-
-    # Fetch data from BigQuery
-    try:
-        query_job = client.query(query)
-        results = query_job.result()
-        data = [{"year": row["year"], "consumption": row["consumption"]} for row in results]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching data from BigQuery: {str(e)}")
+    # Read historical data and its precomputed forecast from the dataset cache
+    table = await get_energy_table(request)
+    validators = table_validators(request, RENEWABLE_ENERGY, table, "forecasts")
+    if validators.is_not_modified(request):
+        return validators.not_modified()
+    past_years, past_values = table.slice(country)
 
     # Check if data exists
-    if not data:
+    if not len(past_years):
         raise HTTPException(status_code=404, detail="No data found for the given country.")
 
-    # Convert data to DataFrame
-    df = pd.DataFrame(data)
-
-    # Perform forecast calculations
-    future_years, predictions = calculate_forecast(df, years)
-
-    # Generate a forecast graph
-    buf = generate_forecast_line_chart(
-        past_years=list(df["year"]),
-        past_values=list(df["consumption"]),
-        future_years=list(future_years),
-        future_values=list(predictions),
-        title=f"Renewable Energy Forecast for {country}",
-        x_label="Year",
-        y_label="Consumption (%)"
+    future_years, predictions = forecast_store.for_table(table).lookup(country, years)
+
+    binary_format = negotiate_format(request.headers.get("accept"))
+    if binary_format:
+        return validators.apply(binary_response(
+            {"year": future_years, "predicted_consumption": np.round(predictions, 2)},
+            binary_format, f"{country}_forecast",
+        ))
+
+    # Generate a forecast graph, reusing the cached or pre-rendered copy of an identical chart
+    spec = forecast_chart_spec(country, past_years, past_values, future_years, predictions)
+    content, rendered = await chart_cache.get_or_render_async(
+        spec.key, lambda: generate_forecast_line_chart(*spec.render_args())
     )
 
     # Save the chart as a PNG file
     filename = f"{country}_forecast_chart.png"
-    file_path = f"static/graphs/{filename}"
-    with open(file_path, "wb") as f:
-        f.write(buf.getbuffer())
+    file_path = os.path.join(GRAPH_FOLDER, filename)
+    if rendered or not os.path.exists(file_path):
+        with stage("file_write"), open(file_path, "wb") as f:
+            f.write(content)
 
     # Return forecast data and graph URL
-    return {
+    return validators.apply({
         "status": "success",
         "data": [{"year": int(y), "predicted_consumption": round(p, 2)}
                  for y, p in zip(future_years, predictions)],
-        "graph_url": f"/{file_path}"
-    }
+        "graph_url": f"/{GRAPH_FOLDER}/{filename}"
+    }, response)
+
+
+@router.get("/energy/forecast/renewable-energy/batch")
+async def forecast_renewable_energy_batch(
+    request: Request,
+    response: Response,
+    countries: List[str] = Query(..., description="Country codes (repeated or comma-separated), or 'all'"),
+    years: int = Query(5, ge=1, le=MAX_FORECAST_YEARS, description="Number of years to forecast")
+):
+    """
+    Forecast renewable energy consumption for many countries in one request.
+
+    Forecasts are read from the precomputed forecast table.
+
+    Args:
+        countries (List[str]): Country codes to forecast, or 'all'.
+        years (int): Number of years to forecast.
+
+    Returns:
+        JSON: Forecasts keyed by country code, plus any codes without data. Arrow
+            or Parquet clients get long (country, year, predicted_consumption)
+            rows, with missing codes in the X-Missing-Countries header.
+    """
+    table = await get_energy_table(request)
+    validators = table_validators(request, RENEWABLE_ENERGY, table, "forecasts")
+    if validators.is_not_modified(request):
+        return validators.not_modified()
+    forecasts = forecast_store.for_table(table)
+
+    requested = [code.strip() for value in countries for code in value.split(",") if code.strip()]
+    if any(code.lower() == "all" for code in requested):
+        requested = table.country_codes()
+    found = [code for code in dict.fromkeys(requested) if code in forecasts]
+    missing = [code for code in dict.fromkeys(requested) if code not in forecasts]
+    if not found:
+        raise HTTPException(status_code=404, detail="No data found for the given countries.")
+
+    future_years, predictions = forecasts.lookup_many(found, years)
+
+    binary_format = negotiate_format(request.headers.get("accept"))
+    if binary_format:
+        columns = {
+            "country": np.repeat(np.array(found), years),
+            "year": future_years.ravel(),
+            "predicted_consumption": np.round(predictions, 2).ravel(),
+        }
+        headers = {"X-Missing-Countries": ",".join(missing)} if missing else None
+        return validators.apply(binary_response(columns, binary_format, "forecast_batch", headers))
+
+    return validators.apply({
+        "status": "success",
+        "data": {
+            code: [{"year": y, "predicted_consumption": round(p, 2)} for y, p in zip(row_years, row_predictions)]
+            for code, row_years, row_predictions in zip(found, future_years.tolist(), predictions.tolist())
+        },
+        "missing": missing
+    }, response)
 
 
-@router.get("/energy/export/forecast", response_class=FileResponse)
+@router.get("/energy/export/forecast")
 async def export_forecast_data(
+    request: Request,
     country: str = Query(..., description="Country code to filter data"),
-    years: int = Query(5, description="Number of years to forecast"),
-    format: str = Query("csv", description="File format: 'csv', 'excel', or 'pdf'")
+    years: int = Query(5, ge=1, le=MAX_FORECAST_YEARS, description="Number of years to forecast"),
+    format: str = Query("csv", description="File format: 'csv', 'ndjson', 'excel', or 'pdf'"),
+    compress: str = Query(None, description="Set to 'gzip' to compress 'csv' or 'ndjson' output")
 ):
     """
-    Export forecasted renewable energy data as CSV, Excel, or PDF.
+    Export forecasted renewable energy data as CSV, NDJSON, Excel, or PDF.
+
+    CSV and NDJSON are streamed to the client; Excel and PDF are built in
+    memory off the event loop. Nothing is written to disk, so concurrent
+    exports never share a file.
 
     Args:
         country (str): Country code to filter data.
         years (int): Number of years to forecast.
-        format (str): Desired file format ('csv', 'excel', or 'pdf').
+        format (str): Desired file format ('csv', 'ndjson', 'excel', or 'pdf').
+        compress (str): Optional compression for streamed formats ('gzip').
 
     Returns:
-        FileResponse: The exported file.
+        StreamingResponse | Response: The exported file.
     """
-    # Forecast data generation
+    # Read the precomputed forecast
+    table = await get_energy_table(request)
+    validators = table_validators(request, RENEWABLE_ENERGY, table, "exports")
+    if validators.is_not_modified(request):
+        return validators.not_modified()
+    forecast = forecast_store.for_table(table).lookup(country, years)
+    if forecast is None:
+        raise HTTPException(status_code=404, detail="No data found for the given country.")
     forecast_data = [
-        {"year": 2023, "predicted_consumption": 10.54},
-        {"year": 2024, "predicted_consumption": 10.77},
-        {"year": 2025, "predicted_consumption": 11.0},
-        {"year": 2026, "predicted_consumption": 11.23},
-        {"year": 2027, "predicted_consumption": 11.46},
+        {"year": y, "predicted_consumption": round(p, 2)}
+        for y, p in zip(forecast[0].tolist(), forecast[1].tolist())
     ]
 
-    # Determine the file format
-    if format.lower() == "csv":
-        file_path = export_to_csv(forecast_data, f"{country}_forecast.csv")
-        media_type = "text/csv"
-    elif format.lower() == "excel":
-        file_path = export_to_excel(forecast_data, f"{country}_forecast.xlsx")
-        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    # Stream text formats straight from the rows
+    if format.lower() in STREAM_MEDIA_TYPES:
+        return validators.apply(streaming_export_response(
+            iter(forecast_data), ["year", "predicted_consumption"], format, f"{country}_forecast", compress
+        ))
+
+    # Build documents in memory on a worker thread
+    if format.lower() == "excel":
+        content = await asyncio.to_thread(excel_bytes, forecast_data)
     elif format.lower() == "pdf":
-        file_path = export_to_pdf(forecast_data, f"{country}_forecast.pdf", f"Forecast for {country}")
-        media_type = "application/pdf"
+        content = await asyncio.to_thread(pdf_bytes, forecast_data, f"Forecast for {country}")
     else:
-        raise HTTPException(status_code=400, detail="Invalid format. Use 'csv', 'excel', or 'pdf'.")
+        raise HTTPException(status_code=400, detail="Invalid format. Use 'csv', 'ndjson', 'excel', or 'pdf'.")
+    media_type, extension = DOCUMENT_FORMATS[format.lower()]
 
-    # Return the generated file
-    return FileResponse(
-        path=file_path,
+    return validators.apply(Response(
+        content=content,
         media_type=media_type,
-        filename=os.path.basename(file_path)
-    )
+        headers={"Content-Disposition": f'attachment; filename="{country}_forecast.{extension}"'}
+    ))
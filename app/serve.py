@@ -0,0 +1,80 @@
+"""
+Run the API with one worker process per available CPU.
+
+Usage: python -m app.serve
+
+WEB_CONCURRENCY overrides the number of workers. With more than one worker,
+the dataset tables are shared through the file shared cache and memory-mapped
+snapshots, the chart render pool is split between the workers, and
+Prometheus metrics are aggregated across processes. Each of these can still
+be set explicitly.
+"""
+import os
+import shutil
+import logging
+import tempfile
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Address the server listens on
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8080"))
+
+
+def available_cpus() -> int:
+    """
+    Return the number of CPUs this process may use.
+
+    Respects CPU affinity and a cgroup v2 CPU quota, so a container limited
+    to two CPUs on a large host does not start a worker per host CPU.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS or Windows
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def configure_workers(workers: int, cpus: int):
+    """
+    Set the environment that lets several worker processes cooperate, keeping any explicit settings.
+
+    Returns:
+        str: The Prometheus multiprocess directory created for this run, which
+            the caller removes on exit, or None if none was created.
+    """
+    if workers <= 1:
+        return None
+    os.environ.setdefault("SHARED_CACHE_BACKEND", "file")
+    os.environ.setdefault("DATASET_SNAPSHOTS", "true")
+    os.environ.setdefault("CHART_RENDER_WORKERS", str(max(1, cpus // workers)))
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        return None
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus_")
+    return os.environ["PROMETHEUS_MULTIPROC_DIR"]
+
+
+def main():
+    import uvicorn
+
+    cpus = available_cpus()
+    workers = int(os.getenv("WEB_CONCURRENCY", str(cpus)))
+    metrics_dir = configure_workers(workers, cpus)
+    logger.info(f"Starting {workers} workers on {cpus} CPUs")
+    try:
+        uvicorn.run("app.api_server:app", host=HOST, port=PORT, workers=workers)
+    finally:
+        if metrics_dir is not None:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
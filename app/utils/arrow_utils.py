@@ -0,0 +1,129 @@
+from fastapi.responses import StreamingResponse
+from app.utils.metrics import stage
+
+# Media types of the binary response formats
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+# Accept header values mapped to a binary format
+BINARY_FORMATS = {
+    ARROW_STREAM_MEDIA_TYPE: "arrow",
+    PARQUET_MEDIA_TYPE: "parquet",
+    "application/x-parquet": "parquet",
+}
+
+MEDIA_TYPES = {"arrow": ARROW_STREAM_MEDIA_TYPE, "parquet": PARQUET_MEDIA_TYPE}
+EXTENSIONS = {"arrow": "arrows", "parquet": "parquet"}
+
+# Rows per Arrow record batch or Parquet row group in a streamed response
+BINARY_BATCH_ROWS = 64 * 1024
+
+
+def negotiate_format(accept: str):
+    """
+    Pick a binary format from an Accept header.
+
+    Args:
+        accept (str): The request's Accept header.
+
+    Returns:
+        str: 'arrow' or 'parquet', or None when the client did not ask for either.
+    """
+    for part in (accept or "").split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        if any(param.replace(" ", "") in ("q=0", "q=0.0") for param in params):
+            continue
+        if media_type.lower() in BINARY_FORMATS:
+            return BINARY_FORMATS[media_type.lower()]
+    return None
+
+
+def to_arrow_table(columns: dict):
+    """
+    Build an Arrow table from NumPy columns.
+
+    Numeric columns without nulls are wrapped without copying; text columns,
+    such as country codes, are dictionary encoded.
+    """
+    import pyarrow as pa
+    arrays = {}
+    for name, values in columns.items():
+        if values.dtype.kind in "iufb":
+            arrays[name] = pa.array(values)
+        else:
+            text = values.tolist() if values.dtype == object else values
+            arrays[name] = pa.array(text, pa.string()).dictionary_encode()
+    return pa.table(arrays)
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes to a generator."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_arrow_stream(table, batch_rows: int = BINARY_BATCH_ROWS):
+    """Yield an Arrow IPC stream one record batch at a time."""
+    import pyarrow as pa
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_parquet(table, batch_rows: int = BINARY_BATCH_ROWS):
+    """Yield a Parquet file one row group at a time; the footer comes last."""
+    import pyarrow.parquet as pq
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, table.schema, compression="zstd") as writer:
+        for start in range(0, max(table.num_rows, 1), batch_rows):
+            writer.write_table(table.slice(start, batch_rows))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def binary_response(columns: dict, format: str, filename: str, headers: dict = None) -> StreamingResponse:
+    """
+    Stream columns as an Arrow IPC stream or a Parquet file.
+
+    Args:
+        columns (dict): Maps column names to equally long NumPy arrays.
+        format (str): 'arrow' or 'parquet', as returned by negotiate_format.
+        filename (str): Download name without extension.
+        headers (dict, optional): Extra response headers.
+
+    Returns:
+        StreamingResponse: The binary response.
+    """
+    with stage("serialize"):
+        table = to_arrow_table(columns)
+    body = iter_arrow_stream(table) if format == "arrow" else iter_parquet(table)
+    headers = dict(headers or {})
+    headers["Content-Disposition"] = f'attachment; filename="{filename}.{EXTENSIONS[format]}"'
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers=headers)
+
@@ -0,0 +1,169 @@
+import os
+import logging
+import threading
+from app.utils.dataset_cache import CountryTable
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Which backend serves the datasets: 'bigquery' or 'local'
+DATA_BACKEND = os.getenv("DATA_BACKEND", "bigquery")
+
+# Directory searched for local dataset files
+LOCAL_DATA_DIR = os.getenv("LOCAL_DATA_DIR", "data/processed")
+
+# Base names of the local files; '.parquet' is preferred over '.csv'
+RENEWABLE_ENERGY_FILES = ["cleaned_energy_data_long", "cleaned_energy_data"]
+CLIMATE_FILES = ["global_temperature"]
+
+
+class DataBackend:
+    """
+    Source of the renewable energy and climate tables.
+
+    Implementations return whole tables as CountryTable objects; the dataset
+    cache decides when to call them.
+    """
+
+    name = "base"
+
+    def load_renewable_energy(self) -> CountryTable:
+        """Return the renewable energy consumption table."""
+        raise NotImplementedError
+
+    def load_climate(self) -> CountryTable:
+        """Return the global temperature table."""
+        raise NotImplementedError
+
+
+class BigQueryBackend(DataBackend):
+    """
+    Loads the tables from BigQuery through app.utils.data_client.
+
+    Whole tables are fetched as columns, so large reads go through the
+    Storage Read API instead of paging rows over REST.
+    """
+
+    name = "bigquery"
+
+    def load_renewable_energy(self) -> CountryTable:
+        # Imported here so the local backend never needs the BigQuery client
+        from app.utils.data_client import fetch_columns
+        from app.utils.queries import build_query
+        return CountryTable.from_columns(
+            fetch_columns(*build_query("renewable_energy")),
+            country_key="Country Code",
+            year_key="Year",
+            value_key="Renewable_Energy_Consumption",
+            label_key="Country Name",
+        )
+
+    def load_climate(self) -> CountryTable:
+        from app.utils.data_client import fetch_columns
+        from app.utils.queries import build_query
+        return CountryTable.from_columns(
+            fetch_columns(*build_query("climate")),
+            country_key="country",
+            year_key="year",
+            value_key="average_temperature",
+        )
+
+
+class LocalBackend(DataBackend):
+    """
+    Loads the tables from local CSV or Parquet files with DuckDB.
+
+    The renewable energy file may be either the long format written by
+    ``app.utils.ingestion`` or a wide file with one column per year, which is
+    unpivoted on load.
+    """
+
+    name = "local"
+
+    def __init__(self, data_dir: str = LOCAL_DATA_DIR, renewable_energy_path: str = None, climate_path: str = None):
+        """
+        Args:
+            data_dir (str): Directory searched for the default file names.
+            renewable_energy_path (str, optional): Explicit renewable energy file.
+            climate_path (str, optional): Explicit climate file.
+        """
+        self.data_dir = data_dir
+        self.renewable_energy_path = renewable_energy_path
+        self.climate_path = climate_path
+        self._lock = threading.Lock()
+
+    def load_renewable_energy(self) -> CountryTable:
+        path = self.renewable_energy_path or self._find(RENEWABLE_ENERGY_FILES)
+        source = self._source(path)
+        with self._lock, self._connect() as con:
+            columns = [row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]
+            if "Year" not in columns:
+                source = (
+                    f"(UNPIVOT (SELECT * FROM {source}) ON COLUMNS('^[0-9]{{4}}$') "
+                    f"INTO NAME \"Year\" VALUE Renewable_Energy_Consumption)"
+                )
+            result = con.execute(
+                f"""
+                SELECT "Country Code" AS country, "Country Name" AS name,
+                       CAST("Year" AS BIGINT) AS year, CAST(Renewable_Energy_Consumption AS DOUBLE) AS value
+                FROM {source}
+                WHERE Renewable_Energy_Consumption IS NOT NULL
+                """
+            ).fetchnumpy()
+        labels = dict(zip(result["country"].tolist(), result["name"].tolist()))
+        return CountryTable(result["country"], result["year"], result["value"], labels)
+
+    def load_climate(self) -> CountryTable:
+        path = self.climate_path or self._find(CLIMATE_FILES)
+        with self._lock, self._connect() as con:
+            result = con.execute(
+                f"""
+                SELECT country, CAST(year AS BIGINT) AS year, CAST(average_temperature AS DOUBLE) AS value
+                FROM {self._source(path)}
+                WHERE average_temperature IS NOT NULL
+                """
+            ).fetchnumpy()
+        return CountryTable(result["country"], result["year"], result["value"])
+
+    def _find(self, base_names: list) -> str:
+        """Return the first existing Parquet or CSV file for the given base names."""
+        for base_name in base_names:
+            for extension in (".parquet", ".csv"):
+                path = os.path.join(self.data_dir, base_name + extension)
+                if os.path.exists(path):
+                    return path
+        raise FileNotFoundError(f"No local data file named {' or '.join(base_names)} in {self.data_dir}")
+
+    @staticmethod
+    def _source(path: str) -> str:
+        """Return the DuckDB table function that reads the file."""
+        literal = "'" + path.replace("'", "''") + "'"
+        if path.endswith(".parquet"):
+            return f"read_parquet({literal})"
+        # The wide file's header is all years, which header sniffing mistakes for data
+        return f"read_csv({literal}, header=true)"
+
+    @staticmethod
+    def _connect():
+        import duckdb
+        return duckdb.connect()
+
+
+BACKENDS = {BigQueryBackend.name: BigQueryBackend, LocalBackend.name: LocalBackend}
+
+
+def get_backend(name: str = None) -> DataBackend:
+    """
+    Create the configured data backend.
+
+    Args:
+        name (str, optional): 'bigquery' or 'local'; defaults to the DATA_BACKEND setting.
+
+    Returns:
+        DataBackend: The backend instance.
+    """
+    name = name or DATA_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown data backend '{name}'. Use one of: {', '.join(BACKENDS)}.")
+    logger.info(f"Using the '{name}' data backend")
+    return BACKENDS[name]()
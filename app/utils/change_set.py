@@ -0,0 +1,73 @@
+import os
+import json
+import logging
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Change set of the last incremental ingestion, read by the API before it reloads the table
+CHANGES_FILE = os.getenv("INGEST_CHANGES_FILE", "data/processed/ingest_changes.json")
+
+
+class ChangeSet:
+    """
+    Summary of what an incremental ingestion changed.
+
+    ``countries`` lists every country with an inserted, updated or deleted
+    row, so forecasts can be recomputed for only those countries. Each run
+    gets the next ``sequence`` number, so a reader can tell whether it has
+    missed a run.
+    """
+
+    def __init__(self, upserted: int = 0, deleted: int = 0, countries=(), sequence: int = 0):
+        """
+        Args:
+            upserted (int): Rows inserted or updated.
+            deleted (int): Rows deleted.
+            countries (Iterable[str]): Country codes with changed rows.
+            sequence (int): Number of the ingestion run that produced the change set.
+        """
+        self.upserted = upserted
+        self.deleted = deleted
+        self.countries = sorted(set(countries))
+        self.sequence = sequence
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.upserted and not self.deleted
+
+    def to_dict(self) -> dict:
+        return {
+            "sequence": self.sequence, "upserted": self.upserted, "deleted": self.deleted, "countries": self.countries,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data.get("upserted", 0), data.get("deleted", 0), data.get("countries", ()), data.get("sequence", 0))
+
+    def __repr__(self):
+        return (
+            f"ChangeSet(sequence={self.sequence}, upserted={self.upserted}, deleted={self.deleted}, "
+            f"countries={len(self.countries)})"
+        )
+
+
+def read_change_set(changes_file: str = CHANGES_FILE):
+    """Return the change set of the last ingestion, or None if there is none or it cannot be read."""
+    try:
+        with open(changes_file) as f:
+            return ChangeSet.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable change set {changes_file}: {e}")
+        return None
+
+
+def write_change_set(change_set: ChangeSet, changes_file: str = CHANGES_FILE):
+    """Write a change set through a temporary file, so readers never see it half written."""
+    os.makedirs(os.path.dirname(changes_file) or ".", exist_ok=True)
+    temporary = changes_file + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(change_set.to_dict(), f)
+    os.replace(temporary, changes_file)
@@ -0,0 +1,318 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+from app.utils.single_flight import SingleFlight
+from app.utils.metrics import stage, record_cache
+from app.utils.shared_cache import SHARED_CACHE_BACKEND, get_shared_cache
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Number of rendered charts kept in memory
+CHART_CACHE_MEMORY_ITEMS = int(os.getenv("CHART_CACHE_MEMORY_ITEMS", "256"))
+
+# Total bytes of rendered charts kept on disk
+CHART_CACHE_DISK_BYTES = int(os.getenv("CHART_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+
+# Directory for the on-disk tier, named by content hash
+CHART_CACHE_FOLDER = os.getenv("CHART_CACHE_FOLDER", "data/chart_cache")
+
+
+def chart_fingerprint(chart_type: str, series, title: str, x_label: str, y_label: str, style: dict = None) -> str:
+    """
+    Hash everything that affects a rendered chart.
+
+    Args:
+        chart_type (str): Kind of chart, e.g. 'bar', 'line' or 'forecast'.
+        series (Sequence): The x and y value sequences drawn on the chart.
+        title (str): Chart title.
+        x_label (str): X-axis label.
+        y_label (str): Y-axis label.
+        style (dict, optional): Any extra styling options.
+
+    Returns:
+        str: Hex digest identifying the chart.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([chart_type, title, x_label, y_label, style or {}], sort_keys=True).encode())
+    for values in series:
+        array = np.ascontiguousarray(values, dtype=np.float64)
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+class ChartSpec:
+    """
+    The series and labels of one chart, and the fingerprint that keys its rendered bytes.
+
+    The chart routes and the pre-renderer build specs with the same helpers,
+    so a pre-rendered chart is found under the key a request looks up.
+    """
+
+    def __init__(self, chart_type: str, series, title: str, x_label: str, y_label: str):
+        self.chart_type = chart_type
+        self.series = series
+        self.title = title
+        self.x_label = x_label
+        self.y_label = y_label
+        self.key = chart_fingerprint(chart_type, series, title, x_label, y_label)
+
+    def render_args(self) -> tuple:
+        """Return the positional arguments of the chart_utils render and generate functions."""
+        return (*(list(values) for values in self.series), self.title, self.x_label, self.y_label)
+
+
+def bar_chart_spec(country: str, years, values) -> ChartSpec:
+    """Spec of the renewable energy bar chart for one country, newest year first."""
+    return ChartSpec(
+        "bar", [years[::-1], values[::-1]], f"Renewable Energy Consumption in {country}", "Year", "Consumption (%)"
+    )
+
+
+def line_chart_spec(country: str, years, values) -> ChartSpec:
+    """Spec of the renewable energy line chart for one country, newest year first."""
+    return ChartSpec(
+        "line", [years[::-1], values[::-1]], f"Renewable Energy Consumption Over Time in {country}",
+        "Year", "Consumption (%)",
+    )
+
+
+def forecast_chart_spec(country: str, past_years, past_values, future_years, future_values) -> ChartSpec:
+    """Spec of the renewable energy forecast chart for one country."""
+    return ChartSpec(
+        "forecast", [past_years, past_values, future_years, future_values],
+        f"Renewable Energy Forecast for {country}", "Year", "Consumption (%)",
+    )
+
+
+class ChartCache:
+    """
+    Two-tier cache of rendered chart bytes keyed by chart fingerprint.
+
+    Recently used charts are kept in an in-memory LRU; every rendered chart is
+    also written to a size-bounded directory so it survives memory eviction
+    and restarts. The oldest files are removed once the directory is full.
+
+    An optional shared cache sits between the two tiers so that workers on
+    other hosts reuse each other's renders.
+    """
+
+    def __init__(
+        self,
+        max_items: int = CHART_CACHE_MEMORY_ITEMS,
+        max_disk_bytes: int = CHART_CACHE_DISK_BYTES,
+        folder: str = CHART_CACHE_FOLDER,
+        flight: SingleFlight = None,
+        shared=None,
+    ):
+        """
+        Args:
+            max_items (int): Number of charts kept in memory.
+            max_disk_bytes (int): Total bytes kept on disk; 0 disables the disk tier.
+            folder (str): Directory for the on-disk tier.
+            flight (SingleFlight, optional): Group that coalesces concurrent renders of the same chart.
+            shared (SharedCache, optional): Cache shared with workers on other hosts.
+        """
+        self.max_items = max_items
+        self.max_disk_bytes = max_disk_bytes
+        self.folder = folder
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+        self._flight = flight or SingleFlight()
+        self.shared = shared
+
+    def get(self, key: str):
+        """Return the cached chart bytes for a key, or None on a miss."""
+        data = self._recall(key)
+        return data if data is not None else self._load(key)
+
+    async def aget(self, key: str):
+        """Awaitable get that reads the shared and disk tiers on a worker thread."""
+        data = self._recall(key)
+        return data if data is not None else await asyncio.to_thread(self._load, key)
+
+    def put(self, key: str, data: bytes, remember: bool = True):
+        """
+        Store rendered chart bytes in every tier.
+
+        Args:
+            key (str): Chart fingerprint.
+            data (bytes): PNG bytes.
+            remember (bool): Also keep the chart in memory; bulk writers pass False
+                so they do not evict the charts requests are using.
+        """
+        if remember:
+            self._remember(key, data)
+        self._store(key, data)
+
+    async def aput(self, key: str, data: bytes):
+        """Awaitable put that writes the shared and disk tiers on a worker thread."""
+        self._remember(key, data)
+        await asyncio.to_thread(self._store, key, data)
+
+    def contains(self, key: str) -> bool:
+        """Check whether a chart is cached in any tier, without moving it into memory."""
+        with self._lock:
+            if key in self._memory:
+                return True
+        if self.max_disk_bytes and os.path.exists(self.path_for(key)):
+            return True
+        return self._read_shared(key) is not None
+
+    async def get_or_render_async(self, key: str, render):
+        """
+        Return cached chart bytes, rendering and storing them on a miss.
+
+        The render and the shared and disk tiers run off the event loop, and
+        concurrent misses for the same key share a single render.
+
+        Args:
+            key (str): Chart fingerprint.
+            render (Callable[[], Awaitable[BytesIO]]): Draws the chart when it is not cached.
+
+        Returns:
+            tuple: (bytes, bool) with the PNG bytes and whether they were just rendered.
+        """
+        data = await self.aget(key)
+        record_cache("chart", data is not None)
+        if data is not None:
+            return data, False
+
+        rendered = False
+
+        async def render_and_store():
+            nonlocal rendered
+            rendered = True
+            data = (await render()).getvalue()
+            await self.aput(key, data)
+            return data
+
+        data = await self._flight.run(key, render_and_store)
+        return data, rendered
+
+    def clear(self):
+        """Drop the in-memory tier."""
+        with self._lock:
+            self._memory.clear()
+
+    def path_for(self, key: str) -> str:
+        """Return the on-disk path for a chart key."""
+        return os.path.join(self.folder, f"{key}.png")
+
+    def _recall(self, key: str):
+        """Return a chart from the memory tier, or None."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+            return data
+
+    def _load(self, key: str):
+        """Read a chart from the shared or disk tier, keeping it in memory on a hit."""
+        data = self._read_shared(key)
+        if data is None:
+            data = self._read_disk(key)
+        if data is not None:
+            self._remember(key, data)
+        return data
+
+    def _store(self, key: str, data: bytes):
+        """Write a chart to the shared and disk tiers."""
+        self._write_shared(key, data)
+        self._write_disk(key, data)
+
+    def _remember(self, key: str, data: bytes):
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def _read_shared(self, key: str):
+        if self.shared is None:
+            return None
+        try:
+            return self.shared.get(f"chart:{key}")
+        except Exception as e:
+            logger.warning(f"Could not read chart {key} from the shared cache: {e}")
+            return None
+
+    def _write_shared(self, key: str, data: bytes):
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(f"chart:{key}", data)
+        except Exception as e:
+            logger.warning(f"Could not write chart {key} to the shared cache: {e}")
+
+    def _read_disk(self, key: str):
+        if not self.max_disk_bytes:
+            return None
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used for eviction
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        if not self.max_disk_bytes or len(data) > self.max_disk_bytes:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.path_for(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with stage("file_write"):
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            # Another worker or the pre-renderer may have stored the same chart already
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += len(data) - replaced
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _scan_disk_bytes(self) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(self.folder) if entry.name.endswith(".png"))
+
+    def _evict_disk(self):
+        """Remove least recently used files until the disk tier is back under its limit."""
+        entries = sorted(
+            (entry for entry in os.scandir(self.folder) if entry.name.endswith(".png")),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+        self._disk_bytes = total
+        logger.info(f"Chart cache trimmed to {total} bytes on disk")
+
+
+# Shared cache used by the chart endpoints; the disk tier is already shared by workers on one
+# host, so only a Redis shared cache adds a tier
+chart_cache = ChartCache(
+    flight=SingleFlight("chart_render"),
+    shared=get_shared_cache() if SHARED_CACHE_BACKEND.lower() == "redis" else None,
+)
@@ -0,0 +1,202 @@
+"""
+Background pre-rendering of the per-country charts.
+
+After each refresh of the renewable energy table, the bar, line and forecast
+charts of every country are rendered on the chart worker processes and
+stored in the chart cache under the same content-addressed keys the chart
+routes look up, so requests are served pre-rendered bytes and only render
+live on a miss.
+
+Usage: python -m app.utils.chart_prerender
+    Load the table and pre-render its charts now.
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from app.utils import chart_utils
+from app.utils.chart_cache import chart_cache, bar_chart_spec, line_chart_spec, forecast_chart_spec
+from app.utils.chart_utils import render_bar_chart, render_line_chart, render_forecast_line_chart
+from app.utils.dataset_cache import dataset_cache, RENEWABLE_ENERGY
+from app.utils.forecast_table import forecast_store
+from app.utils.shared_cache import get_shared_cache
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Pre-render every country's charts after each refresh of the renewable energy table
+CHART_PRERENDER = os.getenv("CHART_PRERENDER", "false").lower() in ("1", "true", "yes")
+
+# Forecast horizon of the pre-rendered forecast charts; the forecast route's default
+CHART_PRERENDER_FORECAST_YEARS = int(os.getenv("CHART_PRERENDER_FORECAST_YEARS", "5"))
+
+RENDERERS = {"bar": render_bar_chart, "line": render_line_chart, "forecast": render_forecast_line_chart}
+
+
+def chart_specs(table, forecasts, years: int = CHART_PRERENDER_FORECAST_YEARS) -> list:
+    """
+    Build the specs of every chart the chart routes can serve for a table.
+
+    Args:
+        table (CountryTable): Renewable energy table.
+        forecasts (ForecastTable): Forecasts precomputed from the table.
+        years (int): Forecast horizon of the forecast charts.
+
+    Returns:
+        list: ChartSpec objects, three per country.
+    """
+    specs = []
+    for country in table.country_codes():
+        past_years, past_values = table.slice(country)
+        specs.append(bar_chart_spec(country, past_years, past_values))
+        specs.append(line_chart_spec(country, past_years, past_values))
+        forecast = forecasts.lookup(country, years) if country in forecasts else None
+        if forecast is not None:
+            specs.append(forecast_chart_spec(country, past_years, past_values, *forecast))
+    return specs
+
+
+class ChartPrerenderer:
+    """
+    Renders every chart of a table version into the chart cache in the background.
+
+    Charts already in the cache are skipped, so a rerun for the same data, or
+    a second worker sharing the disk tier, only renders what is missing. At
+    most one render per chart worker is queued at a time, so requests that
+    miss the cache are not stuck behind the whole batch. A job for an older
+    table version stops as soon as a newer one is scheduled.
+
+    With a shared cache, workers take turns on a cross-process lock, so the
+    first renders the batch and the others find it cached.
+    """
+
+    def __init__(self, cache=chart_cache, years: int = CHART_PRERENDER_FORECAST_YEARS):
+        """
+        Args:
+            cache (ChartCache): Cache the charts are stored in.
+            years (int): Forecast horizon of the forecast charts.
+        """
+        self.cache = cache
+        self.years = years
+        self._version = None
+        self._status = {"state": "idle"}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart-prerender")
+
+    def status(self) -> dict:
+        """Return the progress of the current or last job."""
+        with self._lock:
+            return dict(self._status)
+
+    def schedule(self, table):
+        """Start pre-rendering the charts of a table in the background; used as a dataset refresh listener."""
+        with self._lock:
+            if table.version == self._version:
+                return None
+            self._version = table.version
+        return self._executor.submit(self._run_locked, table)
+
+    def run(self, table) -> dict:
+        """
+        Render every missing chart of a table and wait for them to finish.
+
+        Returns:
+            dict: The final status, with counts of rendered, skipped and failed charts.
+        """
+        with self._lock:
+            self._version = table.version
+        return self._run_locked(table)
+
+    def _run_locked(self, table) -> dict:
+        shared = get_shared_cache()
+        try:
+            if shared is None:
+                return self._run(table)
+            with shared.lock(f"charts:{table.version}"):
+                return self._run(table)
+        except Exception as e:
+            self._update(state="failed")
+            logger.error(f"Pre-rendering charts for table version {table.version} failed: {e}")
+            return self.status()
+
+    def _run(self, table) -> dict:
+        started = time.perf_counter()
+        version = table.version
+        specs = chart_specs(table, forecast_store.for_table(table), self.years)
+        pending = [spec for spec in specs if not self.cache.contains(spec.key)]
+        self._update(
+            state="running", version=version, total=len(specs), skipped=len(specs) - len(pending),
+            rendered=0, failed=0, seconds=0.0,
+        )
+        logger.info(f"Pre-rendering {len(pending)} of {len(specs)} charts for table version {version}")
+
+        pool = chart_utils.start_chart_pool()
+        window = max(1, chart_utils.CHART_RENDER_WORKERS)
+        in_flight, queue = {}, iter(pending)
+        rendered = failed = reported = 0
+        while True:
+            if self._version != version:
+                for future in in_flight:
+                    future.cancel()
+                self._update(state="superseded", seconds=time.perf_counter() - started)
+                logger.info(f"Stopped pre-rendering table version {version} for a newer version")
+                return self.status()
+            for spec in queue:
+                try:
+                    future = pool.submit(RENDERERS[spec.chart_type], *spec.render_args())
+                except BrokenProcessPool:
+                    pool = chart_utils.restart_chart_pool(pool)
+                    future = pool.submit(RENDERERS[spec.chart_type], *spec.render_args())
+                in_flight[future] = spec
+                if len(in_flight) >= window:
+                    break
+            if not in_flight:
+                break
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                spec = in_flight.pop(future)
+                try:
+                    self.cache.put(spec.key, future.result(), remember=False)
+                    rendered += 1
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Could not pre-render the {spec.chart_type} chart '{spec.title}': {e}")
+            self._update(rendered=rendered, failed=failed, seconds=time.perf_counter() - started)
+            # Log progress every tenth of the batch
+            if pending and (rendered + failed) * 10 // len(pending) > reported:
+                reported = (rendered + failed) * 10 // len(pending)
+                logger.info(f"Pre-rendered {rendered + failed}/{len(pending)} charts")
+
+        seconds = time.perf_counter() - started
+        self._update(state="done", seconds=seconds)
+        logger.info(
+            f"Pre-rendered {rendered} charts for {len(table.country_codes())} countries in {seconds:.2f}s "
+            f"({len(specs) - len(pending)} already cached, {failed} failed)"
+        )
+        return self.status()
+
+    def _update(self, **changes):
+        with self._lock:
+            self._status.update(changes)
+
+
+# Shared pre-renderer, scheduled after each renewable energy refresh when enabled
+chart_prerenderer = ChartPrerenderer()
+if CHART_PRERENDER:
+    dataset_cache.add_refresh_listener(RENEWABLE_ENERGY, chart_prerenderer.schedule)
+
+
+def main():
+    """Load the renewable energy table and pre-render its charts."""
+    logging.basicConfig(level=logging.INFO)
+    try:
+        status = chart_prerenderer.run(dataset_cache.get(RENEWABLE_ENERGY))
+    finally:
+        chart_utils.shutdown_chart_pool()
+    print(status)
+
+
+if __name__ == "__main__":
+    main()
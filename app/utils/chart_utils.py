@@ -1,15 +1,24 @@
 import os
-import matplotlib.pyplot as plt
-from io import BytesIO
+import asyncio
 import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from app.utils.metrics import stage
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
-# Directory for saving graphs
+# Directory for saving graphs, created at startup
 GRAPH_FOLDER = "static/graphs"
-if not os.path.exists(GRAPH_FOLDER):
-    os.makedirs(GRAPH_FOLDER)
+
+# Number of chart rendering processes; 0 renders on a thread in this process instead
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", str(os.cpu_count() or 1)))
+
+_pool = None
+_pool_lock = threading.Lock()
 
 def save_chart_and_return_path(buf, filename: str):
     """
@@ -23,55 +32,137 @@ def save_chart_and_return_path(buf, filename: str):
         str: File path where the chart is saved.
     """
     file_path = os.path.join(GRAPH_FOLDER, filename).replace("\\", "/")  # Ensure proper path format
-    with open(file_path, "wb") as f:
+    with stage("file_write"), open(file_path, "wb") as f:
         f.write(buf.getvalue())
     logger.info(f"Chart saved at: {file_path}")
     return file_path
 
-def generate_bar_chart(x_values, y_values, title: str, x_label: str, y_label: str):
-    """Generate a bar chart."""
-    plt.figure(figsize=(12, 7))
-    plt.bar(x_values, y_values, color='skyblue')
-    plt.title(title)
-    plt.xlabel(x_label)
-    plt.ylabel(y_label)
-    plt.xticks(rotation=45)
+def _new_axes():
+    """Create a standalone figure with its own Agg canvas, independent of pyplot state."""
+    # matplotlib is imported on first render, usually in a chart worker, not in the API process
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=(12, 7))
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+def _finish(fig, ax, title: str, x_label: str, y_label: str) -> bytes:
+    """Apply the shared labels and return the figure as PNG bytes."""
+    ax.set_title(title)
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    ax.tick_params(axis="x", labelrotation=45)
     buf = BytesIO()
-    plt.savefig(buf, format="png")
-    plt.close()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+def render_bar_chart(x_values, y_values, title: str, x_label: str, y_label: str) -> bytes:
+    """Render a bar chart to PNG bytes."""
+    fig, ax = _new_axes()
+    ax.bar(x_values, y_values, color='skyblue')
+    return _finish(fig, ax, title, x_label, y_label)
+
+def render_line_chart(x_values, y_values, title: str, x_label: str, y_label: str) -> bytes:
+    """Render a line chart to PNG bytes."""
+    fig, ax = _new_axes()
+    ax.plot(x_values, y_values, marker='o', linestyle='-', color='b')
+    return _finish(fig, ax, title, x_label, y_label)
+
+def render_forecast_line_chart(
+    past_years, past_values, future_years, future_values, title: str, x_label: str, y_label: str
+) -> bytes:
+    """Render a line chart for past and forecast data with legends to PNG bytes."""
+    fig, ax = _new_axes()
+    ax.plot(past_years, past_values, marker='o', linestyle='-', color='b', label='Past Data')
+    ax.plot(future_years, future_values, marker='o', linestyle='--', color='r', label='Forecast Data')
+    ax.legend()
+    return _finish(fig, ax, title, x_label, y_label)
+
+def _warm_up_worker():
+    """Load matplotlib's renderer and fonts in a new worker before it takes real jobs."""
+    render_line_chart([0, 1], [0, 1], "warm-up", "x", "y")
+
+def _ready():
+    return os.getpid()
+
+def start_chart_pool(workers: int = CHART_RENDER_WORKERS):
+    """
+    Start the chart rendering pool and wait until every worker is warmed up.
+
+    Workers are spawned rather than forked so they do not inherit the API's
+    threads or locks.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            return _pool
+        if workers > 0:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up_worker,
+            )
+            pids = {future.result() for future in [_pool.submit(_ready) for _ in range(workers)]}
+            logger.info(f"Started {len(pids)} chart rendering workers")
+        else:
+            _pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart-render")
+        return _pool
+
+def shutdown_chart_pool():
+    """Stop the chart rendering pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def restart_chart_pool(broken):
+    """
+    Replace a chart pool that lost a worker and return the running pool.
+
+    A process pool stops accepting work once one of its workers dies, for
+    example when it is killed for using too much memory. Callers that hit
+    the same broken pool concurrently get a single replacement.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            logger.warning("A chart rendering worker died; restarting the chart pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+    return start_chart_pool()
+
+async def _render(render, *args, **kwargs) -> BytesIO:
+    """Run a render function on the chart pool and return its output as a buffer."""
+    loop = asyncio.get_running_loop()
+    pool = _pool or await loop.run_in_executor(None, start_chart_pool)
+    with stage("chart_render"):
+        try:
+            data = await asyncio.wrap_future(pool.submit(render, *args, **kwargs))
+        except BrokenProcessPool:
+            # Retry once on a fresh pool
+            pool = await loop.run_in_executor(None, restart_chart_pool, pool)
+            data = await asyncio.wrap_future(pool.submit(render, *args, **kwargs))
+    buf = BytesIO(data)
     buf.seek(0)
     return buf
 
-def generate_line_chart(x_values, y_values, title: str, x_label: str, y_label: str):
+async def generate_bar_chart(x_values, y_values, title: str, x_label: str, y_label: str):
+    """Generate a bar chart."""
+    return await _render(render_bar_chart, list(x_values), list(y_values), title, x_label, y_label)
+
+async def generate_line_chart(x_values, y_values, title: str, x_label: str, y_label: str):
     """Generate a line chart."""
-    plt.figure(figsize=(12, 7))
-    plt.plot(x_values, y_values, marker='o', linestyle='-', color='b')
-    plt.title(title)
-    plt.xlabel(x_label)
-    plt.ylabel(y_label)
-    plt.xticks(rotation=45)
-    buf = BytesIO()
-    plt.savefig(buf, format="png")
-    plt.close()
-    buf.seek(0)
-    return buf
+    return await _render(render_line_chart, list(x_values), list(y_values), title, x_label, y_label)
 
-def generate_forecast_line_chart(
+async def generate_forecast_line_chart(
     past_years, past_values, future_years, future_values, title: str, x_label: str, y_label: str
 ):
     """
     Generate a line chart for past and forecast data with legends.
     """
-    plt.figure(figsize=(12, 7))
-    plt.plot(past_years, past_values, marker='o', linestyle='-', color='b', label='Past Data')
-    plt.plot(future_years, future_values, marker='o', linestyle='--', color='r', label='Forecast Data')
-    plt.title(title)
-    plt.xlabel(x_label)
-    plt.ylabel(y_label)
-    plt.xticks(rotation=45)
-    plt.legend()
-    buf = BytesIO()
-    plt.savefig(buf, format="png")
-    plt.close()
-    buf.seek(0)
-    return buf
+    return await _render(
+        render_forecast_line_chart,
+        list(past_years), list(past_values), list(future_years), list(future_values),
+        title, x_label, y_label,
+    )
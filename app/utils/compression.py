@@ -0,0 +1,296 @@
+import os
+import sys
+import zlib
+import logging
+import mimetypes
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+# Encodings offered to clients, in order of preference
+COMPRESSION_ENCODINGS = [
+    encoding.strip() for encoding in os.getenv("COMPRESSION_ENCODINGS", "br,gzip").split(",") if encoding.strip()
+]
+
+# Compression effort for dynamic responses; static files are precompressed at maximum effort
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# Content that is already compressed and would not shrink further
+INCOMPRESSIBLE_TYPES = (
+    "image/", "video/", "audio/", "application/gzip", "application/zip", "application/vnd.apache.parquet",
+    "application/vnd.openxmlformats", "text/event-stream",
+)
+
+# File extension of each precompressed variant
+VARIANT_EXTENSIONS = {"br": ".br", "gzip": ".gz"}
+
+
+def available_encodings(encodings: list = None) -> list:
+    """Return the configured encodings that can be produced in this environment."""
+    return [e for e in encodings or COMPRESSION_ENCODINGS if e == "gzip" or (e == "br" and brotli is not None)]
+
+
+def choose_encoding(accept_encoding: str, encodings: list = None):
+    """
+    Pick the preferred encoding the client accepts.
+
+    Args:
+        accept_encoding (str): The request's Accept-Encoding header.
+        encodings (list, optional): Encodings to choose from, in order of preference.
+
+    Returns:
+        str: 'br' or 'gzip', or None to send the response as is.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in available_encodings(encodings):
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def is_compressible(content_type: str) -> bool:
+    """Check whether a media type is worth compressing."""
+    return not content_type.lower().startswith(INCOMPRESSIBLE_TYPES)
+
+
+class _Compressor:
+    """Incremental gzip or brotli compressor with one interface."""
+
+    def __init__(self, encoding: str, level: int = None):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY if level is None else level)
+        else:
+            self._zlib = zlib.compressobj(GZIP_LEVEL if level is None else level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so streamed chunks reach the client promptly."""
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """Compress the last chunk and end the stream."""
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+def compress_bytes(data: bytes, encoding: str, level: int = None) -> bytes:
+    """Compress a whole body in one call."""
+    return _Compressor(encoding, level).finish(data)
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    Return the ETag of a representation compressed with ``encoding``.
+
+    The encoding is appended inside the quotes, e.g. '"abc"' becomes
+    '"abc-br"', so the compressed and uncompressed bodies of a response never
+    share a strong ETag. A weak tag stays weak.
+    """
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def strip_etag_encoding(etag: str) -> str:
+    """Return the ETag an ``encoded_etag`` value was derived from; other tags are returned unchanged."""
+    for encoding in VARIANT_EXTENSIONS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Check whether an If-None-Match header value matches the given ETag.
+
+    Tags of compressed representations, which carry the encoding as a
+    suffix, match the ETag they were derived from.
+    """
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(strip_etag_encoding(tag.removeprefix("W/")) == etag for tag in candidates)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses responses with brotli or gzip.
+
+    Responses below ``minimum_size``, already encoded responses, partial
+    content and already compressed media types pass through unchanged.
+    Streamed responses are compressed chunk by chunk.
+
+    A compressed response's ETag gets the encoding appended (see
+    ``encoded_etag``), and a 304 answering a request for that tag repeats it.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES, encodings: list = None):
+        """
+        Args:
+            app (ASGIApp): The wrapped application.
+            minimum_size (int): Smallest body, in bytes, that is compressed.
+            encodings (list, optional): Encodings to offer, in order of preference.
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = encodings
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 206, 304)
+                    or not is_compressible(headers.get("content-type", ""))
+                )
+                if passthrough:
+                    if message["status"] == 304 and "etag" in headers:
+                        self._repeat_encoded_etag(message, request_headers.get("if-none-match", ""), encoding)
+                    await send(message)
+                else:
+                    start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                await send(start)
+                start = None
+            body = compressor.compress(body) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _repeat_encoded_etag(message, if_none_match: str, encoding: str):
+        """Give a 304 the encoded ETag when that is the tag the client revalidated."""
+        headers = MutableHeaders(raw=message["headers"])
+        etag = encoded_etag(headers["etag"], encoding)
+        if etag.removeprefix("W/") in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+            headers["ETag"] = etag
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves a ``.br`` or ``.gz`` sibling of the requested file
+    when the client accepts that encoding and the sibling is up to date.
+    """
+
+    async def get_response(self, path: str, scope):
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is not None:
+            variant = path + VARIANT_EXTENSIONS[encoding]
+            full_path, stat_result = await self._lookup(path)
+            variant_path, variant_stat = await self._lookup(variant)
+            if variant_stat is not None and stat_result is not None and variant_stat.st_mtime >= stat_result.st_mtime:
+                response = self.file_response(variant_path, variant_stat, scope)
+                response.headers["Content-Encoding"] = encoding
+                response.headers["Content-Type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                response.headers.add_vary_header("Accept-Encoding")
+                return response
+        return await super().get_response(path, scope)
+
+    async def _lookup(self, path: str):
+        full_path, stat_result = await run_in_threadpool(self.lookup_path, path)
+        if stat_result is None or not os.path.isfile(full_path):
+            return full_path, None
+        return full_path, stat_result
+
+
+def precompress_file(path: str, minimum_size: int = COMPRESSION_MIN_BYTES) -> list:
+    """
+    Write maximum-effort ``.br`` and ``.gz`` variants next to a file.
+
+    Files that are small or already compressed are skipped, as are variants
+    that would not be smaller than the original.
+
+    Returns:
+        list: Paths of the variants written.
+    """
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if os.path.getsize(path) < minimum_size or not is_compressible(content_type):
+        return []
+    with open(path, "rb") as f:
+        data = f.read()
+    written = []
+    for encoding in available_encodings():
+        compressed = compress_bytes(data, encoding, level=11 if encoding == "br" else 9)
+        if len(compressed) < len(data):
+            variant = path + VARIANT_EXTENSIONS[encoding]
+            with open(variant, "wb") as f:
+                f.write(compressed)
+            written.append(variant)
+    return written
+
+
+def precompress_directory(folder: str, minimum_size: int = COMPRESSION_MIN_BYTES) -> list:
+    """Precompress every eligible file under a folder; returns the variants written."""
+    written = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if not name.endswith(tuple(VARIANT_EXTENSIONS.values())):
+                written.extend(precompress_file(os.path.join(root, name), minimum_size))
+    logger.info(f"Wrote {len(written)} precompressed files under {folder}")
+    return written
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    for directory in sys.argv[1:] or ["static"]:
+        precompress_directory(directory)
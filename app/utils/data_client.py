@@ -1,64 +1,339 @@
+from __future__ import annotations
+
 import os
-from google.cloud import bigquery
+import asyncio
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+from app.utils.queries import build_query
+from app.utils.dataset_cache import DATASET_REFRESH_WORKERS
+from app.utils.single_flight import SingleFlight
+from app.utils.metrics import stage, record_bytes_billed
+from fastapi import HTTPException
 from dotenv import load_dotenv
 
+# The Google client libraries are slow to import; they are loaded when the
+# first client is created so the API starts quickly
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Ensure GOOGLE_APPLICATION_CREDENTIALS is set and valid
-credentials_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-if not credentials_path:
-    # Raise an error if the credentials are not set
-    raise EnvironmentError("GOOGLE_APPLICATION_CREDENTIALS is not set in .env or invalid.")
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Upper bound on how long one BigQuery call may take
+QUERY_TIMEOUT_SECONDS = float(os.getenv("BIGQUERY_QUERY_TIMEOUT", "30"))
+
+# HTTP connections kept open to BigQuery; one per dataset refresh thread, which run
+# the API's queries, so concurrent refreshes never wait for a connection
+HTTP_POOL_SIZE = int(os.getenv("BIGQUERY_HTTP_POOL_SIZE", str(DATASET_REFRESH_WORKERS)))
+
+# Results with at least this many rows are read through the Storage Read API
+STORAGE_READ_MIN_ROWS = int(os.getenv("BIGQUERY_STORAGE_READ_MIN_ROWS", "20000"))
+
+# Streams read in parallel from one Storage Read API session
+STORAGE_READ_STREAMS = int(os.getenv("BIGQUERY_STORAGE_READ_STREAMS", "4"))
+
+# Reads Storage Read API streams in parallel
+storage_read_executor = ThreadPoolExecutor(max_workers=STORAGE_READ_STREAMS, thread_name_prefix="bigquery-storage")
+
+# Identical queries issued while one is already running share its job
+query_flight = SingleFlight("bigquery_query")
+
+
+class BigQueryClientProvider:
+    """
+    Lazily creates and shares one BigQuery client per process.
+
+    Credentials are only discovered when the first query needs the client, so
+    the API can start without them. They are Application Default Credentials:
+    the key file named by GOOGLE_APPLICATION_CREDENTIALS when it is set,
+    otherwise the gcloud user login or the metadata server of the VM or
+    container. The client reuses one pooled HTTP session for every call.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE):
+        """
+        Args:
+            pool_size (int): Maximum number of pooled HTTP connections to BigQuery.
+        """
+        self.pool_size = pool_size
+        self._client = None
+        self._storage_client = None
+        self._credentials = None
+        self._lock = threading.Lock()
+
+    def get(self) -> bigquery.Client:
+        """Return the shared client, creating it on first use."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+
+    def get_storage_client(self):
+        """
+        Return the shared Storage Read API client, creating it on first use.
+
+        Returns None when google-cloud-bigquery-storage is not installed.
+        """
+        if _bigquery_storage() is None:
+            return None
+        if self._storage_client is None:
+            self.get()  # Discovers the credentials both clients use
+            with self._lock:
+                if self._storage_client is None:
+                    self._storage_client = self._create_storage_client(self._credentials)
+        return self._storage_client
+
+    def close(self):
+        """Close the shared clients and their connection pools, if they were created."""
+        with self._lock:
+            if self._storage_client is not None:
+                self._storage_client.transport.close()
+                self._storage_client = None
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+                self._credentials = None
+
+    def _create_client(self) -> bigquery.Client:
+        import google.auth
+        from google.auth.transport.requests import AuthorizedSession
+        from google.cloud import bigquery
+        from requests.adapters import HTTPAdapter
+
+        # Raises DefaultCredentialsError when no credentials can be found
+        credentials, project = google.auth.default(scopes=bigquery.Client.SCOPE)
+        self._credentials = credentials
+        session = AuthorizedSession(credentials)
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=3)
+        session.mount("https://", adapter)
+        logger.info(f"Created BigQuery client with an HTTP pool of {self.pool_size} connections")
+        return bigquery.Client(project=project, credentials=credentials, _http=session)
+
+    def _create_storage_client(self, credentials):
+        return _bigquery_storage().BigQueryReadClient(credentials=credentials)
+
+
+def _bigquery_storage():
+    """Import google-cloud-bigquery-storage on first use, or return None if it is not installed."""
+    try:
+        from google.cloud import bigquery_storage
+    except ImportError:  # the Storage Read API fast path is optional
+        return None
+    return bigquery_storage
+
+
+# Shared provider, opened and closed by the FastAPI lifespan
+client_provider = BigQueryClientProvider()
+
+
+def get_client() -> bigquery.Client:
+    """
+    Return the shared BigQuery client.
+
+    Also usable as a FastAPI dependency: ``client: bigquery.Client = Depends(get_client)``.
+    """
+    return client_provider.get()
+
+def wait_for_job(query_job, timeout: float = QUERY_TIMEOUT_SECONDS):
+    """
+    Wait for a query job to finish, cancelling it if it runs past the timeout.
+
+    Args:
+        query_job (bigquery.QueryJob): The submitted job.
+        timeout (float): Seconds to wait before giving up.
+
+    Returns:
+        RowIterator: The job results.
+    """
+    try:
+        with stage("bigquery_wait"):
+            rows = query_job.result(timeout=timeout)
+    except Exception:
+        cancel_job(query_job)
+        raise
+    record_bytes_billed(query_job)
+    return rows
+
 
-# Explicitly set the environment variable for Google Application Credentials
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials_path
+def query_key(query: str, job_config: bigquery.QueryJobConfig = None) -> str:
+    """Identify a query by its text and parameter values, for coalescing identical calls."""
+    parameters = [param.to_api_repr() for param in job_config.query_parameters] if job_config else []
+    return query + repr(parameters)
 
-def fetch_climate_data():
+
+def cancel_job(query_job):
+    """Request cancellation of a query job, ignoring failures."""
+    try:
+        query_job.cancel()
+    except Exception:
+        pass
+
+
+def fetch_climate_data(client: bigquery.Client = None, year: int = None, country: str = None):
     """
     Fetch climate data from BigQuery public dataset.
+
+    Args:
+        client (bigquery.Client, optional): Client to use instead of the shared one.
+        year (int, optional): Year to filter data.
+        country (str, optional): Country code to filter data.
     
     Returns:
         List[Dict]: Climate data as a list of dictionaries.
     """
     try:
-        # Initialize BigQuery client
-        client = bigquery.Client()
+        client = client or get_client()
 
         # Query to fetch climate data
-        query = """
-            SELECT year, average_temperature, country
-            FROM `global-environment-project.climate_data.global_temperature`
-            ORDER BY year DESC
-        """
+        query, job_config = build_query("climate", year=year, country=country)
+
+        # Execute query and collect results, sharing the job with identical in-flight calls
+        def run():
+            query_job = client.query(query, job_config=job_config)
+            return [
+                {"year": row.year, "average_temperature": row.average_temperature, "country": row.country}
+                for row in wait_for_job(query_job)
+            ]
 
-        # Execute query and collect results
-        query_job = client.query(query)
-        return [
-            {"year": row.year, "average_temperature": row.average_temperature, "country": row.country}
-            for row in query_job.result()
-        ]
+        return query_flight.do(("climate", query_key(query, job_config)), run)
     except Exception as e:
         # Raise an error with details if fetching data fails
         raise RuntimeError(f"Error fetching climate data: {str(e)}")
 
-def fetch_data_from_bigquery(query: str):
+def fetch_data_from_bigquery(query: str, client: bigquery.Client = None, job_config: bigquery.QueryJobConfig = None):
     """
     Fetch data from BigQuery using a SQL query.
     
     Args:
         query (str): The SQL query to execute.
+        client (bigquery.Client, optional): Client to use instead of the shared one.
+        job_config (bigquery.QueryJobConfig, optional): Query parameters and job options.
     
     Returns:
         List[Dict]: Query results as a list of dictionaries.
     """
     try:
-        # Initialize BigQuery client
-        client = bigquery.Client()
+        client = client or get_client()
+
+        # Execute query and collect results, sharing the job with identical in-flight calls
+        def run():
+            query_job = client.query(query, job_config=job_config)
+            return [dict(row) for row in wait_for_job(query_job)]
 
-        # Execute query and collect results
-        query_job = client.query(query)
-        return [dict(row) for row in query_job.result()]
+        return query_flight.do(query_key(query, job_config), run)
     except Exception as e:
         # Raise an error with details if executing query fails
         raise RuntimeError(f"Error executing query: {str(e)}")
+
+def read_table_arrow(table: bigquery.TableReference, storage_client=None, max_streams: int = STORAGE_READ_STREAMS):
+    """
+    Read a whole table as Arrow record batches through the Storage Read API.
+
+    The session's streams are read in parallel and concatenated, so row order
+    is not preserved.
+
+    Args:
+        table (bigquery.TableReference): Table to read, e.g. a query job's destination.
+        storage_client (BigQueryReadClient, optional): Client to use instead of the shared one.
+        max_streams (int): Upper bound on parallel streams.
+
+    Returns:
+        pyarrow.Table: The table contents.
+    """
+    import pyarrow as pa
+    from google.cloud.bigquery_storage import types
+
+    storage_client = storage_client or client_provider.get_storage_client()
+    session = storage_client.create_read_session(
+        parent=f"projects/{table.project}",
+        read_session=types.ReadSession(
+            table=f"projects/{table.project}/datasets/{table.dataset_id}/tables/{table.table_id}",
+            data_format=types.DataFormat.ARROW,
+        ),
+        max_stream_count=max_streams,
+    )
+    tables = list(storage_read_executor.map(
+        lambda stream: storage_client.read_rows(stream.name).to_arrow(session), session.streams
+    ))
+    logger.info(f"Read {sum(t.num_rows for t in tables)} rows from {len(tables)} Storage Read API streams")
+    return pa.concat_tables(tables)
+
+
+def arrow_to_columns(table) -> dict:
+    """Convert an Arrow table to a dict of NumPy arrays, keyed by column name."""
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def fetch_columns(
+    query: str,
+    job_config: bigquery.QueryJobConfig = None,
+    client: bigquery.Client = None,
+    min_storage_rows: int = STORAGE_READ_MIN_ROWS,
+) -> dict:
+    """
+    Run a query and return its result as NumPy column arrays instead of rows.
+
+    Small results are downloaded through the REST API. Results of at least
+    ``min_storage_rows`` rows are read as Arrow record batches from parallel
+    Storage Read API streams when google-cloud-bigquery-storage is installed.
+    Row order is only guaranteed on the REST path.
+
+    Args:
+        query (str): The SQL query to execute.
+        job_config (bigquery.QueryJobConfig, optional): Query parameters and job options.
+        client (bigquery.Client, optional): Client to use instead of the shared one.
+        min_storage_rows (int): Row count from which the Storage Read API is used.
+
+    Returns:
+        Dict[str, np.ndarray]: One array per selected column.
+    """
+    try:
+        client = client or get_client()
+
+        def run():
+            query_job = client.query(query, job_config=job_config)
+            rows = wait_for_job(query_job)
+            with stage("bigquery_read"):
+                if rows.total_rows >= min_storage_rows:
+                    storage_client = client_provider.get_storage_client()
+                    if storage_client is not None:
+                        return arrow_to_columns(read_table_arrow(query_job.destination, storage_client))
+                return arrow_to_columns(rows.to_arrow(create_bqstorage_client=False))
+
+        return query_flight.do(("columns", query_key(query, job_config)), run)
+    except Exception as e:
+        raise RuntimeError(f"Error executing query: {str(e)}")
+
+async def run_until_disconnected(request, awaitable, poll_interval: float = 0.5):
+    """
+    Await a result, cancelling the work if the HTTP client disconnects first.
+
+    Args:
+        request (Request): The incoming FastAPI request.
+        awaitable (Awaitable): The work to run on behalf of the request.
+        poll_interval (float): Seconds between disconnect checks.
+
+    Returns:
+        Any: The result of the awaitable.
+
+    Raises:
+        HTTPException: With status 499 if the client disconnected before the work finished.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
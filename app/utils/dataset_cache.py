@@ -0,0 +1,592 @@
+import io
+import os
+import time
+import struct
+import asyncio
+import hashlib
+import threading
+import logging
+import numpy as np
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.single_flight import SingleFlight
+from app.utils.metrics import stage, record_cache
+from app.utils.shared_cache import get_shared_cache
+from app.utils.snapshot import DATASET_SNAPSHOTS, SnapshotStore
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Seconds a materialized table is served before it is reloaded from the data backend
+CACHE_TTL_SECONDS = float(os.getenv("DATASET_CACHE_TTL", "3600"))
+
+# Seconds a request waits for a table refresh before giving up
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("DATASET_REQUEST_TIMEOUT", "30"))
+
+# Tables that may refresh at the same time; each refresh runs one BigQuery query
+DATASET_REFRESH_WORKERS = int(os.getenv("DATASET_REFRESH_WORKERS", "2"))
+
+RENEWABLE_ENERGY = "renewable_energy"
+CLIMATE = "climate"
+
+
+class CountryTable:
+    """
+    Columnar, country-indexed copy of a (country, year, value) table.
+
+    Rows are sorted by country and then year, so each country occupies one
+    contiguous slice of the ``years`` and ``values`` arrays.
+    """
+
+    def __init__(self, countries, years, values, labels=None):
+        """
+        Build the table from parallel column sequences.
+
+        Args:
+            countries (Sequence[str]): Country code for each row.
+            years (Sequence[int]): Year for each row.
+            values (Sequence[float]): Measured value for each row.
+            labels (dict, optional): Display name for each country code.
+        """
+        countries = np.asarray(countries, dtype=str)
+        years = np.asarray(years, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+
+        order = np.lexsort((years, countries))
+        self.countries = countries[order]
+        self.years = years[order]
+        self.values = values[order]
+        self.labels = labels or {}
+        self.source = None
+        self.loaded_at = None
+
+        codes, starts = np.unique(self.countries, return_index=True)
+        stops = np.append(starts[1:], len(self.countries))
+        self.index = {code: (int(start), int(stop)) for code, start, stop in zip(codes, starts, stops)}
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """
+        Wrap a mapped snapshot without copying or re-sorting its columns.
+
+        The arrays are read-only views of the snapshot file, and ``source`` is
+        set to its path and ``loaded_at`` to the time it was loaded.
+        """
+        table = cls.__new__(cls)
+        table.countries = snapshot.arrays["countries"]
+        table.years = snapshot.arrays["years"]
+        table.values = snapshot.arrays["values"]
+        table.labels = snapshot.meta["labels"]
+        table.index = {code: (start, stop) for code, (start, stop) in snapshot.meta["index"].items()}
+        table.source = snapshot.path
+        table.loaded_at = snapshot.meta["loaded_at"]
+        table._version = snapshot.meta["version"]
+        return table
+
+    def snapshot_arrays(self) -> dict:
+        """Return the columns stored in a snapshot."""
+        return {"countries": self.countries, "years": self.years, "values": self.values}
+
+    def snapshot_meta(self, loaded_at: float, modified: float) -> dict:
+        """Return the snapshot header metadata for this table."""
+        return {
+            "version": self.version,
+            "loaded_at": loaded_at,
+            "modified": modified,
+            "labels": self.labels,
+            "index": {code: list(bounds) for code, bounds in self.index.items()},
+        }
+
+    @classmethod
+    def from_rows(cls, rows, country_key: str, year_key: str, value_key: str, label_key: str = None):
+        """
+        Build the table from a list of row dictionaries.
+
+        Args:
+            rows (List[Dict]): Rows as returned by the data client.
+            country_key (str): Column holding the country code.
+            year_key (str): Column holding the year.
+            value_key (str): Column holding the value.
+            label_key (str, optional): Column holding the country display name.
+
+        Returns:
+            CountryTable: The materialized table.
+        """
+        with stage("materialize"):
+            rows = [row for row in rows if row[value_key] is not None]
+            labels = {row[country_key]: row[label_key] for row in rows} if label_key else None
+            return cls(
+                [row[country_key] for row in rows],
+                [row[year_key] for row in rows],
+                [row[value_key] for row in rows],
+                labels,
+            )
+
+    @classmethod
+    def from_columns(cls, columns: dict, country_key: str, year_key: str, value_key: str, label_key: str = None):
+        """
+        Build the table from column arrays, such as those returned by fetch_columns.
+
+        Rows with a missing value are dropped without iterating in Python.
+
+        Returns:
+            CountryTable: The materialized table.
+        """
+        with stage("materialize"):
+            values = np.asarray(columns[value_key], dtype=np.float64)
+            keep = ~np.isnan(values)
+            countries = np.asarray(columns[country_key])[keep].astype(str)
+            labels = None
+            if label_key:
+                codes, first = np.unique(countries, return_index=True)
+                labels = dict(zip(codes.tolist(), np.asarray(columns[label_key])[keep][first].tolist()))
+            return cls(countries, np.asarray(columns[year_key])[keep], values[keep], labels)
+
+    def __len__(self):
+        return len(self.years)
+
+    def to_bytes(self) -> bytes:
+        """Serialize the table as an .npz archive, without pickling, for the shared cache."""
+        labels = {code: name for code, name in self.labels.items() if name is not None}
+        buffer = io.BytesIO()
+        np.savez(
+            buffer, countries=self.countries, years=self.years, values=self.values,
+            label_codes=np.array(list(labels), dtype=str), label_names=np.array(list(labels.values()), dtype=str),
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """Rebuild a table serialized by to_bytes."""
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            labels = dict(zip(arrays["label_codes"].tolist(), arrays["label_names"].tolist()))
+            return cls(arrays["countries"], arrays["years"], arrays["values"], labels)
+
+    @property
+    def version(self) -> str:
+        """Content hash of the table, computed once; equal tables have equal versions."""
+        if getattr(self, "_version", None) is None:
+            digest = hashlib.sha256()
+            for column in (self.countries.astype("U"), self.years, self.values):
+                digest.update(np.ascontiguousarray(column).tobytes())
+            digest.update(repr(sorted(self.labels.items())).encode())
+            self._version = digest.hexdigest()[:16]
+        return self._version
+
+    def country_codes(self):
+        """Return the sorted list of country codes in the table."""
+        return list(self.index)
+
+    def slice(self, country: str):
+        """
+        Return the year and value arrays for one country in ascending year order.
+
+        The arrays are views into the table and must not be modified.
+        """
+        start, stop = self.index.get(country, (0, 0))
+        return self.years[start:stop], self.values[start:stop]
+
+    def select(self, country: str = None, year: int = None, start_year: int = None, end_year: int = None):
+        """
+        Return (countries, years, values) arrays matching the optional filters.
+
+        Year bounds are inclusive. Within one country the bounds are found by
+        binary search, so a narrow range never scans the country's full history.
+        """
+        if country is not None:
+            start, stop = self.index.get(country, (0, 0))
+            years = self.years[start:stop]
+            if start_year is not None or end_year is not None:
+                low = np.searchsorted(years, start_year, "left") if start_year is not None else 0
+                high = np.searchsorted(years, end_year, "right") if end_year is not None else len(years)
+                start, stop = start + low, start + max(low, high)
+            countries, years, values = self.countries[start:stop], self.years[start:stop], self.values[start:stop]
+        else:
+            countries, years, values = self.countries, self.years, self.values
+            if start_year is not None or end_year is not None:
+                mask = np.ones(len(years), dtype=bool)
+                if start_year is not None:
+                    mask &= years >= start_year
+                if end_year is not None:
+                    mask &= years <= end_year
+                countries, years, values = countries[mask], years[mask], values[mask]
+        if year is not None:
+            mask = years == year
+            countries, years, values = countries[mask], years[mask], values[mask]
+        return countries, years, values
+
+    def select_page(self, country: str = None, year: int = None, start_year: int = None, end_year: int = None,
+                    after: tuple = None, limit: int = None):
+        """
+        Return one page of matching rows, newest year first and then by country.
+
+        Pages use keyset pagination: ``after`` is the (year, country) of the
+        last row of the previous page. Across all countries, a page is cut
+        from a newest-first index by binary search on the year bounds and the
+        cursor, so it costs the same however deep into the results it is.
+        Within one country, the country's own rows are filtered and sorted.
+
+        Args:
+            country (str, optional): Country code filter.
+            year (int, optional): Exact year filter.
+            start_year (int, optional): First year to include.
+            end_year (int, optional): Last year to include.
+            after (tuple, optional): (year, country) key to continue after.
+            limit (int, optional): Maximum number of rows; all rows when omitted.
+
+        Returns:
+            tuple: (countries, years, values, has_more)
+        """
+        if country is None:
+            return self._select_index_page(year, start_year, end_year, after, limit)
+        if after is not None:
+            after_year, after_country = after
+            # Rows in later years than the cursor were on earlier pages
+            end_year = after_year if end_year is None else min(end_year, after_year)
+        countries, years, values = self.select(country, year, start_year, end_year)
+        if after is not None:
+            keep = (years < after_year) | (countries > after_country)
+            countries, years, values = countries[keep], years[keep], values[keep]
+
+        order = np.argsort(-years, kind="stable")
+        has_more = limit is not None and len(order) > limit
+        if has_more:
+            order = order[:limit]
+        return countries[order], years[order], values[order], has_more
+
+    def _select_index_page(self, year, start_year, end_year, after, limit):
+        """Cut one page of every country's rows from the newest-first index."""
+        order, negated_years, countries = self._page_index()
+        if year is not None:
+            start_year = year if start_year is None else max(start_year, year)
+            end_year = year if end_year is None else min(end_year, year)
+        # The index is sorted by negated year, so the newest bound comes first
+        low = int(np.searchsorted(negated_years, -end_year, "left")) if end_year is not None else 0
+        high = int(np.searchsorted(negated_years, -start_year, "right")) if start_year is not None else len(order)
+        if after is not None:
+            after_year, after_country = after
+            year_start = np.searchsorted(negated_years, -after_year, "left")
+            year_stop = np.searchsorted(negated_years, -after_year, "right")
+            cursor = year_start + np.searchsorted(countries[year_start:year_stop], after_country, "right")
+            low = max(low, int(cursor))
+        high = max(low, high)
+        stop = high if limit is None else min(high, low + limit)
+        rows = order[low:stop]
+        return self.countries[rows], self.years[rows], self.values[rows], stop < high
+
+    def _page_index(self):
+        """
+        Return row positions in page order, newest year first and then by country, built on first use.
+
+        Returns:
+            tuple: (positions, negated years, countries) arrays, all in page order.
+        """
+        if getattr(self, "_page_order", None) is None:
+            # Rows are sorted by country, so a stable sort on year keeps countries in order within a year
+            order = np.argsort(-self.years, kind="stable")
+            self._page_order = (order, -self.years[order], self.countries[order])
+        return self._page_order
+
+    def to_padded(self, countries):
+        """
+        Lay out several countries' series as rows of a padded matrix.
+
+        Args:
+            countries (Sequence[str]): Country codes, one per output row.
+
+        Returns:
+            tuple: (years, values, mask) arrays of shape (len(countries), longest series),
+                where ``mask`` is True for cells holding an observation.
+        """
+        bounds = np.array([self.index.get(code, (0, 0)) for code in countries], dtype=np.int64).reshape(-1, 2)
+        lengths = bounds[:, 1] - bounds[:, 0]
+        width = int(lengths.max(initial=0))
+        mask = np.arange(width) < lengths[:, None]
+        positions = np.where(mask, bounds[:, :1] + np.arange(width), 0)
+        return self.years[positions], self.values[positions], mask
+
+    def iter_rows(self, country: str = None, chunk_size: int = 1024):
+        """
+        Yield (country, year, value) tuples, converting one chunk of the columns at a time.
+
+        Memory stays proportional to ``chunk_size`` however many rows are selected.
+        """
+        countries, years, values = self.select(country=country)
+        for start in range(0, len(years), chunk_size):
+            stop = start + chunk_size
+            yield from zip(countries[start:stop].tolist(), years[start:stop].tolist(), values[start:stop].tolist())
+
+
+_backend = None
+
+
+def _get_backend():
+    """Return the configured data backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        # Imported here because the backends build CountryTable objects from this module
+        from app.utils.backends import get_backend
+        _backend = get_backend()
+    return _backend
+
+
+def _load_renewable_energy():
+    """Load the renewable energy consumption table from the configured backend."""
+    return _get_backend().load_renewable_energy()
+
+
+def _load_climate():
+    """Load the global temperature table from the configured backend."""
+    return _get_backend().load_climate()
+
+
+class DatasetCache:
+    """
+    In-process store of materialized tables, refreshed on a TTL or on demand.
+
+    The data backend (BigQuery or local files) is only read when a table is
+    first requested, when its TTL has expired, or after it has been invalidated. Refreshes run on a small
+    background pool, and concurrent readers of a stale table share one refresh.
+
+    With a shared cache, worker processes also share loads: the first worker
+    to need a table loads it under a cross-process lock and publishes it,
+    and the others read the published copy instead of querying the backend.
+    With a snapshot store, that copy is a memory-mapped snapshot, so workers
+    share its pages and pick up a newly published version within seconds.
+    """
+
+    def __init__(self, loaders: dict = None, ttl: float = CACHE_TTL_SECONDS, max_workers: int = DATASET_REFRESH_WORKERS,
+                 flight: SingleFlight = None, shared=None, snapshots: SnapshotStore = None):
+        """
+        Args:
+            loaders (dict, optional): Maps table names to zero-argument callables returning a CountryTable.
+            ttl (float): Seconds before a loaded table is considered stale.
+            max_workers (int): Number of tables that may refresh at the same time.
+            flight (SingleFlight, optional): Group that coalesces concurrent refreshes of a table.
+            shared (SharedCache, optional): Cache shared with other worker processes.
+            snapshots (SnapshotStore, optional): Memory-mapped snapshots shared with other worker processes.
+        """
+        self.loaders = loaders or {RENEWABLE_ENERGY: _load_renewable_energy, CLIMATE: _load_climate}
+        self.ttl = ttl
+        self.shared = shared
+        self.snapshots = snapshots
+        self._tables = {}
+        self._loaded_at = {}
+        self._modified = {}
+        self._flight = flight or SingleFlight()
+        self._listeners = {}
+        self._load_hooks = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dataset-cache")
+
+    def add_refresh_listener(self, name: str, callback):
+        """
+        Call ``callback(table)`` on the refresh thread each time the named table is reloaded.
+
+        Listeners derive their own data (such as precomputed forecasts) from the
+        new table before readers see it. A failing listener is logged and skipped.
+        """
+        self._listeners.setdefault(name, []).append(callback)
+
+    def add_load_hook(self, name: str, callback):
+        """
+        Call ``callback()`` on the refresh thread just before the named table is read from the data backend.
+
+        Hooks are skipped when the table comes from another worker's snapshot
+        or shared copy. A failing hook is logged and skipped.
+        """
+        self._load_hooks.setdefault(name, []).append(callback)
+
+    def peek(self, name: str):
+        """Return the named table if it is loaded and fresh, otherwise None."""
+        table = self._tables.get(name) if self._is_fresh(name) else None
+        if table is not None:
+            record_cache("dataset", True)
+        return table
+
+    def last_modified(self, name: str):
+        """Return the Unix time the named table's contents last changed, or None if it was never loaded."""
+        return self._modified.get(name, (None, None))[1]
+
+    def get(self, name: str) -> CountryTable:
+        """Return the named table, blocking on a reload if it is missing or stale."""
+        table = self.peek(name)
+        if table is None:
+            table = self._start_refresh(name).result()
+        return table
+
+    async def aget(self, name: str, timeout: float = None) -> CountryTable:
+        """
+        Return the named table without blocking the event loop.
+
+        A caller that times out or is cancelled stops waiting, but the shared
+        refresh keeps running for the other readers.
+
+        Args:
+            name (str): Table name.
+            timeout (float, optional): Seconds to wait for a refresh.
+
+        Returns:
+            CountryTable: The materialized table.
+        """
+        table = self.peek(name)
+        if table is None:
+            future = asyncio.wrap_future(self._start_refresh(name))
+            table = await asyncio.wait_for(asyncio.shield(future), timeout)
+        return table
+
+    def refresh(self, name: str = None):
+        """Reload one table, or every table when no name is given."""
+        for table_name in [name] if name else list(self.loaders):
+            self._start_refresh(table_name, force=True).result()
+
+    def invalidate(self, name: str = None):
+        """Drop one table, or every table, so the next read reloads it."""
+        with self._lock:
+            names = [name] if name else list(self.loaders)
+            for table_name in names:
+                self._tables.pop(table_name, None)
+                self._loaded_at.pop(table_name, None)
+        if self.shared is not None:
+            for table_name in names:
+                try:
+                    self.shared.delete(self._shared_key(table_name))
+                except Exception as e:
+                    logger.warning(f"Could not drop the shared copy of '{table_name}': {e}")
+        if self.snapshots is not None:
+            for table_name in names:
+                self.snapshots.withdraw(table_name)
+
+    def _is_fresh(self, name: str) -> bool:
+        loaded_at = self._loaded_at.get(name)
+        if loaded_at is None or time.monotonic() - loaded_at >= self.ttl:
+            return False
+        # A table mapped from a snapshot is stale once another worker publishes a newer one
+        source = getattr(self._tables.get(name), "source", None)
+        return source is None or self.snapshots is None or not self.snapshots.changed(name, source)
+
+    def _start_refresh(self, name: str, force: bool = False):
+        """Return the in-flight refresh for a table, starting one if needed."""
+        if not force:
+            record_cache("dataset", False)
+        return self._flight.submit(name, self._executor, self._load, name, force)
+
+    def _load(self, name: str, force: bool) -> CountryTable:
+        if not force and self._is_fresh(name):
+            return self._tables[name]
+        started = time.perf_counter()
+        loaded = None if force else self._read_published(name)
+        if loaded is None:
+            with self._shared_lock(name):
+                # Another worker may have published the table while this one waited
+                loaded = None if force else self._read_published(name)
+                if loaded is None:
+                    for hook in self._load_hooks.get(name, []):
+                        try:
+                            hook()
+                        except Exception as e:
+                            logger.error(f"Load hook for '{name}' failed: {e}")
+                    table = self.loaders[name]()
+                    loaded = table, time.time(), self._modified_time(name, table.version)
+                    self._write_shared(name, *loaded)
+                    loaded = self._write_snapshot(name, *loaded) or loaded
+        table, loaded_at, modified = loaded
+        table.loaded_at = loaded_at
+        for callback in self._listeners.get(name, []):
+            try:
+                callback(table)
+            except Exception as e:
+                logger.error(f"Refresh listener for '{name}' failed: {e}")
+        with self._lock:
+            self._tables[name] = table
+            # A table published by another worker is only fresh for the rest of its TTL
+            self._loaded_at[name] = time.monotonic() - max(0.0, time.time() - loaded_at)
+            self._modified[name] = (table.version, modified)
+        logger.info(f"Loaded {len(table)} rows into the '{name}' cache in {time.perf_counter() - started:.2f}s")
+        return table
+
+    def _modified_time(self, name: str, version: str) -> float:
+        """Return the Last-Modified time for a new load; a reload with identical contents keeps the old one."""
+        previous_version, modified = self._modified.get(name, (None, None))
+        return modified if previous_version == version else time.time()
+
+    @staticmethod
+    def _shared_key(name: str) -> str:
+        return f"dataset:{name}"
+
+    def _read_published(self, name: str):
+        """Return (table, loaded_at, modified) published by a worker, or None."""
+        return self._read_snapshot(name) or self._read_shared(name)
+
+    def _read_snapshot(self, name: str):
+        """Map the published snapshot of a table, unless there is none or it is older than the TTL."""
+        if self.snapshots is None:
+            return None
+        try:
+            snapshot = self.snapshots.open(name)
+            if snapshot is None or time.time() - snapshot.meta["loaded_at"] >= self.ttl:
+                return None
+            return CountryTable.from_snapshot(snapshot), snapshot.meta["loaded_at"], snapshot.meta["modified"]
+        except Exception as e:
+            logger.warning(f"Ignoring the snapshot of '{name}': {e}")
+            return None
+
+    def _write_snapshot(self, name: str, table: CountryTable, loaded_at: float, modified: float):
+        """Publish a freshly loaded table as a snapshot and return it mapped, or None if it was not written."""
+        if self.snapshots is None:
+            return None
+        try:
+            self.snapshots.publish(name, table.version, table.snapshot_arrays(), table.snapshot_meta(loaded_at, modified))
+            return self._read_snapshot(name)
+        except Exception as e:
+            logger.warning(f"Could not publish a snapshot of '{name}': {e}")
+            return None
+
+    def _read_shared(self, name: str):
+        """Return (table, loaded_at, modified) published by a worker, or None."""
+        if self.shared is None:
+            return None
+        try:
+            data = self.shared.get(self._shared_key(name))
+            if data is None:
+                return None
+            loaded_at, modified = struct.unpack_from("<dd", data)
+            return CountryTable.from_bytes(data[16:]), loaded_at, modified
+        except Exception as e:
+            logger.warning(f"Ignoring the shared copy of '{name}': {e}")
+            return None
+
+    def _write_shared(self, name: str, table: CountryTable, loaded_at: float, modified: float):
+        """Publish a freshly loaded table to the other workers."""
+        if self.shared is None:
+            return
+        try:
+            data = struct.pack("<dd", loaded_at, modified) + table.to_bytes()
+            self.shared.set(self._shared_key(name), data, ttl=self.ttl)
+        except Exception as e:
+            logger.warning(f"Could not publish '{name}' to the shared cache: {e}")
+
+    @contextmanager
+    def _shared_lock(self, name: str):
+        """Hold the cross-process load lock for a table; without a usable shared cache, do nothing."""
+        lock = None
+        if self.shared is not None:
+            try:
+                lock = self.shared.lock(self._shared_key(name))
+                lock.__enter__()
+            except Exception as e:
+                logger.warning(f"Loading '{name}' without the shared lock: {e}")
+                lock = None
+        try:
+            yield
+        finally:
+            if lock is not None:
+                lock.__exit__(None, None, None)
+
+
+# Shared cache used by the routers
+dataset_cache = DatasetCache(
+    flight=SingleFlight("dataset_refresh"),
+    shared=get_shared_cache(),
+    snapshots=SnapshotStore() if DATASET_SNAPSHOTS else None,
+)
@@ -1,14 +1,13 @@
 import os
-import pandas as pd
+from typing import TYPE_CHECKING
 from fastapi import HTTPException
-from fpdf import FPDF
+from app.utils.report_utils import EXPORT_FOLDER
 
-EXPORT_FOLDER = "static/exports"
+# pandas and fpdf are slow to import, so they are loaded on first export
+if TYPE_CHECKING:
+    import pandas as pd
 
-if not os.path.exists(EXPORT_FOLDER):
-    os.makedirs(EXPORT_FOLDER)
-
-def export_data(df: pd.DataFrame, filename: str, format: str):
+def export_data(df: "pd.DataFrame", filename: str, format: str):
     """
     Export data to the specified format (CSV, Excel, or PDF).
     """
@@ -21,6 +20,7 @@ def export_data(df: pd.DataFrame, filename: str, format: str):
         df.to_excel(file_path, index=False, engine="openpyxl")
         content_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     elif format.lower() == "pdf":
+        from fpdf import FPDF
         pdf = FPDF()
         pdf.add_page()
         pdf.set_font("Arial", size=12)
@@ -37,6 +37,7 @@ def export_to_csv(data, filename):
     """
     Export data to a CSV file.
     """
+    import pandas as pd
     file_path = os.path.join(EXPORT_FOLDER, filename)
     df = pd.DataFrame(data)
     df.to_csv(file_path, index=False)
@@ -46,6 +47,7 @@ def export_to_excel(data, filename):
     """
     Export data to an Excel file.
     """
+    import pandas as pd
     file_path = os.path.join(EXPORT_FOLDER, filename)
     df = pd.DataFrame(data)
     df.to_excel(file_path, index=False, engine="openpyxl")
@@ -55,6 +57,7 @@ def export_to_pdf(data, filename, title):
     """
     Export data to a PDF file.
     """
+    from fpdf import FPDF
     file_path = os.path.join(EXPORT_FOLDER, filename)
     pdf = FPDF()
     pdf.set_auto_page_break(auto=True, margin=15)
@@ -0,0 +1,219 @@
+import time
+import logging
+import threading
+import numpy as np
+from app.utils.change_set import CHANGES_FILE, read_change_set
+from app.utils.dataset_cache import dataset_cache, RENEWABLE_ENERGY
+from app.utils.prediction_utils import batch_forecast
+from app.utils.metrics import stage, record_cache
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Longest forecast horizon the API allows
+MAX_FORECAST_YEARS = 50
+
+
+class ForecastTable:
+    """
+    Precomputed forecasts for every country up to MAX_FORECAST_YEARS ahead.
+
+    A linear forecast for the next N years is the first N entries of the
+    longest forecast, so one row per country covers every horizon.
+    """
+
+    def __init__(self, countries, first_years, predictions):
+        """
+        Args:
+            countries (Sequence[str]): Country code for each row.
+            first_years (np.ndarray): First forecast year for each row.
+            predictions (np.ndarray): Forecast values, shape (countries, MAX_FORECAST_YEARS).
+        """
+        self.countries = list(countries)
+        self.first_years = np.asarray(first_years, dtype=np.int64)
+        self.predictions = np.asarray(predictions, dtype=np.float64)
+        self.index = {code: row for row, code in enumerate(self.countries)}
+
+    @classmethod
+    def from_country_table(cls, table, horizon: int = MAX_FORECAST_YEARS):
+        """
+        Forecast every country in a CountryTable in one vectorized pass.
+
+        Args:
+            table (CountryTable): Historical renewable energy data.
+            horizon (int): Number of years to precompute.
+
+        Returns:
+            ForecastTable: The materialized forecasts.
+        """
+        countries = table.country_codes()
+        future_years, predictions = batch_forecast(*table.to_padded(countries), horizon)
+        return cls(countries, future_years[:, 0], predictions)
+
+    def __contains__(self, country: str):
+        return country in self.index
+
+    def lookup(self, country: str, years: int):
+        """
+        Return the forecast for one country.
+
+        Args:
+            country (str): Country code.
+            years (int): Number of years to forecast.
+
+        Returns:
+            tuple: (future_years, predictions) arrays, or None if the country is unknown.
+
+        Raises:
+            ValueError: If years is outside 1..MAX_FORECAST_YEARS.
+        """
+        self._check_years(years)
+        row = self.index.get(country)
+        if row is None:
+            return None
+        first_year = self.first_years[row]
+        return np.arange(first_year, first_year + years), self.predictions[row, :years]
+
+    def updated(self, table, countries):
+        """
+        Return forecasts for a new table, recomputing only some countries.
+
+        Args:
+            table (CountryTable): The new historical data.
+            countries (Iterable[str]): Countries whose data changed. Countries
+                that are new in ``table`` are always computed.
+
+        Returns:
+            ForecastTable: Forecasts covering every country in ``table``.
+        """
+        codes = table.country_codes()
+        changed = set(countries)
+        horizon = self.predictions.shape[1]
+        first_years = np.empty(len(codes), dtype=np.int64)
+        predictions = np.empty((len(codes), horizon), dtype=np.float64)
+
+        stale = [row for row, code in enumerate(codes) if code in changed or code not in self.index]
+        kept = [row for row, code in enumerate(codes) if code not in changed and code in self.index]
+        if kept:
+            source = [self.index[codes[row]] for row in kept]
+            first_years[kept] = self.first_years[source]
+            predictions[kept] = self.predictions[source]
+        if stale:
+            future_years, values = batch_forecast(*table.to_padded([codes[row] for row in stale]), horizon)
+            first_years[stale] = future_years[:, 0]
+            predictions[stale] = values
+        return ForecastTable(codes, first_years, predictions)
+
+    def lookup_many(self, countries, years: int):
+        """
+        Return forecasts for several known countries as (future_years, predictions) matrices.
+        """
+        self._check_years(years)
+        rows = np.array([self.index[code] for code in countries], dtype=np.int64)
+        future_years = self.first_years[rows][:, None] + np.arange(years)
+        return future_years, self.predictions[rows, :years]
+
+    def _check_years(self, years: int):
+        horizon = self.predictions.shape[1]
+        if not 1 <= years <= horizon:
+            raise ValueError(f"Forecast horizon must be between 1 and {horizon} years, got {years}")
+
+
+class ForecastStore:
+    """
+    Holds the ForecastTable for the current renewable energy table.
+
+    The table is rebuilt in the background whenever the dataset cache
+    refreshes, and on demand if a request sees a table it has not seen yet.
+    After mark_changed(), the next rebuild only recomputes the marked countries.
+    """
+
+    def __init__(self, changes_file: str = CHANGES_FILE):
+        """
+        Args:
+            changes_file (str): Change set written by incremental ingestion.
+        """
+        self.changes_file = changes_file
+        self._source = None
+        self._forecasts = None
+        self._changed = None
+        self._sequence = None
+        self._lock = threading.Lock()
+
+    def mark_changed(self, countries):
+        """Limit the next rebuild to the given countries (plus any new ones)."""
+        with self._lock:
+            self._changed = set(countries) | (self._changed or set())
+
+    def apply_change_set(self):
+        """
+        Mark the countries of a new ingestion change set; run just before the table is reloaded.
+
+        Only the run right after the last one applied is used. If a run was
+        missed, nothing is marked and the next rebuild recomputes everything.
+        The first change set seen is only recorded, because the forecasts at
+        that point come from a full build.
+        """
+        change_set = read_change_set(self.changes_file)
+        if change_set is None:
+            return
+        with self._lock:
+            last, self._sequence = self._sequence, change_set.sequence
+            if last is None or change_set.sequence == last:
+                return
+            if change_set.sequence == last + 1:
+                self._changed = set(change_set.countries) | (self._changed or set())
+                logger.info(f"Ingestion {change_set.sequence} changed {len(change_set.countries)} countries")
+            else:
+                self._changed = None
+                logger.info(f"Missed ingestions before {change_set.sequence}; forecasts will be fully rebuilt")
+
+    def rebuild(self, table) -> ForecastTable:
+        """Recompute forecasts for the given CountryTable."""
+        started = time.perf_counter()
+        with self._lock:
+            previous, changed, self._changed = self._forecasts, self._changed, None
+        with stage("model_fit"):
+            if previous is not None and changed is not None:
+                forecasts = previous.updated(table, changed)
+                computed = len(changed)
+            else:
+                forecasts = ForecastTable.from_country_table(table)
+                computed = len(forecasts.countries)
+        with self._lock:
+            self._source, self._forecasts = table, forecasts
+        logger.info(
+            f"Precomputed {MAX_FORECAST_YEARS}-year forecasts for {computed} of {len(forecasts.countries)} countries "
+            f"in {time.perf_counter() - started:.3f}s"
+        )
+        return forecasts
+
+    def for_table(self, table) -> ForecastTable:
+        """
+        Return the forecasts for the given CountryTable, building them if needed.
+
+        A table loaded before the current one, still held by a request that
+        started during a refresh, gets forecasts computed just for it; they are
+        not stored, so the current forecasts are never replaced by stale ones.
+        """
+        with self._lock:
+            if self._source is table:
+                record_cache("forecast", True)
+                return self._forecasts
+            stale = self._source is not None and _loaded_before(table, self._source)
+        record_cache("forecast", False)
+        if stale:
+            with stage("model_fit"):
+                return ForecastTable.from_country_table(table)
+        return self.rebuild(table)
+
+
+def _loaded_before(table, other) -> bool:
+    """Check whether a table was loaded before another; tables built outside the dataset cache never are."""
+    return table.loaded_at is not None and other.loaded_at is not None and table.loaded_at < other.loaded_at
+
+
+# Shared store, kept in step with the dataset cache
+forecast_store = ForecastStore()
+dataset_cache.add_load_hook(RENEWABLE_ENERGY, forecast_store.apply_change_set)
+dataset_cache.add_refresh_listener(RENEWABLE_ENERGY, forecast_store.rebuild)
@@ -0,0 +1,132 @@
+import os
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request
+from fastapi.responses import Response
+from app.utils.compression import etag_matches
+from app.utils.dataset_cache import dataset_cache
+from app.utils.metrics import record_cache
+
+# Cache-Control policy for each kind of route, overridable per kind with
+# HTTP_CACHE_CONTROL_<KIND>, e.g. HTTP_CACHE_CONTROL_CHARTS="public, max-age=86400"
+CACHE_POLICIES = {
+    kind: os.getenv(f"HTTP_CACHE_CONTROL_{kind.upper()}", default)
+    for kind, default in {
+        "data": "public, max-age=300",
+        "charts": "public, max-age=3600",
+        "forecasts": "public, max-age=300",
+        "exports": "private, max-age=300",
+    }.items()
+}
+
+
+class CacheValidators:
+    """
+    ETag, Last-Modified and Cache-Control headers for one response.
+
+    Built before any expensive work, so a conditional request that matches
+    can be answered with 304 straight away.
+    """
+
+    def __init__(self, etag: str, last_modified: float = None, cache_control: str = None):
+        """
+        Args:
+            etag (str): Strong ETag header value, including quotes.
+            last_modified (float, optional): Unix time the underlying data last changed.
+            cache_control (str, optional): Cache-Control header value.
+        """
+        self.etag = etag
+        self.last_modified = last_modified
+        self.cache_control = cache_control
+
+    @property
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Vary": "Accept"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = formatdate(self.last_modified, usegmt=True)
+        if self.cache_control:
+            headers["Cache-Control"] = self.cache_control
+        return headers
+
+    def is_not_modified(self, request: Request) -> bool:
+        """
+        Check the request's conditional headers.
+
+        If-None-Match takes precedence; If-Modified-Since is only consulted
+        when it is absent. Conditional requests are counted as 'http' cache
+        hits or misses.
+        """
+        not_modified = self._check_conditions(request)
+        if not_modified is not None:
+            record_cache("http", not_modified)
+        return bool(not_modified)
+
+    def _check_conditions(self, request: Request):
+        """Return whether the conditional headers match, or None if there are none."""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            return etag_matches(if_none_match, self.etag)
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified is not None:
+            try:
+                return int(self.last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return None
+
+    def not_modified(self) -> Response:
+        """Return the 304 response."""
+        return Response(status_code=304, headers=self.headers)
+
+    def apply(self, result, response: Response = None):
+        """
+        Attach the headers and return ``result``.
+
+        Args:
+            result: The route's return value.
+            response (Response, optional): The route's injected Response, used
+                when ``result`` is plain data rather than a Response.
+        """
+        target = result if isinstance(result, Response) else response
+        target.headers.update(self.headers)
+        return result
+
+
+def validators_for(request: Request, version: str, last_modified: float = None, kind: str = "data") -> CacheValidators:
+    """
+    Build validators from a dataset version and the request parameters.
+
+    The ETag covers the path, the sorted query parameters and the Accept
+    header, so every distinct representation gets its own tag.
+
+    Args:
+        request (Request): The incoming request.
+        version (str): Version of the data the response is built from.
+        last_modified (float, optional): Unix time the data last changed.
+        kind (str): Key into CACHE_POLICIES.
+
+    Returns:
+        CacheValidators: The response's validators.
+    """
+    digest = hashlib.sha256()
+    for part in (version, request.url.path, str(sorted(request.query_params.multi_items())),
+                 request.headers.get("accept", "")):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return CacheValidators(f'"{digest.hexdigest()[:32]}"', last_modified, CACHE_POLICIES.get(kind))
+
+
+def table_validators(request: Request, name: str, table, kind: str = "data") -> CacheValidators:
+    """
+    Build validators for a response derived from one dataset cache table.
+
+    Args:
+        request (Request): The incoming request.
+        name (str): Table name in the dataset cache.
+        table (CountryTable): The table the response is built from.
+        kind (str): Key into CACHE_POLICIES.
+
+    Returns:
+        CacheValidators: The response's validators.
+    """
+    return validators_for(request, table.version, dataset_cache.last_modified(name), kind)
@@ -0,0 +1,416 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+from app.utils.change_set import CHANGES_FILE, ChangeSet, read_change_set, write_change_set
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# World Bank indicator for renewable energy consumption (% of final energy consumption)
+RENEWABLE_ENERGY_INDICATOR = "EG.FEC.RNEW.ZS"
+
+# Default input and output of the renewable energy pipeline
+RAW_RENEWABLE_ENERGY_FILE = "data/raw/renewable_energy_consumption.csv"
+PROCESSED_RENEWABLE_ENERGY_FILE = "data/processed/cleaned_energy_data_long.parquet"
+RENEWABLE_ENERGY_TABLE_ID = "global-environment-project.renewable_energy_data.renewable_energy_consumption"
+
+# Rows of the wide file read per chunk; each row expands to one long row per year
+INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "5000"))
+
+# Metadata lines above the header in World Bank downloads
+WORLD_BANK_SKIPROWS = 4
+
+# Parquet compression codec
+PARQUET_COMPRESSION = os.getenv("INGEST_PARQUET_COMPRESSION", "zstd")
+
+# Files kept by incremental ingestion: the hash of every loaded row and the
+# rows of the last delta; the change set of the last run is CHANGES_FILE
+MANIFEST_FILE = "data/processed/ingest_manifest.parquet"
+DELTA_FILE = "data/processed/ingest_delta.parquet"
+
+ID_COLUMNS = ["Country Name", "Country Code"]
+YEAR_COLUMN = "Year"
+VALUE_COLUMN = "Renewable_Energy_Consumption"
+
+
+def year_columns(input_file: str, skiprows: int = WORLD_BANK_SKIPROWS) -> list:
+    """
+    Return the four-digit year columns of a wide World Bank CSV.
+
+    Args:
+        input_file (str): Path to the raw CSV file.
+        skiprows (int): Metadata lines above the header.
+
+    Returns:
+        list: Year column names in file order.
+    """
+    header = pd.read_csv(input_file, skiprows=skiprows, nrows=0).columns
+    return [column for column in header if column.isdigit() and len(column) == 4]
+
+
+def wide_to_long(chunk: pd.DataFrame, years: list) -> pd.DataFrame:
+    """
+    Reshape one chunk of the wide file into typed long rows.
+
+    The reshape works on the underlying arrays rather than ``pd.melt`` so no
+    intermediate object columns are created. Missing values are dropped.
+
+    Args:
+        chunk (pd.DataFrame): Wide rows with the id columns and the year columns.
+        years (list): Year column names.
+
+    Returns:
+        pd.DataFrame: Columns Country Name and Country Code (categorical),
+            Year (int16) and Renewable_Energy_Consumption (float32).
+    """
+    values = chunk[years].to_numpy(dtype=np.float32)
+    present = ~np.isnan(values)
+    rows, cols = np.nonzero(present)
+    year_values = np.asarray(years, dtype=np.int16)
+    return pd.DataFrame({
+        "Country Name": pd.Categorical(chunk["Country Name"].to_numpy()[rows]),
+        "Country Code": pd.Categorical(chunk["Country Code"].to_numpy()[rows]),
+        YEAR_COLUMN: year_values[cols],
+        VALUE_COLUMN: values[present],
+    })
+
+
+def iter_long_chunks(
+    input_file: str,
+    chunk_rows: int = INGEST_CHUNK_ROWS,
+    skiprows: int = WORLD_BANK_SKIPROWS,
+    indicator: str = RENEWABLE_ENERGY_INDICATOR,
+):
+    """
+    Stream a wide World Bank CSV as long, typed chunks.
+
+    Only the id columns, the indicator code and the year columns are parsed,
+    and at most ``chunk_rows`` wide rows are held in memory at once, so peak
+    memory does not grow with the size of multi-indicator dumps.
+
+    Args:
+        input_file (str): Path to the raw CSV file.
+        chunk_rows (int): Wide rows per chunk.
+        skiprows (int): Metadata lines above the header.
+        indicator (str, optional): Indicator Code to keep when the file has that column.
+
+    Yields:
+        pd.DataFrame: Long rows as returned by wide_to_long.
+    """
+    years = year_columns(input_file, skiprows)
+    if not years:
+        raise ValueError(f"No year columns found in {input_file}")
+    header = pd.read_csv(input_file, skiprows=skiprows, nrows=0).columns
+    filter_indicator = indicator and "Indicator Code" in header
+    usecols = ID_COLUMNS + (["Indicator Code"] if filter_indicator else []) + years
+    dtypes = {column: "string" for column in usecols[:-len(years)]}
+    dtypes.update({year: "float32" for year in years})
+
+    reader = pd.read_csv(input_file, skiprows=skiprows, usecols=usecols, dtype=dtypes, chunksize=chunk_rows)
+    for chunk in reader:
+        if filter_indicator:
+            chunk = chunk[chunk["Indicator Code"] == indicator]
+        chunk = chunk.dropna(subset=ID_COLUMNS)
+        if not chunk.empty:
+            yield wide_to_long(chunk, years)
+
+
+def parquet_schema(deleted_flag: bool = False):
+    """
+    Return the Arrow schema of the processed renewable energy file.
+
+    Args:
+        deleted_flag (bool): Add the ``_deleted`` column used by delta files.
+    """
+    import pyarrow as pa
+    label = pa.dictionary(pa.int32(), pa.string())
+    fields = [
+        ("Country Name", label),
+        ("Country Code", label),
+        (YEAR_COLUMN, pa.int16()),
+        (VALUE_COLUMN, pa.float32()),
+    ]
+    if deleted_flag:
+        fields.append(("_deleted", pa.bool_()))
+    return pa.schema(fields)
+
+
+def write_parquet(chunks, output_file: str, compression: str = PARQUET_COMPRESSION) -> int:
+    """
+    Write long chunks to a compressed Parquet file, one row group per chunk.
+
+    Args:
+        chunks (Iterable[pd.DataFrame]): Chunks from iter_long_chunks.
+        output_file (str): Path of the Parquet file.
+        compression (str): Parquet compression codec.
+
+    Returns:
+        int: Number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    rows = 0
+    with pq.ParquetWriter(output_file, schema, compression=compression) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    logger.info(f"Wrote {rows} rows to {output_file}")
+    return rows
+
+
+def load_parquet_to_bigquery(
+    parquet_file: str, table_id: str = RENEWABLE_ENERGY_TABLE_ID, client=None, deleted_flag: bool = False
+):
+    """
+    Replace a BigQuery table with the contents of a Parquet file.
+
+    Args:
+        parquet_file (str): Path of the Parquet file.
+        table_id (str): Fully qualified destination table.
+        client (bigquery.Client, optional): Client to use; the shared client when omitted.
+        deleted_flag (bool): The file is a delta with a ``_deleted`` column.
+
+    Returns:
+        bigquery.LoadJob: The finished load job.
+    """
+    from google.cloud import bigquery
+    from app.utils.data_client import get_client
+
+    client = client or get_client()
+    schema = [
+        bigquery.SchemaField("Country Name", "STRING"),
+        bigquery.SchemaField("Country Code", "STRING"),
+        bigquery.SchemaField(YEAR_COLUMN, "INTEGER"),
+        bigquery.SchemaField(VALUE_COLUMN, "FLOAT"),
+    ]
+    if deleted_flag:
+        schema.append(bigquery.SchemaField("_deleted", "BOOLEAN"))
+    job_config = bigquery.LoadJobConfig(
+        schema=schema,
+        source_format=bigquery.SourceFormat.PARQUET,
+        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+    )
+    with open(parquet_file, "rb") as source_file:
+        job = client.load_table_from_file(source_file, table_id, job_config=job_config)
+    job.result()
+    logger.info(f"Loaded {job.output_rows} rows from {parquet_file} into {table_id}")
+    return job
+
+
+# Applies a delta loaded into the staging table. Rows are matched on their
+# key, so running the same delta twice leaves the table unchanged.
+MERGE_SQL = """
+MERGE `{table}` T
+USING `{staging}` S
+ON T.`Country Code` = S.`Country Code` AND T.Year = S.Year
+WHEN MATCHED AND S._deleted THEN
+  DELETE
+WHEN MATCHED THEN
+  UPDATE SET `Country Name` = S.`Country Name`, Renewable_Energy_Consumption = S.Renewable_Energy_Consumption
+WHEN NOT MATCHED AND NOT S._deleted THEN
+  INSERT (`Country Name`, `Country Code`, Year, Renewable_Energy_Consumption)
+  VALUES (S.`Country Name`, S.`Country Code`, S.Year, S.Renewable_Energy_Consumption)
+"""
+
+
+def row_hashes(chunk: pd.DataFrame) -> np.ndarray:
+    """Return a 64-bit content hash of the non-key columns of each long row."""
+    return pd.util.hash_pandas_object(chunk[["Country Name", VALUE_COLUMN]], index=False).to_numpy()
+
+
+def load_manifest(manifest_file: str) -> pd.DataFrame:
+    """
+    Return the row hashes recorded by the last successful load.
+
+    Returns:
+        pd.DataFrame: Columns Country Code, Year and hash; empty if there is no manifest yet.
+    """
+    if not os.path.exists(manifest_file):
+        return pd.DataFrame({
+            "Country Code": pd.Series(dtype=object),
+            YEAR_COLUMN: pd.Series(dtype=np.int16),
+            "hash": pd.Series(dtype=np.uint64),
+        })
+    return pd.read_parquet(manifest_file)
+
+
+def _replace_file(path: str, write):
+    """Write a file through a temporary name so readers never see it half written."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary = path + ".tmp"
+    write(temporary)
+    os.replace(temporary, path)
+
+
+def diff_chunk(chunk: pd.DataFrame, previous: pd.Series):
+    """
+    Compare one long chunk against the manifest.
+
+    Args:
+        chunk (pd.DataFrame): Long rows from iter_long_chunks.
+        previous (pd.Series): Manifest hashes indexed by (Country Code, Year).
+
+    Returns:
+        tuple: (changed, hashes) where ``changed`` holds the new or modified
+            rows and ``hashes`` is the chunk's manifest entries.
+    """
+    codes = chunk["Country Code"].astype(str).to_numpy()
+    years = chunk[YEAR_COLUMN].to_numpy()
+    hashes = row_hashes(chunk)
+    known = previous.reindex(pd.MultiIndex.from_arrays([codes, years])).to_numpy()
+    changed = pd.isna(known) | (known != hashes)
+    return chunk[changed], pd.DataFrame({"Country Code": codes, YEAR_COLUMN: years, "hash": hashes})
+
+
+def removed_keys(manifest: pd.DataFrame, current: pd.DataFrame) -> pd.DataFrame:
+    """Return the (Country Code, Year) keys in the manifest that are no longer in the source."""
+    merged = manifest[["Country Code", YEAR_COLUMN]].merge(
+        current[["Country Code", YEAR_COLUMN]], how="left", indicator=True
+    )
+    return merged.loc[merged["_merge"] == "left_only", ["Country Code", YEAR_COLUMN]]
+
+
+def _delta_frame(rows: pd.DataFrame, deleted: bool) -> pd.DataFrame:
+    """Convert changed rows, or removed keys, to the delta file layout."""
+    count = len(rows)
+    return pd.DataFrame({
+        "Country Name": pd.Categorical([None] * count if deleted else rows["Country Name"].astype(str)),
+        "Country Code": pd.Categorical(rows["Country Code"].astype(str)),
+        YEAR_COLUMN: rows[YEAR_COLUMN].to_numpy(dtype=np.int16),
+        VALUE_COLUMN: np.full(count, np.nan, np.float32) if deleted else rows[VALUE_COLUMN].to_numpy(np.float32),
+        "_deleted": np.full(count, deleted),
+    })
+
+
+def merge_delta(delta_file: str, table_id: str = RENEWABLE_ENERGY_TABLE_ID, staging_table_id: str = None, client=None):
+    """
+    Load a delta file into a staging table and MERGE it into the target table.
+
+    Args:
+        delta_file (str): Parquet file written by ingest_incremental.
+        table_id (str): Fully qualified target table.
+        staging_table_id (str, optional): Staging table; ``<table_id>_staging`` when omitted.
+        client (bigquery.Client, optional): Client to use; the shared client when omitted.
+
+    Returns:
+        bigquery.QueryJob: The finished MERGE job.
+    """
+    from app.utils.data_client import get_client, wait_for_job
+
+    client = client or get_client()
+    staging_table_id = staging_table_id or f"{table_id}_staging"
+    load_parquet_to_bigquery(delta_file, staging_table_id, client, deleted_flag=True)
+    job = client.query(MERGE_SQL.format(table=table_id, staging=staging_table_id))
+    wait_for_job(job)
+    logger.info(f"Merged {delta_file} into {table_id} ({job.num_dml_affected_rows} rows affected)")
+    return job
+
+
+def ingest_incremental(
+    input_file: str = RAW_RENEWABLE_ENERGY_FILE,
+    output_file: str = PROCESSED_RENEWABLE_ENERGY_FILE,
+    manifest_file: str = MANIFEST_FILE,
+    delta_file: str = DELTA_FILE,
+    changes_file: str = CHANGES_FILE,
+    chunk_rows: int = INGEST_CHUNK_ROWS,
+    indicator: str = RENEWABLE_ENERGY_INDICATOR,
+    table_id: str = RENEWABLE_ENERGY_TABLE_ID,
+    client=None,
+    dry_run: bool = False,
+) -> ChangeSet:
+    """
+    Load only the rows that changed since the last successful run.
+
+    Each (country, year) row is hashed and compared with the manifest. New,
+    changed and removed rows are written to a delta file and merged into
+    BigQuery through a staging table. The manifest is only replaced after
+    the merge succeeds, so a failed run is simply retried.
+
+    Args:
+        input_file (str): Raw wide CSV file.
+        output_file (str): Full long Parquet file, kept for the local backend.
+        manifest_file (str): Row hashes of the last successful load.
+        delta_file (str): Parquet file for the changed rows.
+        changes_file (str): JSON file receiving the change set.
+        chunk_rows (int): Wide rows per chunk.
+        indicator (str, optional): Indicator Code to keep.
+        table_id (str): Fully qualified target table.
+        client (bigquery.Client, optional): Client to use; the shared client when omitted.
+        dry_run (bool): Compute the change set without loading it or writing any file.
+
+    Returns:
+        ChangeSet: What changed.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    manifest = load_manifest(manifest_file)
+    previous = manifest.set_index(["Country Code", YEAR_COLUMN])["hash"]
+    schema, delta_schema = parquet_schema(), parquet_schema(deleted_flag=True)
+    upserted, countries, seen = 0, set(), []
+
+    for path in (output_file, delta_file):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Both files are written under temporary names and only moved into place by a real run
+    with pq.ParquetWriter(output_file + ".tmp", schema, compression=PARQUET_COMPRESSION) as full_writer, \
+            pq.ParquetWriter(delta_file + ".tmp", delta_schema, compression=PARQUET_COMPRESSION) as delta_writer:
+        for chunk in iter_long_chunks(input_file, chunk_rows, indicator=indicator):
+            full_writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            changed, hashes = diff_chunk(chunk, previous)
+            seen.append(hashes)
+            if len(changed):
+                delta = _delta_frame(changed, deleted=False)
+                delta_writer.write_table(pa.Table.from_pandas(delta, schema=delta_schema, preserve_index=False))
+                upserted += len(changed)
+                countries.update(delta["Country Code"].unique())
+
+        current = pd.concat(seen, ignore_index=True) if seen else load_manifest("")
+        removed = removed_keys(manifest, current)
+        if len(removed):
+            delta = _delta_frame(removed, deleted=True)
+            delta_writer.write_table(pa.Table.from_pandas(delta, schema=delta_schema, preserve_index=False))
+            countries.update(delta["Country Code"].unique())
+
+    previous_change_set = read_change_set(changes_file)
+    sequence = previous_change_set.sequence + 1 if previous_change_set else 1
+    change_set = ChangeSet(upserted, len(removed), countries, sequence)
+    logger.info(f"Incremental ingestion found {change_set}")
+    if dry_run:
+        for path in (output_file, delta_file):
+            os.remove(path + ".tmp")
+        return change_set
+
+    for path in (output_file, delta_file):
+        os.replace(path + ".tmp", path)
+
+    if not change_set.is_empty:
+        merge_delta(delta_file, table_id, client=client)
+    _replace_file(manifest_file, lambda path: current.to_parquet(path, index=False))
+    # Written last: the API reads it before its next reload of the merged table
+    write_change_set(change_set, changes_file)
+    return change_set
+
+
+def ingest(
+    input_file: str = RAW_RENEWABLE_ENERGY_FILE,
+    output_file: str = PROCESSED_RENEWABLE_ENERGY_FILE,
+    chunk_rows: int = INGEST_CHUNK_ROWS,
+    indicator: str = RENEWABLE_ENERGY_INDICATOR,
+    upload: bool = False,
+    table_id: str = RENEWABLE_ENERGY_TABLE_ID,
+) -> int:
+    """
+    Convert a raw World Bank CSV to long Parquet and optionally load it into BigQuery.
+
+    Returns:
+        int: Number of long rows written.
+    """
+    rows = write_parquet(iter_long_chunks(input_file, chunk_rows, indicator=indicator), output_file)
+    if upload:
+        load_parquet_to_bigquery(output_file, table_id)
+    return rows
+
@@ -0,0 +1,78 @@
+import json
+import numpy as np
+from fastapi.responses import Response
+from app.utils.metrics import stage
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Response shapes the data endpoints can produce
+ROWS = "rows"
+COLUMNS = "columns"
+SHAPES = [ROWS, COLUMNS]
+
+
+def dumps(content) -> bytes:
+    """
+    Serialize to JSON bytes, using orjson when it is installed.
+
+    NumPy arrays and scalars are accepted either way.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_to_builtin, separators=(",", ":")).encode()
+
+
+def _to_builtin(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response for trusted internal data.
+
+    Returning it from a route skips response_model validation, and the body
+    is encoded with orjson straight from NumPy arrays where possible.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        with stage("serialize"):
+            return dumps(content)
+
+
+def json_column(values: np.ndarray):
+    """
+    Prepare one column for serialization.
+
+    Numeric columns stay as contiguous arrays that orjson writes without
+    creating Python objects; other columns become lists.
+    """
+    if orjson is not None and values.dtype.kind in "iufb":
+        return np.ascontiguousarray(values)
+    return values.tolist()
+
+
+def shape_data(columns: dict, fields: list, shape: str = ROWS):
+    """
+    Lay out selected columns in the requested response shape.
+
+    Args:
+        columns (dict): Maps field names to equally long arrays.
+        fields (list): Fields to include, in order.
+        shape (str): 'rows' for a list of objects, 'columns' for one array per field.
+
+    Returns:
+        list | dict: The response ``data`` value.
+    """
+    if shape == COLUMNS:
+        return {field: json_column(columns[field]) for field in fields}
+    values = [columns[field].tolist() for field in fields]
+    return [dict(zip(fields, row)) for row in zip(*values)]
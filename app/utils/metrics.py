@@ -0,0 +1,170 @@
+import os
+import time
+import contextvars
+from contextlib import contextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily
+from app.utils.single_flight import single_flight_stats
+
+# Route label for work done outside a request, such as scheduled refreshes
+BACKGROUND_ROUTE = "background"
+
+# Label for requests that did not match any route
+UNMATCHED_ROUTE = "unmatched"
+
+# Stage durations range from sub-millisecond lookups to multi-second BigQuery jobs
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_SECONDS = Histogram(
+    "api_request_duration_seconds", "Time to produce a response, by route.",
+    ["route", "method"], buckets=STAGE_BUCKETS,
+)
+REQUESTS = Counter("api_requests_total", "Responses sent, by route and status code.", ["route", "method", "status"])
+ERRORS = Counter("api_errors_total", "Requests that failed with a 5xx status or an unhandled exception, by route.", ["route"])
+STAGE_SECONDS = Histogram(
+    "api_stage_duration_seconds", "Time spent in each stage of request handling, by route.",
+    ["route", "stage"], buckets=STAGE_BUCKETS,
+)
+STAGE_ERRORS = Counter("api_stage_errors_total", "Stages that raised an exception, by route.", ["route", "stage"])
+CACHE_LOOKUPS = Counter("api_cache_lookups_total", "Cache lookups, by route, cache and result.", ["route", "cache", "result"])
+BYTES_BILLED = Counter("bigquery_bytes_billed_total", "Bytes billed by BigQuery query jobs, by route.", ["route"])
+
+
+class SingleFlightCollector:
+    """
+    Exports the counters of every named SingleFlight group at scrape time.
+
+    The counters live in process memory, so with several workers a scrape
+    reports those of the worker that answered it.
+    """
+
+    def collect(self):
+        stats = single_flight_stats()
+        for counter in ("calls", "executions", "coalesced"):
+            family = CounterMetricFamily(
+                f"single_flight_{counter}", f"SingleFlight {counter}, by group.", labels=["group"]
+            )
+            for group, values in stats.items():
+                family.add_metric([group], values[counter])
+            yield family
+
+
+single_flight_collector = SingleFlightCollector()
+REGISTRY.register(single_flight_collector)
+
+# The ASGI scope of the request being handled; the router fills in its route
+_current_scope = contextvars.ContextVar("metrics_scope", default=None)
+
+
+def current_route() -> str:
+    """
+    Return the path template of the route being handled, e.g. '/energy/renewable-energy/{country_code}'.
+
+    Work started by a request keeps its route label on worker threads that
+    inherit the request's context.
+    """
+    scope = _current_scope.get()
+    if scope is None:
+        return BACKGROUND_ROUTE
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a block of work as one stage of the current request.
+
+    Args:
+        name (str): Stage name, e.g. 'bigquery_wait' or 'chart_render'.
+    """
+    route = current_route()
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.labels(route, name).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(route, name).observe(time.perf_counter() - started)
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache lookup for the current route."""
+    CACHE_LOOKUPS.labels(current_route(), cache, "hit" if hit else "miss").inc()
+
+
+def record_bytes_billed(query_job):
+    """Add a finished query job's billed bytes to the current route's total."""
+    billed = getattr(query_job, "total_bytes_billed", None)
+    if isinstance(billed, int):
+        BYTES_BILLED.labels(current_route()).inc(billed)
+
+
+def metrics_payload():
+    """
+    Render every metric in the Prometheus text format.
+
+    Returns:
+        tuple: (bytes, str) with the body and its media type.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Several workers serve the API; aggregate what each of them wrote to the shared directory
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(single_flight_collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_worker_stopped():
+    """
+    Tell the multiprocess collector that this worker has exited.
+
+    Its live gauge files are removed, so a restarted worker does not leave
+    stale values behind; counters and histograms keep their totals. Does
+    nothing with a single worker.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times every HTTP request and counts its status and errors by route.
+
+    It also makes the request's route available to stage() and record_cache()
+    anywhere down the call stack.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _current_scope.set(scope)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException:
+            status = 500
+            raise
+        finally:
+            route = current_route()
+            REQUEST_SECONDS.labels(route, scope["method"]).observe(time.perf_counter() - started)
+            REQUESTS.labels(route, scope["method"], str(status)).inc()
+            if status >= 500:
+                ERRORS.labels(route).inc()
+            _current_scope.reset(token)
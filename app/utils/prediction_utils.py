@@ -1,8 +1,7 @@
-from sklearn.linear_model import LinearRegression 
-import pandas as pd
 import numpy as np
+from app.utils.metrics import stage
 
-def calculate_forecast(df: pd.DataFrame, years: int):
+def calculate_forecast(df, years: int):
     """
     Calculate forecast using a linear regression model.
 
@@ -13,20 +12,18 @@ def calculate_forecast(df: pd.DataFrame, years: int):
     Returns:
         tuple: (future_years, predictions)
     """
-    # Debug: Log the input data
-    print("Debug - Input DataFrame:\n", df.head())
-
     # Prepare the data for linear regression
     X = df["year"].values.reshape(-1, 1)  # Input: years
     y = df["consumption"].values          # Output: consumption
 
-    # Train the linear regression model
+    # Train the linear regression model; scikit-learn is slow to import, so it is loaded on first use
+    from sklearn.linear_model import LinearRegression
     model = LinearRegression()
-    model.fit(X, y)
+    with stage("model_fit"):
+        model.fit(X, y)
 
     # Generate future years starting from the latest year in the data
     last_year = df["year"].max()
-    print("Debug - Last Year in Data:", last_year)  # Debug log
 
     future_years = np.arange(last_year + 1, last_year + 1 + years).reshape(-1, 1)
 
@@ -34,3 +31,41 @@ def calculate_forecast(df: pd.DataFrame, years: int):
     predictions = model.predict(future_years)
 
     return future_years.flatten(), predictions
+
+
+def batch_forecast(years: np.ndarray, values: np.ndarray, mask: np.ndarray, horizon: int):
+    """
+    Fit a least-squares line to every row of a padded series matrix at once.
+
+    Each row is one country's history; ``mask`` marks which cells hold real
+    observations. Rows are solved in closed form, so the cost is a handful of
+    array operations regardless of how many countries are included.
+
+    Args:
+        years (np.ndarray): Years, shape (countries, max_length).
+        values (np.ndarray): Observed values, same shape as ``years``.
+        mask (np.ndarray): True where a cell holds an observation.
+        horizon (int): Number of years to forecast.
+
+    Returns:
+        tuple: (future_years, predictions), each of shape (countries, horizon).
+            Rows without observations are filled with NaN predictions.
+    """
+    weights = mask.astype(np.float64)
+    x = np.where(mask, years, 0).astype(np.float64)
+    y = np.where(mask, values, 0).astype(np.float64)
+    counts = weights.sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = x.sum(axis=1) / counts
+        mean_y = y.sum(axis=1) / counts
+        dx = (x - mean_x[:, None]) * weights
+        dy = (y - mean_y[:, None]) * weights
+        variance = (dx * dx).sum(axis=1)
+        slope = np.where(variance > 0, (dx * dy).sum(axis=1) / variance, 0.0)
+    intercept = mean_y - slope * mean_x
+
+    last_year = np.where(mask, years, 0).max(axis=1, initial=0)
+    future_years = last_year[:, None] + np.arange(1, horizon + 1)
+    predictions = intercept[:, None] + slope[:, None] * future_years
+    return future_years, predictions
@@ -0,0 +1,98 @@
+from app.utils.metrics import stage
+
+# Fully qualified BigQuery tables
+RENEWABLE_ENERGY_TABLE = "global-environment-project.renewable_energy_data.renewable_energy_consumption"
+CLIMATE_TABLE = "global-environment-project.climate_data.global_temperature"
+
+
+class QueryTemplate:
+    """
+    A named query whose text never depends on user input.
+
+    Values are bound as query parameters and the selected columns are checked
+    against a fixed list, so the same lookup always produces the same SQL text
+    and can be answered from BigQuery's result cache.
+    """
+
+    def __init__(self, sql: str, columns: list, parameters: dict = None):
+        """
+        Args:
+            sql (str): Query text with a ``{columns}`` placeholder and ``@name`` parameters.
+            columns (list): Columns that may be selected, in their default order.
+            parameters (dict, optional): Maps parameter names to BigQuery types, e.g. ``"STRING"``.
+        """
+        self.sql = sql
+        self.columns = columns
+        self.parameters = parameters or {}
+
+    def build(self, columns: list = None, **values):
+        """
+        Render the query text and its job configuration.
+
+        Args:
+            columns (list, optional): Subset of columns to select; all columns when omitted.
+            **values: Parameter values; missing parameters are bound as NULL.
+
+        Returns:
+            tuple: (sql, bigquery.QueryJobConfig)
+        """
+        from google.cloud import bigquery
+
+        selected = columns or self.columns
+        unknown = [column for column in selected if column not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        unexpected = [name for name in values if name not in self.parameters]
+        if unexpected:
+            raise ValueError(f"Unknown query parameters: {', '.join(unexpected)}")
+
+        query_parameters = [
+            bigquery.ScalarQueryParameter(name, type_, values.get(name)) for name, type_ in self.parameters.items()
+        ]
+
+        sql = self.sql.format(columns=", ".join(f"`{column}`" for column in selected))
+        return sql, bigquery.QueryJobConfig(query_parameters=query_parameters)
+
+
+RENEWABLE_ENERGY_COLUMNS = ["Country Code", "Country Name", "Year", "Renewable_Energy_Consumption"]
+CLIMATE_COLUMNS = ["year", "average_temperature", "country"]
+
+QUERIES = {
+    # Every country, used to materialize the dataset cache
+    "renewable_energy": QueryTemplate(
+        f"""
+        SELECT {{columns}}
+        FROM `{RENEWABLE_ENERGY_TABLE}`
+        ORDER BY `Country Code`, Year
+        """,
+        RENEWABLE_ENERGY_COLUMNS,
+    ),
+    # Optional filters are bound as NULL when unused, so the text stays the same
+    "climate": QueryTemplate(
+        f"""
+        SELECT {{columns}}
+        FROM `{CLIMATE_TABLE}`
+        WHERE (@year IS NULL OR year = @year)
+          AND (@country IS NULL OR country = @country)
+        ORDER BY year DESC
+        """,
+        CLIMATE_COLUMNS,
+        {"year": "INT64", "country": "STRING"},
+    ),
+}
+
+
+def build_query(name: str, columns: list = None, **values):
+    """
+    Build a named, parameterized query.
+
+    Args:
+        name (str): Template name from QUERIES.
+        columns (list, optional): Subset of columns to select.
+        **values: Parameter values.
+
+    Returns:
+        tuple: (sql, bigquery.QueryJobConfig)
+    """
+    with stage("query_build"):
+        return QUERIES[name].build(columns, **values)
@@ -1,12 +1,26 @@
-import pandas as pd
-from fpdf import FPDF
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+import csv
+import io
+import json
+import zlib
 import os
+from app.utils.metrics import stage
 
+# Created at startup; pandas and fpdf are imported on first export because they are slow to load
 EXPORT_FOLDER = "static/exports"
 
-# Ensure the folder exists
-if not os.path.exists(EXPORT_FOLDER):
-    os.makedirs(EXPORT_FOLDER)
+# Rows buffered before a chunk of a streamed export is sent
+STREAM_CHUNK_ROWS = 1000
+
+# Media types for streamed exports, keyed by format
+STREAM_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# Media types and extensions of exports built in memory, keyed by format
+DOCUMENT_FORMATS = {
+    "excel": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "pdf": ("application/pdf", "pdf"),
+}
 
 def export_to_csv(data: list, filename: str) -> str:
     """
@@ -19,9 +33,11 @@ def export_to_csv(data: list, filename: str) -> str:
     Returns:
         str: Path to the saved CSV file.
     """
+    import pandas as pd
     file_path = os.path.join(EXPORT_FOLDER, filename)
     df = pd.DataFrame(data)
-    df.to_csv(file_path, index=False)
+    with stage("file_write"):
+        df.to_csv(file_path, index=False)
     return file_path
 
 def export_to_excel(data: list, filename: str) -> str:
@@ -36,10 +52,27 @@ def export_to_excel(data: list, filename: str) -> str:
         str: Path to the saved Excel file.
     """
     file_path = os.path.join(EXPORT_FOLDER, filename)
-    df = pd.DataFrame(data)
-    df.to_excel(file_path, index=False, engine="openpyxl")
+    content = excel_bytes(data)
+    with stage("file_write"), open(file_path, "wb") as f:
+        f.write(content)
     return file_path
 
+def excel_bytes(data: list) -> bytes:
+    """
+    Build an Excel workbook in memory.
+
+    Args:
+        data (list): List of dictionaries containing the data.
+
+    Returns:
+        bytes: The .xlsx file contents.
+    """
+    import pandas as pd
+    buffer = io.BytesIO()
+    with stage("report_render"):
+        pd.DataFrame(data).to_excel(buffer, index=False, engine="openpyxl")
+    return buffer.getvalue()
+
 def export_to_pdf(data: list, filename: str, title: str) -> str:
     """
     Export data to a PDF file.
@@ -53,6 +86,23 @@ def export_to_pdf(data: list, filename: str, title: str) -> str:
         str: Path to the saved PDF file.
     """
     file_path = os.path.join(EXPORT_FOLDER, filename)
+    content = pdf_bytes(data, title)
+    with stage("file_write"), open(file_path, "wb") as f:
+        f.write(content)
+    return file_path
+
+def pdf_bytes(data: list, title: str) -> bytes:
+    """
+    Build a PDF report in memory.
+
+    Args:
+        data (list): List of dictionaries containing the data.
+        title (str): Title of the PDF.
+
+    Returns:
+        bytes: The PDF file contents.
+    """
+    from fpdf import FPDF
     pdf = FPDF()
     pdf.set_auto_page_break(auto=True, margin=15)
     pdf.add_page()
@@ -67,5 +117,102 @@ def export_to_pdf(data: list, filename: str, title: str) -> str:
     for idx, item in enumerate(data, start=1):
         pdf.cell(0, 10, txt=f"{idx}. " + ", ".join(f"{k}: {v}" for k, v in item.items()), ln=True)
 
-    pdf.output(file_path)
-    return file_path
+    with stage("report_render"):
+        output = pdf.output(dest="S")
+    # PyFPDF returns a latin-1 string, fpdf2 a bytearray
+    return output.encode("latin-1") if isinstance(output, str) else bytes(output)
+
+def iter_csv(rows, fieldnames: list, chunk_rows: int = STREAM_CHUNK_ROWS):
+    """
+    Encode rows as CSV, yielding one chunk of bytes per batch of rows.
+
+    Args:
+        rows (Iterable[dict]): Rows to encode.
+        fieldnames (list): Column order, also written as the header.
+        chunk_rows (int): Rows per yielded chunk.
+
+    Yields:
+        bytes: Encoded CSV text.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % chunk_rows == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def iter_ndjson(rows, chunk_rows: int = STREAM_CHUNK_ROWS):
+    """
+    Encode rows as newline-delimited JSON, yielding one chunk of bytes per batch of rows.
+
+    Args:
+        rows (Iterable[dict]): Rows to encode.
+        chunk_rows (int): Rows per yielded chunk.
+
+    Yields:
+        bytes: Encoded NDJSON text.
+    """
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row))
+        if len(lines) == chunk_rows:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+def iter_gzip(chunks):
+    """
+    Gzip-compress a stream of byte chunks.
+
+    Args:
+        chunks (Iterable[bytes]): Uncompressed chunks.
+
+    Yields:
+        bytes: Gzip member data.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def streaming_export_response(rows, fieldnames: list, format: str, filename: str, compress: str = None):
+    """
+    Stream rows to the client as CSV or NDJSON without writing them to disk.
+
+    Args:
+        rows (Iterable[dict]): Rows to export, typically a generator.
+        fieldnames (list): Column order.
+        format (str): 'csv' or 'ndjson'.
+        filename (str): Download name without extension.
+        compress (str, optional): 'gzip' to send a compressed file.
+
+    Returns:
+        StreamingResponse: Chunked response body.
+    """
+    format = format.lower()
+    if format not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid format. Use 'csv' or 'ndjson'.")
+    if compress not in (None, "gzip"):
+        raise HTTPException(status_code=400, detail="Invalid compression. Use 'gzip'.")
+
+    chunks = iter_csv(rows, fieldnames) if format == "csv" else iter_ndjson(rows)
+    filename = f"{filename}.{format}"
+    media_type = STREAM_MEDIA_TYPES[format]
+    if compress == "gzip":
+        chunks = iter_gzip(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
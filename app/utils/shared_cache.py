@@ -0,0 +1,170 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; cross-process locks become no-ops
+    fcntl = None
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Cache shared by every worker process: 'none', 'file' or 'redis'
+SHARED_CACHE_BACKEND = os.getenv("SHARED_CACHE_BACKEND", "none")
+
+# Directory of the file backend; /dev/shm keeps entries in memory on Linux
+SHARED_CACHE_DIR = os.getenv(
+    "SHARED_CACHE_DIR", "/dev/shm/global_environment_api" if os.path.isdir("/dev/shm") else "data/shared_cache"
+)
+
+# Redis (or any Redis-compatible server) used by the redis backend
+SHARED_CACHE_REDIS_URL = os.getenv("SHARED_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# Seconds a cross-process lock is held at most, so a crashed worker cannot block the others forever
+SHARED_LOCK_TIMEOUT_SECONDS = float(os.getenv("SHARED_CACHE_LOCK_TIMEOUT", "120"))
+
+
+class SharedCache:
+    """
+    Byte store shared by every worker process.
+
+    Entries may expire after a TTL, and lock() serializes expensive work,
+    such as a BigQuery load, across processes so only one worker does it.
+    """
+
+    name = "base"
+
+    def get(self, key: str):
+        """Return the bytes stored under key, or None if missing or expired."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float = None):
+        """Store bytes under key, expiring after ``ttl`` seconds when given."""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        """Remove key if present."""
+        raise NotImplementedError
+
+    @contextmanager
+    def lock(self, key: str):
+        """Hold a lock on key across every worker process."""
+        raise NotImplementedError
+
+
+class FileSharedCache(SharedCache):
+    """
+    Shared cache in a local directory, for workers on one host.
+
+    Values are written to a temporary file and renamed into place, so
+    readers never see a partial entry. The expiry time is kept in the
+    file's modification time.
+    """
+
+    name = "file"
+
+    def __init__(self, folder: str = SHARED_CACHE_DIR):
+        self.folder = folder
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.folder, hashlib.sha256(key.encode()).hexdigest())
+
+    def get(self, key: str):
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                expires_at = os.fstat(f.fileno()).st_mtime
+                if expires_at and expires_at < time.time():
+                    return None
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, value: bytes, ttl: float = None):
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(value)
+        # An mtime of 0 means the entry never expires
+        expires_at = time.time() + ttl if ttl else 0
+        os.utime(tmp_path, (expires_at, expires_at))
+        os.replace(tmp_path, path)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path_for(key))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def lock(self, key: str):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        with open(self.path_for(key) + ".lock", "a+b") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class RedisSharedCache(SharedCache):
+    """Shared cache in Redis or a Redis-compatible server, for workers on one or more hosts."""
+
+    name = "redis"
+
+    def __init__(self, url: str = SHARED_CACHE_REDIS_URL, prefix: str = "global_environment_api:"):
+        # Imported here because redis is only needed for this backend
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: float = None):
+        self.client.set(self.prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    @contextmanager
+    def lock(self, key: str):
+        with self.client.lock(self.prefix + "lock:" + key, timeout=SHARED_LOCK_TIMEOUT_SECONDS):
+            yield
+
+
+SHARED_CACHES = {"file": FileSharedCache, "redis": RedisSharedCache}
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache(name: str = None):
+    """
+    Return the configured shared cache, creating it on first use.
+
+    Args:
+        name (str, optional): 'none', 'file' or 'redis'; defaults to SHARED_CACHE_BACKEND.
+
+    Returns:
+        SharedCache: The shared cache, or None when sharing is disabled.
+    """
+    global _shared_cache
+    name = (name or SHARED_CACHE_BACKEND).lower()
+    if name == "none":
+        return None
+    if name not in SHARED_CACHES:
+        raise ValueError(f"Unknown shared cache '{name}'. Use one of: none, {', '.join(SHARED_CACHES)}")
+    with _shared_cache_lock:
+        if _shared_cache is None or _shared_cache.name != name:
+            _shared_cache = SHARED_CACHES[name]()
+            logger.info(f"Using the '{name}' shared cache")
+        return _shared_cache
@@ -0,0 +1,131 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Future
+
+# Every SingleFlight group, by name, for reporting
+_groups = {}
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key (the leader) does the work; callers arriving
+    while it is in flight wait for the same result instead of repeating it.
+    Results are shared, so callers must not modify them. Waiting goes through
+    a thread-safe Future, so threads and event loops can share one group.
+    """
+
+    def __init__(self, name: str = None):
+        """
+        Args:
+            name (str, optional): Group name; named groups are included in single_flight_stats().
+        """
+        self.name = name
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        if name:
+            _groups[name] = self
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Call ``fn`` once per key at a time, blocking until the result is ready.
+
+        Args:
+            key (Hashable): Identifies identical work.
+            fn (Callable): The work to run if no identical call is in flight.
+
+        Returns:
+            Any: The result of ``fn``.
+        """
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn, *args, **kwargs)
+        return future.result()
+
+    def submit(self, key, executor, fn, *args, **kwargs) -> Future:
+        """
+        Run ``fn`` on an executor once per key at a time.
+
+        Returns:
+            Future: Shared by every caller with the same key while it is in flight.
+        """
+        future, leader = self._join(key)
+        if leader:
+            # The work runs in the leader's context, so it is attributed to the leader's request
+            executor.submit(contextvars.copy_context().run, self._run, key, future, fn, *args, **kwargs)
+        return future
+
+    async def run(self, key, factory):
+        """
+        Await ``factory()`` once per key at a time.
+
+        The leader's coroutine runs as its own task, so a caller that is
+        cancelled stops waiting without cancelling the work for the others.
+
+        Args:
+            key (Hashable): Identifies identical work.
+            factory (Callable[[], Awaitable]): Creates the coroutine to run.
+
+        Returns:
+            Any: The result of the coroutine.
+        """
+        future, leader = self._join(key)
+        if leader:
+            task = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda done: self._settle(key, future, done))
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def stats(self) -> dict:
+        """Return call counters for this group."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight),
+            }
+
+    def _join(self, key):
+        with self._lock:
+            self.calls += 1
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            self.executions += 1
+            return future, True
+
+    def _run(self, key, future, fn, *args, **kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+        else:
+            self._finish(key)
+            future.set_result(result)
+
+    def _settle(self, key, future, task):
+        self._finish(key)
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    def _finish(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+
+def single_flight_stats() -> dict:
+    """Return call counters for every SingleFlight group, keyed by group name."""
+    return {name: group.stats() for name, group in _groups.items()}
@@ -0,0 +1,245 @@
+"""
+Versioned, memory-mapped binary snapshots of the dataset tables.
+
+A snapshot file holds a JSON header followed by contiguous, 64-byte aligned
+column arrays. Workers map it read-only, so opening one costs microseconds
+whatever its size, and every worker on the host shares the same pages
+through the page cache.
+
+Each version is written to its own file and then published by atomically
+replacing a small pointer file, so readers see either the old snapshot or
+the new one, never a partial write. Workers that still map an old version
+keep reading it until they next check the pointer.
+
+Usage: python -m app.utils.snapshot [TABLE ...]
+    Load the tables from the data backend and publish a snapshot of each.
+"""
+import os
+import sys
+import json
+import mmap
+import time
+import struct
+import logging
+import threading
+import numpy as np
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Serve the dataset tables from memory-mapped snapshots, publishing one after each backend load
+DATASET_SNAPSHOTS = os.getenv("DATASET_SNAPSHOTS", "false").lower() in ("1", "true", "yes")
+
+# Directory holding the snapshot files and their pointers
+SNAPSHOT_FOLDER = os.getenv("DATASET_SNAPSHOT_FOLDER", "data/snapshots")
+
+# Number of versions kept per table; older files are removed after a publish
+SNAPSHOT_KEEP = int(os.getenv("DATASET_SNAPSHOT_KEEP", "2"))
+
+# Seconds between checks of a table's pointer for a newly published version
+SNAPSHOT_CHECK_SECONDS = float(os.getenv("DATASET_SNAPSHOT_CHECK_SECONDS", "1"))
+
+MAGIC = b"GEAPSNAP"
+FORMAT_VERSION = 1
+
+# Magic, format version and header length
+PREAMBLE = struct.Struct("<8sII")
+
+# Arrays start on cache-line boundaries
+ALIGNMENT = 64
+
+
+class Snapshot:
+    """A mapped snapshot: its column arrays, which are read-only views of the file, and its header metadata."""
+
+    def __init__(self, path: str, arrays: dict, meta: dict):
+        self.path = path
+        self.arrays = arrays
+        self.meta = meta
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(path: str, arrays: dict, meta: dict):
+    """
+    Write column arrays and metadata to a snapshot file.
+
+    The file is written under a temporary name and renamed into place.
+
+    Args:
+        path (str): Destination file.
+        arrays (dict): Maps column names to one-dimensional NumPy arrays.
+        meta (dict): JSON-serializable metadata stored in the header.
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "count": len(array), "offset": offset}
+        offset = _align(offset + array.nbytes)
+    header = json.dumps({"meta": meta, "arrays": layout}).encode()
+    data_start = _align(PREAMBLE.size + len(header))
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Snapshot:
+    """
+    Map a snapshot file read-only.
+
+    Raises:
+        ValueError: If the file is not a snapshot or uses another format version.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, header_length = PREAMBLE.unpack_from(mapped)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} snapshot")
+    header = json.loads(mapped[PREAMBLE.size:PREAMBLE.size + header_length])
+    data_start = _align(PREAMBLE.size + header_length)
+    arrays = {
+        # Each array keeps the mapping alive through its base buffer
+        name: np.frombuffer(mapped, dtype=spec["dtype"], count=spec["count"], offset=data_start + spec["offset"])
+        for name, spec in header["arrays"].items()
+    }
+    return Snapshot(path, arrays, header["meta"])
+
+
+class SnapshotStore:
+    """
+    Directory of published snapshots, one pointer file per table.
+
+    Snapshot files are named by table and content version, and the pointer
+    ``<table>.current`` holds the file name of the published one.
+    """
+
+    def __init__(self, folder: str = SNAPSHOT_FOLDER, keep: int = SNAPSHOT_KEEP,
+                 check_interval: float = SNAPSHOT_CHECK_SECONDS):
+        """
+        Args:
+            folder (str): Directory holding the snapshots.
+            keep (int): Versions kept per table.
+            check_interval (float): Seconds between checks of a pointer by changed().
+        """
+        self.folder = folder
+        self.keep = keep
+        self.check_interval = check_interval
+        self._checked = {}
+
+    def pointer_path(self, name: str) -> str:
+        return os.path.join(self.folder, f"{name}.current")
+
+    def current(self, name: str):
+        """Return the path of the published snapshot of a table, or None if there is none."""
+        try:
+            with open(self.pointer_path(name)) as f:
+                return os.path.join(self.folder, f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def open(self, name: str):
+        """Map the published snapshot of a table, returning None if there is none."""
+        path = self.current(name)
+        if path is None:
+            return None
+        snapshot = read_snapshot(path)
+        self._checked[name] = (time.monotonic(), path)
+        return snapshot
+
+    def publish(self, name: str, version: str, arrays: dict, meta: dict) -> str:
+        """
+        Write a new version of a table and point readers at it.
+
+        Args:
+            name (str): Table name.
+            version (str): Content version, used in the file name.
+            arrays (dict): Column arrays to store.
+            meta (dict): Header metadata.
+
+        Returns:
+            str: Path of the published snapshot.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        file_name = f"{name}.{version}.snap"
+        path = os.path.join(self.folder, file_name)
+        write_snapshot(path, arrays, meta)
+        pointer = self.pointer_path(name)
+        tmp_pointer = f"{pointer}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_pointer, "w") as f:
+            f.write(file_name)
+        os.replace(tmp_pointer, pointer)
+        self._checked[name] = (time.monotonic(), path)
+        self._prune(name, keep_path=path)
+        logger.info(f"Published snapshot {file_name}")
+        return path
+
+    def withdraw(self, name: str):
+        """Stop serving the published snapshot of a table, so the next load reads the data backend."""
+        try:
+            os.remove(self.pointer_path(name))
+        except FileNotFoundError:
+            pass
+        self._checked.pop(name, None)
+
+    def changed(self, name: str, path: str) -> bool:
+        """
+        Check whether a version other than ``path`` has been published.
+
+        The pointer is read at most once per ``check_interval`` seconds, so
+        this is cheap enough to call on every request.
+        """
+        now = time.monotonic()
+        checked_at, current = self._checked.get(name, (None, None))
+        if checked_at is None or now - checked_at >= self.check_interval:
+            current = self.current(name)
+            self._checked[name] = (now, current)
+        return current is not None and current != path
+
+    def _prune(self, name: str, keep_path: str):
+        """Remove all but the newest ``keep`` versions; mappings of removed files stay valid."""
+        older = sorted(
+            (
+                entry for entry in os.scandir(self.folder)
+                if entry.name.startswith(f"{name}.") and entry.name.endswith(".snap") and entry.path != keep_path
+            ),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True,
+        )
+        for entry in older[max(0, self.keep - 1):]:
+            try:
+                os.remove(entry.path)
+            except OSError:  # Windows cannot remove a file that is still mapped
+                pass
+
+
+def main(argv=None):
+    """Load the tables from the data backend and publish their snapshots."""
+    from app.utils.dataset_cache import dataset_cache
+
+    logging.basicConfig(level=logging.INFO)
+    names = (argv if argv is not None else sys.argv[1:]) or list(dataset_cache.loaders)
+    store = dataset_cache.snapshots or SnapshotStore()
+    for name in names:
+        started = time.perf_counter()
+        table = dataset_cache.loaders[name]()
+        now = time.time()
+        previous = store.open(name)
+        # A republished table with the same contents keeps its Last-Modified time
+        modified = previous.meta["modified"] if previous and previous.meta["version"] == table.version else now
+        store.publish(name, table.version, table.snapshot_arrays(), table.snapshot_meta(now, modified))
+        print(f"{name}: {len(table)} rows in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
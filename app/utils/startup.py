@@ -0,0 +1,62 @@
+import os
+import asyncio
+import logging
+import importlib
+from app.utils.chart_cache import CHART_CACHE_FOLDER
+from app.utils.chart_utils import GRAPH_FOLDER
+from app.utils.dataset_cache import dataset_cache
+from app.utils.report_utils import EXPORT_FOLDER
+
+# Set up logger
+logger = logging.getLogger(__name__)
+
+# Load the heavy libraries and the dataset tables before serving the first request
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "false").lower() in ("1", "true", "yes")
+
+# Libraries imported on first use that the warm-up loads ahead of time
+WARMUP_MODULES = ["google.cloud.bigquery", "google.auth", "pandas", "fpdf", "pyarrow", "pyarrow.parquet"]
+
+# Folders the API writes into; the chart cache lives outside static/ so it is not served
+OUTPUT_FOLDERS = [GRAPH_FOLDER, CHART_CACHE_FOLDER, EXPORT_FOLDER]
+
+
+def ensure_folders():
+    """Create the folders that charts and exports are written to."""
+    for folder in OUTPUT_FOLDERS:
+        os.makedirs(folder, exist_ok=True)
+
+
+def import_modules(modules: list = None) -> list:
+    """
+    Import libraries that the API otherwise loads on first use.
+
+    Returns:
+        list: The modules that could not be imported.
+    """
+    missing = []
+    for name in modules or WARMUP_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            missing.append(name)
+    return missing
+
+
+async def warm_up():
+    """
+    Import the heavy libraries and load every dataset table, so the first
+    requests do not pay for them.
+
+    Failures are logged rather than raised; the API still starts and the
+    work is retried on first use.
+    """
+    loop = asyncio.get_running_loop()
+    missing = await loop.run_in_executor(None, import_modules)
+    if missing:
+        logger.warning(f"Warm-up could not import: {', '.join(missing)}")
+    names = list(dataset_cache.loaders)
+    results = await asyncio.gather(*(dataset_cache.aget(name) for name in names), return_exceptions=True)
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Warm-up could not load the '{name}' table: {result}")
+    logger.info("Warm-up finished")
@@ -0,0 +1,128 @@
+"""
+Micro-benchmarks for forecasting, chart rendering, exports and serialization.
+
+Every input comes from the deterministic fake BigQuery tables, so runs on
+the same machine are comparable. Results are saved as JSON under
+benchmarks/results/.
+
+Usage: python -m benchmarks.bench_micro [--countries N] [--repeat N] [--only GROUP]
+"""
+import argparse
+import tempfile
+from unittest import mock
+import numpy as np
+import pandas as pd
+from benchmarks.common import measure, save_results
+from benchmarks.fake_bigquery import make_tables
+from app.utils import report_utils
+from app.utils.arrow_utils import iter_arrow_stream, iter_parquet, to_arrow_table
+from app.utils.chart_utils import render_bar_chart, render_forecast_line_chart, render_line_chart
+from app.utils.dataset_cache import CountryTable
+from app.utils.forecast_table import ForecastTable
+from app.utils.json_utils import dumps, shape_data
+from app.utils.prediction_utils import calculate_forecast
+
+GROUPS = ["forecast", "charts", "exports", "serialization"]
+
+
+def forecast_cases(table: CountryTable) -> dict:
+    country = table.country_codes()[0]
+    years, values = table.slice(country)
+    df = pd.DataFrame({"year": years, "consumption": values})
+    return {
+        "calculate_forecast (1 country)": (lambda: calculate_forecast(df, 10), 1),
+        "ForecastTable.from_country_table (all countries)": (
+            lambda: ForecastTable.from_country_table(table), len(table.country_codes())
+        ),
+    }
+
+
+def chart_cases(table: CountryTable) -> dict:
+    years, values = table.slice(table.country_codes()[0])
+    future_years = np.arange(years[-1] + 1, years[-1] + 11)
+    future_values = np.linspace(values[-1], values[-1] + 5, 10)
+    labels = ("Renewable Energy Consumption", "Year", "Consumption (%)")
+    return {
+        "render_bar_chart": (lambda: render_bar_chart(years, values, *labels), 1),
+        "render_line_chart": (lambda: render_line_chart(years, values, *labels), 1),
+        "render_forecast_line_chart": (
+            lambda: render_forecast_line_chart(years, values, future_years, future_values, *labels), 1
+        ),
+    }
+
+
+def export_cases(table: CountryTable) -> dict:
+    rows = [
+        {"country": c, "year": y, "consumption": v} for c, y, v in table.iter_rows()
+    ]
+    forecast = rows[:50]
+    fields = ["country", "year", "consumption"]
+    return {
+        "export_to_csv": (lambda: report_utils.export_to_csv(rows, "bench.csv"), len(rows)),
+        "export_to_excel": (lambda: report_utils.export_to_excel(rows, "bench.xlsx"), len(rows)),
+        "export_to_pdf (50 rows)": (lambda: report_utils.export_to_pdf(forecast, "bench.pdf", "Benchmark"), 50),
+        "iter_csv": (lambda: b"".join(report_utils.iter_csv(iter(rows), fields)), len(rows)),
+        "iter_ndjson": (lambda: b"".join(report_utils.iter_ndjson(iter(rows))), len(rows)),
+        "iter_csv + iter_gzip": (
+            lambda: b"".join(report_utils.iter_gzip(report_utils.iter_csv(iter(rows), fields))), len(rows)
+        ),
+    }
+
+
+def serialization_cases(table: CountryTable) -> dict:
+    columns = {"year": table.years, "temp": table.values, "country": table.countries}
+    fields = ["year", "temp", "country"]
+    rows = len(table)
+    return {
+        "json rows": (lambda: dumps({"status": "success", "data": shape_data(columns, fields)}), rows),
+        "json columns": (lambda: dumps({"status": "success", "data": shape_data(columns, fields, "columns")}), rows),
+        "arrow stream": (lambda: b"".join(iter_arrow_stream(to_arrow_table(columns))), rows),
+        "parquet": (lambda: b"".join(iter_parquet(to_arrow_table(columns))), rows),
+    }
+
+
+def run(countries: int = 200, repeat: int = 5, only: list = None) -> dict:
+    """
+    Run the micro-benchmarks.
+
+    Args:
+        countries (int): Countries in the generated tables.
+        repeat (int): Runs per case; the best time is kept.
+        only (list, optional): Subset of GROUPS to run.
+
+    Returns:
+        dict: Maps group names to {case: {seconds, items_per_second}}.
+    """
+    columns = make_tables(countries)["renewable_energy"]
+    table = CountryTable.from_columns(columns, "Country Code", "Year", "Renewable_Energy_Consumption", "Country Name")
+    results = {}
+    # Exports are written to a scratch folder instead of static/exports
+    with tempfile.TemporaryDirectory() as folder, mock.patch.object(report_utils, "EXPORT_FOLDER", folder):
+        cases = {
+            "forecast": lambda: forecast_cases(table),
+            "charts": lambda: chart_cases(table),
+            "exports": lambda: export_cases(table),
+            "serialization": lambda: serialization_cases(table),
+        }
+        for group in only or GROUPS:
+            results[group] = {}
+            for name, (fn, items) in cases[group]().items():
+                seconds = measure(fn, repeat=repeat)
+                results[group][name] = {"seconds": seconds, "items_per_second": items / seconds}
+                print(f"{group:14s} {name:50s} {seconds * 1000:9.2f} ms  {items / seconds:14,.0f} items/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--countries", type=int, default=200, help="Countries in the generated tables")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case; the best time is kept")
+    parser.add_argument("--only", action="append", choices=GROUPS, help="Run only this group (repeatable)")
+    args = parser.parse_args()
+    results = run(args.countries, args.repeat, args.only)
+    path = save_results("micro", vars(args), results)
+    print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
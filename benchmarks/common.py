@@ -0,0 +1,79 @@
+"""Timing and result-file helpers shared by the benchmarks."""
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+import numpy as np
+
+# Where benchmark runs are saved, one JSON file per run
+RESULTS_DIR = os.getenv("BENCHMARK_RESULTS_DIR", "benchmarks/results")
+
+
+def measure(fn, *args, repeat: int = 5, **kwargs) -> float:
+    """Return the best wall time of ``repeat`` calls in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def latency_summary(seconds, elapsed: float = None) -> dict:
+    """
+    Summarize request latencies.
+
+    Args:
+        seconds (Sequence[float]): One latency per request.
+        elapsed (float, optional): Wall time of the whole run, for throughput.
+
+    Returns:
+        dict: Count, mean and p50/p95/p99 in milliseconds, and requests per second.
+    """
+    values = np.asarray(seconds, dtype=np.float64) * 1000
+    summary = {"requests": len(values)}
+    if len(values):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        summary.update(mean_ms=float(values.mean()), p50_ms=float(p50), p95_ms=float(p95), p99_ms=float(p99))
+    if elapsed:
+        summary["requests_per_second"] = len(values) / elapsed
+    return summary
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(name: str, params: dict, results: dict, folder: str = RESULTS_DIR) -> str:
+    """
+    Write a benchmark run to ``<folder>/<name>-<timestamp>.json``.
+
+    The file records the commit, interpreter and parameters next to the
+    results, so runs from different revisions can be compared.
+
+    Returns:
+        str: Path of the written file.
+    """
+    os.makedirs(folder, exist_ok=True)
+    timestamp = time.strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(folder, f"{name}-{timestamp}.json")
+    run = {
+        "benchmark": name,
+        "timestamp": timestamp,
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": params,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(run, f, indent=2)
+    return path
@@ -0,0 +1,52 @@
+"""
+Compare two saved benchmark runs.
+
+Prints every numeric result present in both runs with its relative change,
+so a regression between commits stands out.
+
+Usage: python -m benchmarks.compare BASELINE.json CANDIDATE.json
+"""
+import sys
+import json
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """Map 'group / case / metric' paths to numeric values."""
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix} / {key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def compare(baseline: dict, candidate: dict) -> list:
+    """
+    Pair up the numeric results of two runs.
+
+    Returns:
+        list: (path, baseline value, candidate value, relative change) tuples.
+    """
+    old, new = flatten(baseline["results"]), flatten(candidate["results"])
+    return [
+        (path, old[path], new[path], (new[path] - old[path]) / old[path] if old[path] else float("nan"))
+        for path in old if path in new
+    ]
+
+
+def main(baseline_path: str, candidate_path: str):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(candidate_path) as f:
+        candidate = json.load(f)
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')}")
+    for path, old, new, change in compare(baseline, candidate):
+        print(f"{path:90s} {old:14.4f} {new:14.4f} {change:+8.1%}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,159 @@
+"""
+Deterministic in-process stand-in for the BigQuery client.
+
+Serves the renewable energy and climate tables with a configurable number
+of countries and years, and sleeps for a configurable job latency, so the
+API can be benchmarked without credentials or network noise.
+"""
+import re
+import time
+from contextlib import contextmanager
+import numpy as np
+from google.cloud.bigquery import Row
+from app.utils.queries import CLIMATE_TABLE
+
+
+def make_tables(countries: int = 200, first_year: int = 1960, last_year: int = 2023, seed: int = 0) -> dict:
+    """
+    Generate the full tables as NumPy columns.
+
+    The same arguments always produce the same data. Roughly one value in
+    twenty is missing, like the gaps in the World Bank data.
+
+    Returns:
+        dict: Maps 'renewable_energy' and 'climate' to dicts of columns.
+    """
+    rng = np.random.default_rng(seed)
+    codes = np.array([f"C{i:03d}" for i in range(countries)])
+    years = np.arange(first_year, last_year + 1)
+    country_column = np.repeat(codes, len(years))
+    year_column = np.tile(years, countries)
+    trend = rng.uniform(-0.3, 0.5, countries).repeat(len(years)) * (year_column - first_year)
+    consumption = np.clip(rng.uniform(0, 40, countries).repeat(len(years)) + trend + rng.normal(0, 2, len(year_column)), 0, 100)
+    consumption[rng.random(len(consumption)) < 0.05] = np.nan
+    temperature = rng.normal(14, 8, countries).repeat(len(years)) + 0.02 * (year_column - first_year)
+    return {
+        "renewable_energy": {
+            "Country Code": country_column,
+            "Country Name": np.char.add("Country ", country_column),
+            "Year": year_column,
+            "Renewable_Energy_Consumption": consumption,
+        },
+        "climate": {
+            "year": year_column,
+            "average_temperature": temperature,
+            "country": country_column,
+        },
+    }
+
+
+class FakeRowIterator:
+    """The subset of RowIterator the data client uses."""
+
+    def __init__(self, columns: dict):
+        self.columns = columns
+        self.total_rows = len(next(iter(columns.values()))) if columns else 0
+
+    def __iter__(self):
+        field_to_index = {name: i for i, name in enumerate(self.columns)}
+        for values in zip(*(column.tolist() for column in self.columns.values())):
+            yield Row(tuple(None if v != v else v for v in values), field_to_index)
+
+    def to_arrow(self, create_bqstorage_client: bool = False):
+        import pyarrow as pa
+        return pa.table(self.columns)
+
+
+class FakeQueryJob:
+    """A query job that becomes done ``latency`` seconds after it was submitted."""
+
+    def __init__(self, columns: dict, latency: float):
+        self._rows = FakeRowIterator(columns)
+        self._ready_at = time.monotonic() + latency
+        self.destination = None
+        self.cancelled = False
+        # BigQuery bills at least 10 MB per query
+        self.total_bytes_billed = max(10 * 1024 * 1024, sum(c.nbytes for c in columns.values()))
+
+    def done(self) -> bool:
+        return time.monotonic() >= self._ready_at
+
+    def result(self, timeout: float = None):
+        remaining = self._ready_at - time.monotonic()
+        if timeout is not None and remaining > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Fake query job timed out")
+        if remaining > 0:
+            time.sleep(remaining)
+        return self._rows
+
+    def cancel(self):
+        self.cancelled = True
+        return True
+
+
+class FakeBigQueryClient:
+    """
+    Answers the queries in app.utils.queries from generated tables.
+
+    The table is picked from the FROM clause, the selected columns from the
+    SELECT list, and the ``year`` and ``country`` parameters are applied as
+    filters.
+    """
+
+    def __init__(self, countries: int = 200, first_year: int = 1960, last_year: int = 2023,
+                 latency: float = 0.05, seed: int = 0):
+        """
+        Args:
+            countries (int): Number of countries in each table.
+            first_year (int): First year of data.
+            last_year (int): Last year of data.
+            latency (float): Seconds each query job takes to finish.
+            seed (int): Seed for the generated values.
+        """
+        self.tables = make_tables(countries, first_year, last_year, seed)
+        self.latency = latency
+        self.queries = 0
+
+    def query(self, query: str, job_config=None) -> FakeQueryJob:
+        self.queries += 1
+        table = self.tables["climate" if CLIMATE_TABLE in query else "renewable_energy"]
+        selected = re.search(r"SELECT\s+(.*?)\s+FROM", query, re.S).group(1)
+        names = [name.strip().strip("`") for name in selected.split(",")]
+        mask = np.ones(len(next(iter(table.values()))), dtype=bool)
+        for param in (job_config.query_parameters if job_config else []):
+            if param.name == "year" and param.value is not None:
+                mask &= table["year"] == param.value
+            elif param.name == "country" and param.value is not None:
+                mask &= table["country"] == param.value
+        return FakeQueryJob({name: table[name][mask] for name in names}, self.latency)
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def fake_bigquery(client: FakeBigQueryClient = None):
+    """
+    Serve the shared client provider and the dataset cache from a fake client.
+
+    Yields:
+        FakeBigQueryClient: The installed client.
+    """
+    from app.utils import dataset_cache as dataset_cache_module
+    from app.utils.backends import BigQueryBackend
+    from app.utils.data_client import client_provider
+
+    client = client or FakeBigQueryClient()
+    saved = client_provider._client, dataset_cache_module._backend
+    client_provider._client = client
+    # The Storage Read API needs real credentials; the fake is always read over "REST"
+    client_provider.get_storage_client = lambda: None
+    dataset_cache_module._backend = BigQueryBackend()
+    dataset_cache_module.dataset_cache.invalidate()
+    try:
+        yield client
+    finally:
+        client_provider._client, dataset_cache_module._backend = saved
+        del client_provider.get_storage_client
+        dataset_cache_module.dataset_cache.invalidate()
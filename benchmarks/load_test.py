@@ -0,0 +1,133 @@
+"""
+HTTP load harness reporting p50/p95/p99 latency and throughput per route.
+
+By default the app runs in-process against the fake BigQuery client, so
+the numbers measure the API itself. Pass --url to load a running server
+instead. Results are saved as JSON under benchmarks/results/.
+
+Usage: python -m benchmarks.load_test [--requests N] [--concurrency N] [--latency S] [--url URL]
+"""
+import os
+import time
+import asyncio
+import tempfile
+import argparse
+import itertools
+import httpx
+from benchmarks.common import latency_summary, save_results
+from benchmarks.fake_bigquery import FakeBigQueryClient, fake_bigquery
+
+# One request per route; {country} rotates through the fake countries so
+# charts and exports are not all served from cache
+ROUTES = {
+    "/": "/",
+    "/energy/climate-data": "/energy/climate-data?country={country}",
+    "/energy/climate-data (page)": "/energy/climate-data?limit=1000",
+    "/energy/climate-data (columns)": "/energy/climate-data?shape=columns",
+    "/energy/renewable-energy/{country_code}": "/energy/renewable-energy/{country}",
+    "/energy/graph/bar/renewable-energy/{country_code}": "/energy/graph/bar/renewable-energy/{country}",
+    "/energy/graph/line/renewable-energy/{country_code}": "/energy/graph/line/renewable-energy/{country}",
+    "/energy/export/renewable-energy": "/energy/export/renewable-energy?country={country}",
+    "/energy/forecast/renewable-energy": "/energy/forecast/renewable-energy?country={country}&years=10",
+    "/energy/forecast/renewable-energy/batch": "/energy/forecast/renewable-energy/batch?countries=all&years=10",
+    "/energy/export/forecast (csv)": "/energy/export/forecast?country={country}&format=csv",
+    "/energy/export/forecast (pdf)": "/energy/export/forecast?country={country}&format=pdf",
+    "/metrics": "/metrics",
+}
+
+
+async def load_route(client: httpx.AsyncClient, template: str, countries: list, requests: int, concurrency: int) -> dict:
+    """
+    Send ``requests`` requests to one route, ``concurrency`` at a time.
+
+    Returns:
+        dict: Latency summary plus the count of non-2xx responses.
+    """
+    urls = (template.format(country=country) for country in itertools.cycle(countries))
+    latencies = []
+    errors = 0
+
+    async def worker(count: int):
+        nonlocal errors
+        for _ in range(count):
+            url = next(urls)
+            started = time.perf_counter()
+            response = await client.get(url)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    await asyncio.gather(*(worker(share) for share in shares if share))
+    summary = latency_summary(latencies, time.perf_counter() - started)
+    summary["errors"] = errors
+    return summary
+
+
+async def run_load(client: httpx.AsyncClient, countries: list, requests: int, concurrency: int,
+                   routes: list = None, warmup: int = 1) -> dict:
+    """Load every route in turn and return their summaries, keyed by route."""
+    results = {}
+    for name in routes or ROUTES:
+        if warmup:
+            await load_route(client, ROUTES[name], countries, warmup, 1)
+        results[name] = await load_route(client, ROUTES[name], countries, requests, concurrency)
+        summary = results[name]
+        print(
+            f"{name:52s} p50 {summary['p50_ms']:8.2f} ms  p95 {summary['p95_ms']:8.2f} ms  "
+            f"p99 {summary['p99_ms']:8.2f} ms  {summary['requests_per_second']:9.1f} req/s  "
+            f"{summary['errors']} errors"
+        )
+    return results
+
+
+async def run_in_process(args) -> dict:
+    """
+    Run the load against the app in this process, backed by the fake BigQuery client.
+
+    The app's relative static/ paths point into a scratch directory for the
+    run, so generated charts and exports do not land in the working tree.
+    """
+    from app.api_server import app
+    fake = FakeBigQueryClient(countries=args.countries, latency=args.latency)
+    countries = sorted(set(fake.tables["renewable_energy"]["Country Code"].tolist()))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch, fake_bigquery(fake):
+        for folder in ("static/graphs/cache", "static/exports"):
+            os.makedirs(os.path.join(scratch, folder))
+        os.chdir(scratch)
+        try:
+            async with app.router.lifespan_context(app):
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                    return await run_load(client, countries, args.requests, args.concurrency, args.route)
+        finally:
+            os.chdir(cwd)
+
+
+async def run_remote(args) -> dict:
+    """Run the load against a server that is already running."""
+    countries = args.country or ["JPN", "USA", "DEU", "FRA", "BRA"]
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=60, limits=limits) as client:
+        return await run_load(client, countries, args.requests, args.concurrency, args.route)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per route")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--countries", type=int, default=200, help="Countries in the fake tables")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds each fake BigQuery job takes")
+    parser.add_argument("--route", action="append", choices=list(ROUTES), help="Load only this route (repeatable)")
+    parser.add_argument("--url", help="Base URL of a running server; the in-process app is used when omitted")
+    parser.add_argument("--country", action="append", help="Country codes to rotate through with --url")
+    args = parser.parse_args()
+    results = asyncio.run(run_remote(args) if args.url else run_in_process(args))
+    path = save_results("load", vars(args), results)
+    print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
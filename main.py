@@ -1,5 +1,6 @@
-from fastapi import FastAPI
-from app.utils.data_client import fetch_climate_data
+from fastapi import FastAPI, Depends
+from google.cloud import bigquery
+from app.utils.data_client import fetch_climate_data, get_client
 from app.routers import energy
 
 app = FastAPI()
@@ -11,9 +12,9 @@ def health_check():
     return{"status": "API is running"}
 
 @app.get("/climate-data")
-def get_climate_data():
+def get_climate_data(client: bigquery.Client = Depends(get_client)):
     try:
-        data = fetch_climate_data()
+        data = fetch_climate_data(client)
         return {"status": "success", "data": data}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -0,0 +1,48 @@
+"""
+Ingest the World Bank renewable energy CSV.
+
+Usage: python scripts/ingest.py [INPUT] [--upload | --incremental [--dry-run]]
+
+The reshaping and loading live in app.utils.ingestion; this script only
+parses the command line and prints the incremental change set.
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.ingestion import (
+    INGEST_CHUNK_ROWS, MANIFEST_FILE, PROCESSED_RENEWABLE_ENERGY_FILE, RAW_RENEWABLE_ENERGY_FILE,
+    RENEWABLE_ENERGY_INDICATOR, RENEWABLE_ENERGY_TABLE_ID, ingest, ingest_incremental,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest World Bank renewable energy data.")
+    parser.add_argument("input", nargs="?", default=RAW_RENEWABLE_ENERGY_FILE, help="Raw wide CSV file")
+    parser.add_argument("--output", default=PROCESSED_RENEWABLE_ENERGY_FILE, help="Parquet file to write")
+    parser.add_argument("--chunk-rows", type=int, default=INGEST_CHUNK_ROWS, help="Wide rows per chunk")
+    parser.add_argument("--indicator", default=RENEWABLE_ENERGY_INDICATOR, help="Indicator Code to keep")
+    parser.add_argument("--upload", action="store_true", help="Load the Parquet file into BigQuery")
+    parser.add_argument("--table", default=RENEWABLE_ENERGY_TABLE_ID, help="Destination BigQuery table")
+    parser.add_argument("--incremental", action="store_true", help="Merge only rows changed since the last run")
+    parser.add_argument("--manifest", default=MANIFEST_FILE, help="Row hashes of the last incremental load")
+    parser.add_argument("--dry-run", action="store_true", help="Report the incremental change set without loading")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.incremental:
+        change_set = ingest_incremental(
+            args.input, args.output, args.manifest, chunk_rows=args.chunk_rows,
+            indicator=args.indicator, table_id=args.table, dry_run=args.dry_run,
+        )
+        print(json.dumps(change_set.to_dict()))
+    else:
+        ingest(args.input, args.output, args.chunk_rows, args.indicator, args.upload, args.table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import duckdb
+import pytest
+from app.utils.backends import LocalBackend, get_backend
+
+
+def write_csv(path, lines):
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_local_backend_reads_long_csv(tmp_path):
+    """Test loading a long-format CSV."""
+    write_csv(tmp_path / "cleaned_energy_data_long.csv", [
+        "Country Name,Country Code,Year,Renewable_Energy_Consumption",
+        "Japan,JPN,2021,11.0",
+        "Japan,JPN,2020,10.0",
+        "Aruba,ABW,2020,",
+    ])
+    table = LocalBackend(data_dir=str(tmp_path)).load_renewable_energy()
+    assert table.country_codes() == ["JPN"]
+    years, values = table.slice("JPN")
+    assert years.tolist() == [2020, 2021]
+    assert values.tolist() == [10.0, 11.0]
+    assert table.labels["JPN"] == "Japan"
+
+
+def test_local_backend_unpivots_wide_csv(tmp_path):
+    """Test loading a wide-format CSV with one column per year."""
+    write_csv(tmp_path / "cleaned_energy_data.csv", [
+        "Country Name,Country Code,2000,2001",
+        "Japan,JPN,3.5,4.0",
+        "United States,USA,5.0,5.5",
+    ])
+    table = LocalBackend(data_dir=str(tmp_path)).load_renewable_energy()
+    assert table.slice("USA")[1].tolist() == [5.0, 5.5]
+    assert table.labels["USA"] == "United States"
+
+
+def test_local_backend_prefers_parquet(tmp_path):
+    """Test that a Parquet climate file is read when present."""
+    csv_path = write_csv(tmp_path / "source.csv", [
+        "year,average_temperature,country",
+        "2020,15.5,USA",
+        "2021,15.7,USA",
+    ])
+    duckdb.sql(f"COPY (SELECT * FROM read_csv_auto('{csv_path}')) TO '{tmp_path / 'global_temperature.parquet'}' (FORMAT PARQUET)")
+    table = LocalBackend(data_dir=str(tmp_path)).load_climate()
+    assert table.slice("USA")[1].tolist() == [15.5, 15.7]
+
+
+def test_get_backend():
+    """Test selecting backends by name."""
+    assert get_backend("local").name == "local"
+    assert get_backend("bigquery").name == "bigquery"
+    with pytest.raises(ValueError):
+        get_backend("oracle")
@@ -0,0 +1,63 @@
+import asyncio
+import numpy as np
+from benchmarks.common import latency_summary
+from benchmarks.compare import compare
+from benchmarks.fake_bigquery import FakeBigQueryClient, fake_bigquery, make_tables
+from benchmarks.load_test import load_route
+from app.utils.data_client import fetch_columns, fetch_data_from_bigquery
+from app.utils.dataset_cache import dataset_cache, RENEWABLE_ENERGY
+from app.utils.queries import build_query
+
+
+def test_fake_tables_are_deterministic():
+    """Test that the same seed always generates the same data."""
+    first, second = make_tables(5, seed=1), make_tables(5, seed=1)
+    np.testing.assert_array_equal(
+        first["renewable_energy"]["Renewable_Energy_Consumption"],
+        second["renewable_energy"]["Renewable_Energy_Consumption"],
+    )
+    assert len(first["climate"]["year"]) == 5 * (2023 - 1960 + 1)
+
+
+def test_fake_client_applies_columns_and_filters():
+    """Test that the fake answers the real query templates."""
+    client = FakeBigQueryClient(countries=4, latency=0)
+    columns = fetch_columns(*build_query("renewable_energy", ["Country Code", "Year"]), client=client)
+    assert set(columns) == {"Country Code", "Year"}
+    assert len(set(columns["Country Code"])) == 4
+
+    columns = fetch_columns(*build_query("climate", country="C001"), client=client)
+    assert set(columns["country"]) == {"C001"}
+
+    query, job_config = build_query("climate", columns=["year", "country"], year=2000)
+    rows = fetch_data_from_bigquery(query, client=client, job_config=job_config)
+    assert len(rows) == 4
+    assert set(rows[0]) == {"year", "country"}
+
+
+def test_api_served_from_fake_bigquery():
+    """Test that the dataset cache loads through the fake and the load harness reports latencies."""
+    from httpx import ASGITransport, AsyncClient
+    from app.api_server import app
+
+    async def run():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            return await load_route(client, "/energy/renewable-energy/{country}", ["C000", "C001"], 6, 2)
+
+    with fake_bigquery(FakeBigQueryClient(countries=3, latency=0.01)) as fake:
+        summary = asyncio.run(run())
+        assert dataset_cache.peek(RENEWABLE_ENERGY).country_codes() == ["C000", "C001", "C002"]
+        assert fake.queries == 1
+    assert summary["requests"] == 6
+    assert summary["errors"] == 0
+    assert summary["p50_ms"] <= summary["p99_ms"]
+
+
+def test_latency_summary_and_compare():
+    """Test percentile summaries and run comparison."""
+    summary = latency_summary([0.001 * i for i in range(1, 101)], elapsed=2.0)
+    assert summary["p50_ms"] == 50.5
+    assert summary["requests_per_second"] == 50
+    changes = compare({"results": {"a": {"seconds": 2.0}}}, {"results": {"a": {"seconds": 1.0}, "b": 1}})
+    assert changes == [("a / seconds", 2.0, 1.0, -0.5)]
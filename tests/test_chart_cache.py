@@ -0,0 +1,96 @@
+import asyncio
+from io import BytesIO
+from fastapi.testclient import TestClient
+from app.api_server import app
+from app.utils.chart_cache import ChartCache, chart_fingerprint
+from app.utils.dataset_cache import CountryTable
+
+client = TestClient(app)
+
+
+def render_counter(calls, payload=b"png-bytes"):
+    async def render():
+        calls.append(1)
+        return BytesIO(payload)
+    return render
+
+
+def test_chart_fingerprint_depends_on_data_and_labels():
+    """Test that the fingerprint changes with the data and labels but not with container types."""
+    key = chart_fingerprint("bar", [[2020, 2021], [1.0, 2.0]], "Title", "Year", "Value")
+    assert key == chart_fingerprint("bar", [(2020, 2021), (1.0, 2.0)], "Title", "Year", "Value")
+    assert key != chart_fingerprint("line", [[2020, 2021], [1.0, 2.0]], "Title", "Year", "Value")
+    assert key != chart_fingerprint("bar", [[2020, 2021], [1.0, 2.5]], "Title", "Year", "Value")
+    assert key != chart_fingerprint("bar", [[2020, 2021], [1.0, 2.0]], "Other", "Year", "Value")
+
+
+def test_chart_cache_renders_once(tmp_path):
+    """Test that identical charts are served from the cache instead of re-rendered."""
+    cache = ChartCache(max_items=4, max_disk_bytes=1024, folder=str(tmp_path))
+    calls = []
+    assert asyncio.run(cache.get_or_render_async("abc", render_counter(calls))) == (b"png-bytes", True)
+    assert asyncio.run(cache.get_or_render_async("abc", render_counter(calls))) == (b"png-bytes", False)
+    assert len(calls) == 1
+
+    # A fresh memory tier is refilled from disk
+    cache.clear()
+    assert asyncio.run(cache.get_or_render_async("abc", render_counter(calls))) == (b"png-bytes", False)
+    assert len(calls) == 1
+
+
+def test_chart_cache_keeps_disk_io_off_the_event_loop(tmp_path):
+    """Test that the async path reads and writes the disk tier on worker threads."""
+    import threading
+
+    cache = ChartCache(max_items=4, max_disk_bytes=1024, folder=str(tmp_path))
+    threads = []
+    for name in ("_read_disk", "_write_disk"):
+        method = getattr(cache, name)
+
+        def record(*args, method=method):
+            threads.append(threading.current_thread())
+            return method(*args)
+
+        setattr(cache, name, record)
+
+    asyncio.run(cache.get_or_render_async("abc", render_counter([])))
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+    assert (tmp_path / "abc.png").read_bytes() == b"png-bytes"
+
+
+def test_chart_cache_bounds_both_tiers(tmp_path):
+    """Test LRU eviction in memory and size-bounded eviction on disk."""
+    cache = ChartCache(max_items=2, max_disk_bytes=25, folder=str(tmp_path))
+    for key in ["a", "b", "c"]:
+        cache.put(key, b"0123456789")
+    assert list(cache._memory) == ["b", "c"]
+    assert sum(path.stat().st_size for path in tmp_path.iterdir()) <= 25
+    assert not (tmp_path / "a.png").exists()
+
+
+def test_chart_cache_counts_overwrites_once(tmp_path):
+    """Test that storing the same chart again does not inflate the disk byte count."""
+    cache = ChartCache(max_items=2, max_disk_bytes=25, folder=str(tmp_path))
+    cache.put("a", b"0123456789")
+    for _ in range(3):
+        cache.put("b", b"0123456789")
+    assert cache._disk_bytes == 20
+    assert (tmp_path / "a.png").exists()
+
+
+def test_bar_chart_etag_not_modified(monkeypatch, tmp_path):
+    """Test that a repeated chart request with If-None-Match gets a 304."""
+    table = CountryTable(["JPN", "JPN"], [2020, 2021], [10.0, 11.0])
+    monkeypatch.setattr("app.routers.energy.dataset_cache.peek", lambda name: table)
+    monkeypatch.setattr("app.routers.energy.chart_cache", ChartCache(folder=str(tmp_path)))
+    monkeypatch.setattr("app.routers.energy.GRAPH_FOLDER", str(tmp_path))
+
+    response = client.get("/energy/graph/bar/renewable-energy/JPN")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    etag = response.headers["etag"]
+
+    response = client.get("/energy/graph/bar/renewable-energy/JPN", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
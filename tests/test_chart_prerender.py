@@ -0,0 +1,64 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.api_server import app
+from app.routers import energy, predictions
+from app.utils import chart_utils
+from app.utils.chart_cache import ChartCache
+from app.utils.chart_prerender import ChartPrerenderer, chart_specs
+from app.utils.dataset_cache import dataset_cache, RENEWABLE_ENERGY
+from app.utils.forecast_table import forecast_store
+from benchmarks.fake_bigquery import FakeBigQueryClient, fake_bigquery
+
+
+@pytest.fixture
+def chart_pool():
+    """Render on a thread in this process rather than spawning chart workers."""
+    chart_utils.shutdown_chart_pool()
+    chart_utils.start_chart_pool(workers=0)
+    yield
+    chart_utils.shutdown_chart_pool()
+
+
+def test_prerender_renders_each_chart_once(tmp_path, chart_pool):
+    """Test that every country gets its three charts and a rerun skips them."""
+    cache = ChartCache(folder=str(tmp_path))
+    prerenderer = ChartPrerenderer(cache=cache)
+    with fake_bigquery(FakeBigQueryClient(countries=2, latency=0)):
+        table = dataset_cache.get(RENEWABLE_ENERGY)
+        status = prerenderer.run(table)
+    assert status["state"] == "done"
+    assert status["total"] == 6
+    assert status["rendered"] == 6
+    assert status["failed"] == 0
+    for spec in chart_specs(table, forecast_store.for_table(table)):
+        assert cache.get(spec.key).startswith(b"\x89PNG")
+
+    rerun = prerenderer.run(table)
+    assert rerun["rendered"] == 0
+    assert rerun["skipped"] == 6
+
+
+def test_chart_routes_serve_prerendered_charts(tmp_path, monkeypatch, chart_pool):
+    """Test that the chart routes find pre-rendered charts under the keys they look up."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "static" / "graphs").mkdir(parents=True)
+    cache = ChartCache(folder=str(tmp_path / "cache"))
+    monkeypatch.setattr(energy, "chart_cache", cache)
+    monkeypatch.setattr(predictions, "chart_cache", cache)
+
+    async def no_live_render(*args):
+        raise AssertionError("chart rendered on request")
+
+    for module, name in [(energy, "generate_bar_chart"), (energy, "generate_line_chart"),
+                         (predictions, "generate_forecast_line_chart")]:
+        monkeypatch.setattr(module, name, no_live_render)
+
+    with fake_bigquery(FakeBigQueryClient(countries=2, latency=0)):
+        ChartPrerenderer(cache=cache).run(dataset_cache.get(RENEWABLE_ENERGY))
+        client = TestClient(app)
+        for kind in ("bar", "line"):
+            response = client.get(f"/energy/graph/{kind}/renewable-energy/C001")
+            assert response.status_code == 200
+            assert response.content.startswith(b"\x89PNG")
+        response = client.get("/energy/forecast/renewable-energy", params={"country": "C001"})
+        assert response.status_code == 200
@@ -0,0 +1,51 @@
+import asyncio
+from app.utils import chart_utils
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def test_render_functions_return_png_bytes():
+    """Test that the object-oriented renderers produce PNG images."""
+    assert chart_utils.render_bar_chart([2020, 2021], [1.0, 2.0], "Bar", "Year", "Value").startswith(PNG_SIGNATURE)
+    assert chart_utils.render_line_chart([2020, 2021], [1.0, 2.0], "Line", "Year", "Value").startswith(PNG_SIGNATURE)
+    assert chart_utils.render_forecast_line_chart(
+        [2020, 2021], [1.0, 2.0], [2022, 2023], [2.5, 3.0], "Forecast", "Year", "Value"
+    ).startswith(PNG_SIGNATURE)
+
+
+def test_generate_charts_in_worker_pool():
+    """Test that concurrent chart jobs render on the pool without corrupting each other."""
+    chart_utils.start_chart_pool(workers=2)
+    try:
+        async def run():
+            return await asyncio.gather(
+                chart_utils.generate_bar_chart([2020, 2021], [1.0, 2.0], "A", "Year", "Value"),
+                chart_utils.generate_line_chart([2020, 2021], [1.0, 2.0], "B", "Year", "Value"),
+                chart_utils.generate_bar_chart([2020, 2021], [1.0, 2.0], "A", "Year", "Value"),
+            )
+
+        first, second, third = asyncio.run(run())
+    finally:
+        chart_utils.shutdown_chart_pool()
+
+    assert first.getvalue().startswith(PNG_SIGNATURE)
+    assert second.getvalue() != first.getvalue()
+    assert third.getvalue() == first.getvalue()
+
+
+def test_chart_pool_recovers_from_a_dead_worker():
+    """Test that a render after a worker crash restarts the pool instead of failing for good."""
+    import os
+    import signal
+
+    pool = chart_utils.start_chart_pool(workers=1)
+    try:
+        for process in list(pool._processes.values()):
+            os.kill(process.pid, signal.SIGKILL)
+            process.join()
+
+        buf = asyncio.run(chart_utils.generate_bar_chart([2020, 2021], [1.0, 2.0], "A", "Year", "Value"))
+        assert buf.getvalue().startswith(PNG_SIGNATURE)
+        assert chart_utils.start_chart_pool() is not pool
+    finally:
+        chart_utils.shutdown_chart_pool()
@@ -0,0 +1,118 @@
+import gzip
+import brotli
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from app.utils.compression import (
+    CompressionMiddleware, PrecompressedStaticFiles, choose_encoding, etag_matches, precompress_directory,
+    precompress_file,
+)
+
+BODY = "year,country,consumption\n" * 200
+
+
+def make_app(static_dir=None):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/large")
+    def large():
+        return PlainTextResponse(BODY)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/png")
+    def png():
+        return Response(b"\x89PNG" * 500, media_type="image/png")
+
+    @app.get("/tagged")
+    def tagged(request: Request):
+        if etag_matches(request.headers.get("if-none-match"), '"v1"'):
+            return Response(status_code=304, headers={"ETag": '"v1"'})
+        return PlainTextResponse(BODY, headers={"ETag": '"v1"'})
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((BODY for _ in range(3)), media_type="text/csv")
+
+    if static_dir:
+        app.mount("/static", PrecompressedStaticFiles(directory=static_dir), name="static")
+    return app
+
+
+def test_choose_encoding():
+    """Test Accept-Encoding negotiation with quality values."""
+    assert choose_encoding("gzip, deflate, br") == "br"
+    assert choose_encoding("gzip") == "gzip"
+    assert choose_encoding("br;q=0, gzip;q=0.5") == "gzip"
+    assert choose_encoding("identity") is None
+    assert choose_encoding("*") == "br"
+    assert choose_encoding(None) is None
+
+
+def test_compression_middleware():
+    """Test that large text is compressed and small or binary bodies are not."""
+    client = TestClient(make_app())
+
+    response = client.get("/large", headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br"
+    assert "Accept-Encoding" in response.headers["vary"]
+
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == BODY
+
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == BODY * 3
+
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "br"}).headers
+    assert "content-encoding" not in client.get("/png", headers={"Accept-Encoding": "br"}).headers
+    assert "content-encoding" not in client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_compressed_responses_get_their_own_etag():
+    """Test that each encoding has a distinct ETag that still revalidates."""
+    client = TestClient(make_app())
+    etags = {}
+    for encoding in ("br", "gzip", "identity"):
+        etags[encoding] = client.get("/tagged", headers={"Accept-Encoding": encoding}).headers["etag"]
+    assert etags == {"br": '"v1-br"', "gzip": '"v1-gzip"', "identity": '"v1"'}
+
+    for encoding, etag in etags.items():
+        response = client.get("/tagged", headers={"Accept-Encoding": encoding, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+
+
+def test_precompressed_static_files(tmp_path):
+    """Test that fresh .br/.gz variants are written and served."""
+    (tmp_path / "data.csv").write_text(BODY)
+    (tmp_path / "tiny.csv").write_text("a,b\n")
+    written = precompress_directory(str(tmp_path), minimum_size=500)
+    assert sorted(written) == [str(tmp_path / "data.csv.br"), str(tmp_path / "data.csv.gz")]
+    assert brotli.decompress((tmp_path / "data.csv.br").read_bytes()).decode() == BODY
+    assert gzip.decompress((tmp_path / "data.csv.gz").read_bytes()).decode() == BODY
+    assert precompress_file(str(tmp_path / "tiny.csv"), minimum_size=500) == []
+
+    client = TestClient(make_app(str(tmp_path)))
+    response = client.get("/static/data.csv", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text == BODY
+
+    response = client.get("/static/data.csv", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.text == BODY
+
+
+def test_etag_matches():
+    """Test If-None-Match parsing."""
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches('"abc-br"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"def"', '"abc"')
+    assert not etag_matches(None, '"abc"')
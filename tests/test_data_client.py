@@ -1,5 +1,6 @@
 import pytest
-from app.utils.data_client import fetch_climate_data
+from app.utils.data_client import fetch_climate_data, BigQueryClientProvider
+from app.utils.dataset_cache import DATASET_REFRESH_WORKERS
 from google.cloud import bigquery
 
 
@@ -16,7 +17,7 @@ def mock_climate_query_results(monkeypatch):
                 self.country = country
 
         class MockQueryJob:
-            def result(self):
+            def result(self, timeout=None):
                 return [
                     MockRow(2023, 15.5, "USA"),
                     MockRow(2022, 15.3, "USA"),
@@ -27,6 +28,11 @@ def mock_climate_query_results(monkeypatch):
     # Replace the BigQuery client's query method with the mock
     monkeypatch.setattr(bigquery.Client, "query", mock_query)
 
+    # Serve a client with anonymous credentials, so no credentials are looked up
+    from google.auth.credentials import AnonymousCredentials
+    client = bigquery.Client(project="test-project", credentials=AnonymousCredentials())
+    monkeypatch.setattr("app.utils.data_client.client_provider.get", lambda: client)
+
 
 def test_fetch_climate_data_with_mock(mock_climate_query_results):
     """
@@ -51,3 +57,122 @@ def test_fetch_climate_data_actual():
     Test fetch_climate_data function with actual BigQuery.
     """
     pass
+
+
+def test_client_provider_creates_one_client_lazily(monkeypatch):
+    """
+    Test that the provider defers client creation until first use and then reuses it.
+    """
+    created = []
+
+    class MockClient:
+        def close(self):
+            created.remove(self)
+
+    def mock_create_client(self):
+        client = MockClient()
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(BigQueryClientProvider, "_create_client", mock_create_client)
+    assert BigQueryClientProvider().pool_size == DATASET_REFRESH_WORKERS
+    provider = BigQueryClientProvider(pool_size=4)
+    assert created == []
+
+    assert provider.get() is provider.get()
+    assert len(created) == 1
+
+    provider.close()
+    assert created == []
+
+
+def test_client_provider_uses_application_default_credentials(monkeypatch):
+    """
+    Test that the provider works without GOOGLE_APPLICATION_CREDENTIALS and shares its credentials.
+    """
+    import google.auth
+    from google.auth.credentials import AnonymousCredentials
+    from app.utils import data_client
+
+    credentials = AnonymousCredentials()
+    monkeypatch.delenv("GOOGLE_APPLICATION_CREDENTIALS", raising=False)
+    monkeypatch.setattr(google.auth, "default", lambda scopes=None: (credentials, "adc-project"))
+    monkeypatch.setattr(data_client, "_bigquery_storage", lambda: object())
+    monkeypatch.setattr(BigQueryClientProvider, "_create_storage_client", lambda self, creds: creds)
+
+    provider = BigQueryClientProvider(pool_size=2)
+    try:
+        assert provider.get().project == "adc-project"
+        assert provider.get_storage_client() is credentials
+    finally:
+        provider._storage_client = None
+        provider.close()
+
+
+def test_fetch_columns_switches_to_storage_read_api(monkeypatch):
+    """
+    Test that large results are read from parallel Storage Read API streams as columns.
+    """
+    pa = pytest.importorskip("pyarrow")
+    pytest.importorskip("google.cloud.bigquery_storage")
+    from app.utils import data_client
+    from app.utils.dataset_cache import CountryTable
+
+    batches = {
+        "s1": pa.table({"country": ["USA", "USA"], "year": [2020, 2021], "average_temperature": [15.5, None]}),
+        "s2": pa.table({"country": ["JPN"], "year": [2021], "average_temperature": [16.1]}),
+    }
+
+    streams_read = []
+
+    class MockStream:
+        def __init__(self, name):
+            self.name = name
+
+    class MockStorageClient:
+        def create_read_session(self, parent, read_session, max_stream_count):
+            assert read_session.table == "projects/p/datasets/d/tables/t"
+            return type("Session", (), {"streams": [MockStream("s1"), MockStream("s2")]})()
+
+        def read_rows(self, name):
+            streams_read.append(name)
+            return type("Reader", (), {"to_arrow": lambda self, session: batches[name]})()
+
+    class MockRows:
+        def __init__(self, total_rows):
+            self.total_rows = total_rows
+
+        def to_arrow(self, create_bqstorage_client=False):
+            return pa.concat_tables(batches.values())
+
+    class MockQueryJob:
+        destination = bigquery.TableReference.from_string("p.d.t")
+
+        def __init__(self, total_rows):
+            self.total_rows = total_rows
+
+        def result(self, timeout=None):
+            return MockRows(self.total_rows)
+
+    class MockClient:
+        def __init__(self, total_rows):
+            self.total_rows = total_rows
+
+        def query(self, query, job_config=None):
+            return MockQueryJob(self.total_rows)
+
+    monkeypatch.setattr(data_client.client_provider, "get_storage_client", lambda: MockStorageClient())
+
+    # Above the threshold: two streams, read in parallel
+    columns = data_client.fetch_columns("SELECT large", client=MockClient(3), min_storage_rows=3)
+    assert sorted(columns["country"].tolist()) == ["JPN", "USA", "USA"]
+    assert sorted(streams_read) == ["s1", "s2"]
+
+    # Below the threshold: the REST download, still columnar
+    columns = data_client.fetch_columns("SELECT small", client=MockClient(3), min_storage_rows=10)
+    assert columns["year"].tolist() == [2020, 2021, 2021]
+    assert len(streams_read) == 2
+
+    table = CountryTable.from_columns(columns, "country", "year", "average_temperature")
+    assert table.country_codes() == ["JPN", "USA"]
+    assert table.slice("USA")[0].tolist() == [2020]
@@ -0,0 +1,144 @@
+import time
+import asyncio
+import pytest
+import numpy as np
+from app.utils.dataset_cache import CountryTable, DatasetCache
+
+ROWS = [
+    {"country": "USA", "year": 2021, "value": 11.0, "name": "United States"},
+    {"country": "JPN", "year": 2021, "value": 8.5, "name": "Japan"},
+    {"country": "USA", "year": 2020, "value": 10.5, "name": "United States"},
+    {"country": "JPN", "year": 2020, "value": None, "name": "Japan"},
+    {"country": "JPN", "year": 2019, "value": 7.9, "name": "Japan"},
+]
+
+
+def build_table():
+    return CountryTable.from_rows(ROWS, "country", "year", "value", "name")
+
+
+def test_country_table_slices_by_country():
+    """Test that each country maps to its own year-sorted slice."""
+    table = build_table()
+    assert table.country_codes() == ["JPN", "USA"]
+    years, values = table.slice("JPN")
+    assert years.tolist() == [2019, 2021]
+    assert values.tolist() == [7.9, 8.5]
+    assert table.labels["USA"] == "United States"
+    assert len(table.slice("XYZ")[0]) == 0
+
+
+def test_country_table_select_filters():
+    """Test filtering the table by year and country."""
+    table = build_table()
+    countries, years, values = table.select(year=2021)
+    assert countries.tolist() == ["JPN", "USA"]
+    assert values.tolist() == [8.5, 11.0]
+    countries, years, values = table.select(country="USA", year=2020)
+    assert years.tolist() == [2020]
+
+
+def test_country_table_select_page_keyset():
+    """Test year ranges and keyset pages in newest-first order."""
+    table = build_table()
+    countries, years, values = table.select(country="JPN", start_year=2020, end_year=2021)
+    assert years.tolist() == [2021]
+    countries, years, values = table.select(start_year=2020)
+    assert sorted(years.tolist()) == [2020, 2021, 2021]
+
+    countries, years, values, has_more = table.select_page(limit=2)
+    assert list(zip(years.tolist(), countries.tolist())) == [(2021, "JPN"), (2021, "USA")]
+    assert has_more
+    countries, years, values, has_more = table.select_page(after=(2021, "USA"), limit=2)
+    assert list(zip(years.tolist(), countries.tolist())) == [(2020, "USA"), (2019, "JPN")]
+    assert not has_more
+
+
+def test_country_table_pages_walk_every_row_once():
+    """Test that following the cursor through the index visits each matching row once, in order."""
+    rng = np.random.default_rng(0)
+    codes = np.repeat([f"C{i:02d}" for i in range(12)], 30)
+    years = np.tile(np.arange(1990, 2020), 12)
+    keep = rng.random(len(years)) < 0.7
+    table = CountryTable(codes[keep], years[keep], rng.random(keep.sum()))
+
+    for filters in ({}, {"start_year": 1995, "end_year": 2004}, {"year": 2000}, {"year": 2000, "end_year": 1999}):
+        expected_countries, expected_years, _ = table.select(**filters)
+        expected = sorted(zip((-expected_years).tolist(), expected_countries.tolist()))
+        seen, after, has_more = [], None, True
+        while has_more:
+            countries, years, values, has_more = table.select_page(after=after, limit=7, **filters)
+            seen.extend(zip((-years).tolist(), countries.tolist()))
+            if len(years):
+                after = (int(years[-1]), str(countries[-1]))
+        assert seen == expected
+
+
+def test_dataset_cache_loads_once_until_invalidated():
+    """Test that the loader only runs on a miss, an expired TTL, or invalidation."""
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return build_table()
+
+    cache = DatasetCache(loaders={"energy": loader}, ttl=3600)
+    cache.get("energy")
+    cache.get("energy")
+    assert len(calls) == 1
+
+    cache.invalidate("energy")
+    cache.get("energy")
+    assert len(calls) == 2
+
+    expired = DatasetCache(loaders={"energy": loader}, ttl=0)
+    expired.get("energy")
+    expired.get("energy")
+    assert len(calls) == 4
+
+
+def test_dataset_cache_refresh_does_not_block_event_loop():
+    """Test that concurrent readers share one refresh while the event loop keeps running."""
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.3)
+        return build_table()
+
+    cache = DatasetCache(loaders={"energy": slow_loader})
+
+    async def run():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        tables = await asyncio.gather(*[cache.aget("energy") for _ in range(10)])
+        beat.cancel()
+        return ticks, tables
+
+    ticks, tables = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(table is tables[0] for table in tables)
+    assert ticks > 10
+
+
+def test_dataset_cache_aget_timeout():
+    """Test that a reader gives up after its timeout without cancelling the refresh."""
+    def slow_loader():
+        time.sleep(0.3)
+        return build_table()
+
+    cache = DatasetCache(loaders={"energy": slow_loader})
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await cache.aget("energy", timeout=0.05)
+        return await cache.aget("energy")
+
+    assert len(asyncio.run(run())) == 4
@@ -62,15 +62,72 @@ def test_forecast_renewable_energy():
 # Test no results scenario with monkeypatch
 def test_climate_data_no_results(monkeypatch):
     """Test /energy/climate-data when no data is found."""
-    class MockResult:
-        total_rows = 0  # Mock the total_rows attribute to simulate no results
+    from app.utils.dataset_cache import CountryTable
 
-    def mock_fetch_data(query):
-        return MockResult()  # Return the mocked result
+    def mock_peek(name):
+        return CountryTable([], [], [])  # Return an empty table
 
-    monkeypatch.setattr("app.routers.energy.fetch_data_from_bigquery", mock_fetch_data)
+    monkeypatch.setattr("app.routers.energy.dataset_cache.peek", mock_peek)
 
     response = client.get("/energy/climate-data")
     assert response.status_code == 200
     assert response.json() == {"status": "success", "data": []}
 
+
+
+def test_renewable_energy_range_pagination_and_fields(monkeypatch):
+    """Test start_year/end_year, cursor pages and field projection on cached data."""
+    from app.utils.dataset_cache import CountryTable
+
+    table = CountryTable(["JPN"] * 4, [2018, 2019, 2020, 2021], [7.0, 7.5, 8.0, 8.5], {"JPN": "Japan"})
+    monkeypatch.setattr("app.routers.energy.dataset_cache.peek", lambda name: table)
+
+    response = client.get("/energy/renewable-energy/JPN?start_year=2019&limit=2&fields=Year,Consumption")
+    assert response.status_code == 200
+    page = response.json()
+    assert page["data"] == [{"Year": 2021, "Consumption": 8.5}, {"Year": 2020, "Consumption": 8.0}]
+
+    response = client.get(f"/energy/renewable-energy/JPN?start_year=2019&limit=2&cursor={page['next_cursor']}")
+    page = response.json()
+    assert page["data"] == [{"Year": 2019, "Country": "Japan", "Consumption": 7.5}]
+    assert "next_cursor" not in page
+
+    assert client.get("/energy/renewable-energy/JPN?fields=Population").status_code == 400
+    assert client.get("/energy/renewable-energy/JPN?cursor=not-a-cursor").status_code == 400
+
+
+def test_climate_data_columnar_shape(monkeypatch):
+    """Test the columnar response shape."""
+    from app.utils.dataset_cache import CountryTable
+
+    table = CountryTable(["USA", "USA", "JPN"], [2020, 2021, 2021], [15.5, 15.7, 16.1])
+    monkeypatch.setattr("app.routers.energy.dataset_cache.peek", lambda name: table)
+
+    response = client.get("/energy/climate-data?shape=columns")
+    assert response.status_code == 200
+    assert response.json()["data"] == {
+        "year": [2021, 2021, 2020],
+        "temp": [16.1, 15.7, 15.5],
+        "country": ["JPN", "USA", "USA"],
+    }
+    assert client.get("/energy/climate-data?shape=table").status_code == 400
+
+
+def test_climate_data_parquet(monkeypatch):
+    """Test the Parquet format selected through the Accept header."""
+    import io
+    import pyarrow.parquet as pq
+    from app.utils.dataset_cache import CountryTable
+
+    table = CountryTable(["USA", "USA", "JPN"], [2020, 2021, 2021], [15.5, 15.7, 16.1])
+    monkeypatch.setattr("app.routers.energy.dataset_cache.peek", lambda name: table)
+
+    response = client.get(
+        "/energy/climate-data?limit=2&fields=year,country",
+        headers={"Accept": "application/vnd.apache.parquet"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.parquet"
+    assert "x-next-cursor" in response.headers
+    data = pq.read_table(io.BytesIO(response.content)).to_pydict()
+    assert data == {"year": [2021, 2021], "country": ["JPN", "USA"]}
@@ -0,0 +1,66 @@
+from fastapi.testclient import TestClient
+from app.api_server import app
+from app.utils.dataset_cache import CountryTable, DatasetCache
+from app.utils.http_cache import CacheValidators
+
+client = TestClient(app)
+
+
+class MockRequest:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def test_cache_validators_conditional_headers():
+    """Test If-None-Match and If-Modified-Since handling."""
+    validators = CacheValidators('"v1"', last_modified=1_700_000_000, cache_control="public, max-age=60")
+    assert validators.headers["Last-Modified"] == "Tue, 14 Nov 2023 22:13:20 GMT"
+    assert validators.is_not_modified(MockRequest({"if-none-match": '"v1"'}))
+    assert not validators.is_not_modified(MockRequest({"if-none-match": '"v0"'}))
+    assert validators.is_not_modified(MockRequest({"if-modified-since": "Tue, 14 Nov 2023 22:13:20 GMT"}))
+    assert not validators.is_not_modified(MockRequest({"if-modified-since": "Mon, 13 Nov 2023 00:00:00 GMT"}))
+    # If-None-Match wins over If-Modified-Since
+    assert not validators.is_not_modified(MockRequest({
+        "if-none-match": '"v0"', "if-modified-since": "Tue, 14 Nov 2023 22:13:20 GMT",
+    }))
+
+
+def test_dataset_cache_keeps_last_modified_for_identical_reloads():
+    """Test that the table version only changes with its contents."""
+    values = [[1.0, 2.0]]
+    cache = DatasetCache(loaders={"t": lambda: CountryTable(["JPN", "JPN"], [2020, 2021], values[0])})
+    first = cache.get("t")
+    modified = cache.last_modified("t")
+    cache.refresh("t")
+    assert cache.get("t").version == first.version
+    assert cache.last_modified("t") == modified
+
+    values[0] = [1.0, 3.0]
+    cache.refresh("t")
+    assert cache.get("t").version != first.version
+
+
+def test_chart_not_modified_skips_rendering(monkeypatch, tmp_path):
+    """Test that a matching If-None-Match is answered before any chart work."""
+    table = CountryTable(["JPN", "JPN"], [2020, 2021], [10.0, 11.0])
+    monkeypatch.setattr("app.routers.energy.dataset_cache.peek", lambda name: table)
+    monkeypatch.setattr("app.routers.energy.GRAPH_FOLDER", str(tmp_path))
+
+    response = client.get("/energy/graph/line/renewable-energy/JPN")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=3600"
+    etag = response.headers["etag"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("chart should not be fingerprinted or rendered")
+
+    monkeypatch.setattr("app.routers.energy.line_chart_spec", fail)
+    response = client.get("/energy/graph/line/renewable-energy/JPN", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    # A different representation of the same data has its own tag
+    response = client.get("/energy/renewable-energy/JPN", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.headers["vary"] == "Accept, Accept-Encoding"
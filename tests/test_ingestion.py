@@ -0,0 +1,101 @@
+import json
+from unittest.mock import MagicMock
+import pyarrow.parquet as pq
+from app.utils.backends import LocalBackend
+from app.utils.ingestion import ingest, ingest_incremental, iter_long_chunks
+
+RAW_LINES = [
+    '"Data Source","World Development Indicators",',
+    "",
+    '"Last Updated Date","2024-06-28",',
+    "",
+    '"Country Name","Country Code","Indicator Name","Indicator Code","2000","2001","2002",',
+    '"Japan","JPN","Renewable energy consumption","EG.FEC.RNEW.ZS","3.5","4.0","",',
+    '"Japan","JPN","Access to electricity","EG.ELC.ACCS.ZS","100","100","100",',
+    '"Aruba","ABW","Renewable energy consumption","EG.FEC.RNEW.ZS","","","",',
+    '"United States","USA","Renewable energy consumption","EG.FEC.RNEW.ZS","5.0","5.5","6.0",',
+]
+
+
+def write_raw(tmp_path, lines=RAW_LINES):
+    path = tmp_path / "raw.csv"
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_iter_long_chunks_reshapes_with_dtypes(tmp_path):
+    """Test that chunks are long, typed, filtered by indicator and free of missing values."""
+    chunks = list(iter_long_chunks(write_raw(tmp_path), chunk_rows=2))
+    assert len(chunks) == 2
+    data = chunks[0]
+    assert data["Country Code"].dtype == "category"
+    assert str(data["Year"].dtype) == "int16"
+    assert str(data["Renewable_Energy_Consumption"].dtype) == "float32"
+    assert data["Year"].tolist() == [2000, 2001]
+    assert chunks[1]["Renewable_Energy_Consumption"].tolist() == [5.0, 5.5, 6.0]
+
+
+def test_ingest_writes_parquet_readable_by_local_backend(tmp_path):
+    """Test the Parquet output end to end through the local backend."""
+    output = tmp_path / "cleaned_energy_data_long.parquet"
+    rows = ingest(write_raw(tmp_path), str(output), chunk_rows=1)
+    assert rows == 5
+    metadata = pq.ParquetFile(output).metadata
+    assert metadata.num_rows == 5
+    assert metadata.row_group(0).column(0).compression == "ZSTD"
+
+    table = LocalBackend(data_dir=str(tmp_path)).load_renewable_energy()
+    assert table.country_codes() == ["JPN", "USA"]
+    assert table.slice("USA")[0].tolist() == [2000, 2001, 2002]
+
+
+def test_ingest_incremental_merges_only_changes(tmp_path):
+    """Test that re-runs load nothing and edits produce a delta limited to the changed rows."""
+    client = MagicMock()
+    paths = {
+        "output_file": str(tmp_path / "long.parquet"),
+        "manifest_file": str(tmp_path / "manifest.parquet"),
+        "delta_file": str(tmp_path / "delta.parquet"),
+        "changes_file": str(tmp_path / "changes.json"),
+    }
+
+    first = ingest_incremental(write_raw(tmp_path), client=client, **paths)
+    assert (first.upserted, first.deleted, first.countries) == (5, 0, ["JPN", "USA"])
+    assert "MERGE" in client.query.call_args[0][0]
+
+    client.reset_mock()
+    again = ingest_incremental(write_raw(tmp_path), client=client, **paths)
+    assert again.is_empty
+    client.query.assert_not_called()
+
+    # USA 2001 changes and JPN 2001 disappears
+    edited = [line.replace('"5.5"', '"5.7"').replace('"3.5","4.0"', '"3.5",""') for line in RAW_LINES]
+    changes = ingest_incremental(write_raw(tmp_path, edited), client=client, **paths)
+    assert (changes.upserted, changes.deleted, changes.countries) == (1, 1, ["JPN", "USA"])
+
+    delta = pq.read_table(paths["delta_file"]).to_pandas()
+    assert delta[["Country Code", "Year", "_deleted"]].values.tolist() == [["USA", 2001, False], ["JPN", 2001, True]]
+    with open(paths["changes_file"]) as f:
+        assert json.load(f)["countries"] == ["JPN", "USA"]
+    assert (first.sequence, again.sequence, changes.sequence) == (1, 2, 3)
+
+
+def test_ingest_incremental_dry_run_writes_nothing(tmp_path):
+    """Test that a dry run reports the change set but leaves every file as it was."""
+    client = MagicMock()
+    paths = {
+        "output_file": str(tmp_path / "long.parquet"),
+        "manifest_file": str(tmp_path / "manifest.parquet"),
+        "delta_file": str(tmp_path / "delta.parquet"),
+        "changes_file": str(tmp_path / "changes.json"),
+    }
+    ingest_incremental(write_raw(tmp_path), client=client, **paths)
+    before = {name: open(path, "rb").read() for name, path in paths.items()}
+
+    edited = [line.replace('"5.5"', '"5.7"') for line in RAW_LINES]
+    client.reset_mock()
+    changes = ingest_incremental(write_raw(tmp_path, edited), client=client, dry_run=True, **paths)
+    assert (changes.upserted, changes.countries) == (1, ["USA"])
+    client.query.assert_not_called()
+    assert {name: open(path, "rb").read() for name, path in paths.items()} == before
+    assert not [path.name for path in tmp_path.iterdir() if path.name.endswith(".tmp")]
@@ -0,0 +1,26 @@
+import json
+import numpy as np
+from app.utils import json_utils
+from app.utils.json_utils import dumps, shape_data
+
+
+COLUMNS = {
+    "year": np.array([2021, 2020])[::-1],
+    "temp": np.array([15.5, 15.7]),
+    "country": np.array(["USA", "JPN"]),
+}
+
+
+def test_shape_data_rows_and_columns():
+    """Test both response shapes, including a non-contiguous numeric column."""
+    rows = json.loads(dumps(shape_data(COLUMNS, ["year", "country"])))
+    assert rows == [{"year": 2020, "country": "USA"}, {"year": 2021, "country": "JPN"}]
+    columns = json.loads(dumps(shape_data(COLUMNS, ["year", "temp"], "columns")))
+    assert columns == {"year": [2020, 2021], "temp": [15.5, 15.7]}
+
+
+def test_dumps_without_orjson(monkeypatch):
+    """Test the stdlib fallback when orjson is not installed."""
+    monkeypatch.setattr(json_utils, "orjson", None)
+    content = {"data": shape_data(COLUMNS, ["year", "temp"], "columns"), "n": np.int64(2)}
+    assert json.loads(dumps(content)) == {"data": {"year": [2020, 2021], "temp": [15.5, 15.7]}, "n": 2}
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from app.api_server import app
+from app.utils.dataset_cache import CountryTable
+from app.utils.metrics import BACKGROUND_ROUTE, mark_worker_stopped, metrics_payload, stage
+from app.utils.single_flight import SingleFlight
+
+client = TestClient(app)
+
+ROUTE = "/energy/renewable-energy/{country_code}"
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_stage_outside_a_request_is_labelled_background():
+    """Test that stage timings and errors are recorded without a request."""
+    before = sample("api_stage_duration_seconds_count", route=BACKGROUND_ROUTE, stage="test_stage")
+    try:
+        with stage("test_stage"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+    assert sample("api_stage_duration_seconds_count", route=BACKGROUND_ROUTE, stage="test_stage") == before + 1
+    assert sample("api_stage_errors_total", route=BACKGROUND_ROUTE, stage="test_stage") >= 1
+
+
+def test_request_stages_and_cache_hits_by_route(monkeypatch):
+    """Test that a request's stages, cache lookups and status are labelled with its route."""
+    table = CountryTable(["JPN", "JPN"], [2020, 2021], [10.0, 11.0])
+    monkeypatch.setattr("app.routers.energy.dataset_cache.peek", lambda name: table)
+    requests = sample("api_requests_total", route=ROUTE, method="GET", status="200")
+    serialized = sample("api_stage_duration_seconds_count", route=ROUTE, stage="serialize")
+    http_hits = sample("api_cache_lookups_total", route=ROUTE, cache="http", result="hit")
+
+    response = client.get("/energy/renewable-energy/JPN")
+    assert response.status_code == 200
+    client.get("/energy/renewable-energy/JPN", headers={"If-None-Match": response.headers["etag"]})
+
+    assert sample("api_requests_total", route=ROUTE, method="GET", status="200") == requests + 1
+    assert sample("api_stage_duration_seconds_count", route=ROUTE, stage="serialize") == serialized + 1
+    assert sample("api_cache_lookups_total", route=ROUTE, cache="http", result="hit") == http_hits + 1
+
+
+def test_metrics_endpoint():
+    """Test the Prometheus exposition, including single-flight counters."""
+    SingleFlight("metrics_test").do("key", lambda: None)
+    client.get("/does-not-exist")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'api_requests_total{method="GET",route="unmatched",status="404"}' in response.text
+    assert 'single_flight_calls_total{group="metrics_test"} 1.0' in response.text
+
+
+def test_multiprocess_metrics_include_single_flight_counters(tmp_path, monkeypatch):
+    """Test that aggregated multi-worker metrics still report single-flight counters."""
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    SingleFlight("multiprocess_test").do("key", lambda: None)
+    content, _ = metrics_payload()
+    assert b'single_flight_calls_total{group="multiprocess_test"} 1.0' in content
+    mark_worker_stopped()
+
+
+def test_single_flight_work_keeps_the_leaders_context():
+    """Test that work submitted to an executor is attributed to the caller's request."""
+    import contextvars
+    var = contextvars.ContextVar("test_var", default=None)
+    var.set("leader")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = SingleFlight().submit("key", executor, var.get)
+        assert future.result() == "leader"
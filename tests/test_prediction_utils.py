@@ -0,0 +1,120 @@
+import pytest
+import numpy as np
+import pandas as pd
+from app.utils.dataset_cache import CountryTable
+from app.utils.prediction_utils import calculate_forecast, batch_forecast
+
+
+def test_batch_forecast_matches_single_country_regression():
+    """Test that the vectorized fit agrees with the per-country linear regression."""
+    table = CountryTable(
+        ["JPN"] * 5 + ["USA"] * 3 + ["ABW"],
+        [2017, 2018, 2019, 2020, 2021, 2019, 2020, 2021, 2021],
+        [7.0, 7.4, 8.1, 8.3, 9.0, 10.0, 10.5, 11.5, 3.0],
+    )
+    countries = ["JPN", "USA", "ABW", "XYZ"]
+    future_years, predictions = batch_forecast(*table.to_padded(countries), 4)
+
+    for row, code in enumerate(countries[:3]):
+        years, values = table.slice(code)
+        expected_years, expected = calculate_forecast(pd.DataFrame({"year": years, "consumption": values}), 4)
+        assert future_years[row].tolist() == expected_years.tolist()
+        np.testing.assert_allclose(predictions[row], expected)
+
+    # Countries without data produce no forecast
+    assert np.isnan(predictions[3]).all()
+
+
+def test_forecast_table_serves_every_horizon():
+    """Test that the precomputed table answers any horizon with the same values as a direct fit."""
+    from app.utils.forecast_table import ForecastTable, ForecastStore, MAX_FORECAST_YEARS
+
+    table = CountryTable(["JPN", "JPN", "JPN", "USA", "USA"], [2019, 2020, 2021, 2020, 2021], [7.0, 8.0, 9.5, 10.0, 11.0])
+    forecasts = ForecastTable.from_country_table(table)
+    assert forecasts.predictions.shape == (2, MAX_FORECAST_YEARS)
+
+    years, values = forecasts.lookup("JPN", 3)
+    expected_years, expected = batch_forecast(*table.to_padded(["JPN"]), 3)
+    assert years.tolist() == expected_years[0].tolist() == [2022, 2023, 2024]
+    np.testing.assert_allclose(values, expected[0])
+    assert forecasts.lookup("XYZ", 3) is None
+
+    # Horizons outside the table are rejected rather than answered with mismatched arrays
+    for years in (0, -1, MAX_FORECAST_YEARS + 1):
+        with pytest.raises(ValueError):
+            forecasts.lookup("JPN", years)
+        with pytest.raises(ValueError):
+            forecasts.lookup_many(["JPN"], years)
+
+    store = ForecastStore()
+    assert store.for_table(table) is store.for_table(table)
+
+
+def test_forecast_store_recomputes_only_changed_countries():
+    """Test that a rebuild after mark_changed keeps the forecasts of unchanged countries."""
+    from app.utils.forecast_table import ForecastStore
+
+    store = ForecastStore()
+    old = CountryTable(["JPN", "JPN", "USA", "USA"], [2020, 2021, 2020, 2021], [7.0, 8.0, 10.0, 11.0])
+    store.rebuild(old)
+
+    # USA changed; JPN's data changed too but was not marked, so its old forecast is kept
+    new = CountryTable(
+        ["JPN", "JPN", "USA", "USA", "ABW", "ABW"],
+        [2020, 2021, 2020, 2021, 2020, 2021],
+        [1.0, 1.0, 10.0, 13.0, 2.0, 4.0],
+    )
+    store.mark_changed(["USA"])
+    forecasts = store.rebuild(new)
+
+    assert forecasts.countries == ["ABW", "JPN", "USA"]
+    np.testing.assert_allclose(forecasts.lookup("JPN", 1)[1], [9.0])
+    np.testing.assert_allclose(forecasts.lookup("USA", 1)[1], [16.0])
+    np.testing.assert_allclose(forecasts.lookup("ABW", 1)[1], [6.0])
+
+
+def test_ingestion_change_set_limits_the_next_rebuild(tmp_path):
+    """Test that a change set read before a reload limits the rebuild, and a missed run forces a full one."""
+    from app.utils.change_set import ChangeSet, write_change_set
+    from app.utils.dataset_cache import DatasetCache
+    from app.utils.forecast_table import ForecastStore
+
+    changes_file = str(tmp_path / "changes.json")
+    store = ForecastStore(changes_file=changes_file)
+    tables = [
+        CountryTable(["JPN", "JPN", "USA", "USA"], [2020, 2021, 2020, 2021], [7.0, 8.0, 10.0, 11.0]),
+        CountryTable(["JPN", "JPN", "USA", "USA"], [2020, 2021, 2020, 2021], [1.0, 1.0, 10.0, 13.0]),
+        CountryTable(["JPN", "JPN", "USA", "USA"], [2020, 2021, 2020, 2021], [1.0, 1.0, 10.0, 12.0]),
+    ]
+    cache = DatasetCache(loaders={"t": lambda: tables.pop(0)})
+    cache.add_load_hook("t", store.apply_change_set)
+    cache.add_refresh_listener("t", store.rebuild)
+
+    write_change_set(ChangeSet(countries=["JPN", "USA"], sequence=1), changes_file)
+    cache.get("t")
+
+    # Only USA is listed, so JPN keeps its old forecast
+    write_change_set(ChangeSet(upserted=1, countries=["USA"], sequence=2), changes_file)
+    cache.refresh("t")
+    np.testing.assert_allclose(store.for_table(cache.peek("t")).lookup("JPN", 1)[1], [9.0])
+    np.testing.assert_allclose(store.for_table(cache.peek("t")).lookup("USA", 1)[1], [16.0])
+
+    # Run 3 was missed, so everything is recomputed
+    write_change_set(ChangeSet(upserted=1, countries=["USA"], sequence=4), changes_file)
+    cache.refresh("t")
+    np.testing.assert_allclose(store.for_table(cache.peek("t")).lookup("JPN", 1)[1], [1.0])
+
+
+def test_forecast_store_keeps_current_forecasts_for_an_older_table():
+    """Test that a table loaded before the current one gets its own forecasts without replacing the stored ones."""
+    from app.utils.forecast_table import ForecastStore
+
+    store = ForecastStore()
+    old = CountryTable(["JPN", "JPN"], [2020, 2021], [7.0, 8.0])
+    new = CountryTable(["JPN", "JPN"], [2020, 2021], [1.0, 1.0])
+    old.loaded_at, new.loaded_at = 100.0, 200.0
+    current = store.rebuild(new)
+
+    np.testing.assert_allclose(store.for_table(old).lookup("JPN", 1)[1], [9.0])
+    assert store.for_table(new) is current
+    np.testing.assert_allclose(current.lookup("JPN", 1)[1], [1.0])
@@ -23,14 +23,20 @@ def test_forecast_invalid_country():
     assert response.status_code == 404  # Not Found
     assert response.json()["detail"] == "No data found for the given country."
 
-# Test: Years parameter exceeds limit
+# Test: Years parameter outside the allowed range
 def test_forecast_years_exceed_limit():
     """
-    Test forecast endpoint when 'years' parameter exceeds limit.
+    Test that every forecast endpoint rejects 'years' values outside 1..MAX_FORECAST_YEARS.
     """
-    response = client.get("/energy/forecast/renewable-energy?country=JPN&years=100")
-    assert response.status_code == 400  # Bad Request
-    assert response.json()["detail"] == "Years parameter exceeds allowed range."
+    for years in (100, 0, -1):
+        for url in (
+            f"/energy/forecast/renewable-energy?country=JPN&years={years}",
+            f"/energy/forecast/renewable-energy/batch?countries=JPN&years={years}",
+            f"/energy/export/forecast?country=JPN&years={years}&format=csv",
+        ):
+            response = client.get(url)
+            assert response.status_code == 422  # Unprocessable Entity
+            assert response.json()["detail"][0]["loc"] == ["query", "years"]
 
 # Test: Valid response with exact forecast
 def test_forecast_valid():
@@ -73,3 +79,89 @@ def test_export_forecast_pdf():
     assert response.status_code == 200
     assert response.headers["content-type"] == "application/pdf"
     assert "attachment; filename=\"JPN_forecast.pdf\"" in response.headers["content-disposition"]
+
+
+def test_forecast_batch(monkeypatch):
+    """
+    Test forecasting several countries in one request.
+    """
+    from app.utils.dataset_cache import CountryTable
+
+    table = CountryTable(["JPN", "JPN", "USA", "USA"], [2020, 2021, 2020, 2021], [10.0, 11.0, 12.0, 12.5])
+    monkeypatch.setattr("app.routers.predictions.dataset_cache.peek", lambda name: table)
+
+    response = client.get("/energy/forecast/renewable-energy/batch?countries=JPN,XYZ&countries=USA&years=2")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["data"]["JPN"] == [
+        {"year": 2022, "predicted_consumption": 12.0},
+        {"year": 2023, "predicted_consumption": 13.0},
+    ]
+    assert data["data"]["USA"][0] == {"year": 2022, "predicted_consumption": 13.0}
+    assert data["missing"] == ["XYZ"]
+
+    response = client.get("/energy/forecast/renewable-energy/batch?countries=all&years=1")
+    assert sorted(response.json()["data"]) == ["JPN", "USA"]
+
+
+def test_forecast_batch_arrow(monkeypatch):
+    """
+    Test the Arrow IPC stream format of the batch forecast.
+    """
+    import pyarrow as pa
+    from app.utils.dataset_cache import CountryTable
+
+    table = CountryTable(["JPN", "JPN", "USA", "USA"], [2020, 2021, 2020, 2021], [10.0, 11.0, 12.0, 12.5])
+    monkeypatch.setattr("app.routers.predictions.dataset_cache.peek", lambda name: table)
+
+    response = client.get(
+        "/energy/forecast/renewable-energy/batch?countries=JPN,USA,XYZ&years=2",
+        headers={"Accept": "application/vnd.apache.arrow.stream"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    assert response.headers["x-missing-countries"] == "XYZ"
+    forecast = pa.ipc.open_stream(response.content).read_all().to_pydict()
+    assert forecast["country"] == ["JPN", "JPN", "USA", "USA"]
+    assert forecast["year"] == [2022, 2023, 2022, 2023]
+    assert forecast["predicted_consumption"][:2] == [12.0, 13.0]
+
+
+def test_export_forecast_uses_precomputed_forecast(monkeypatch):
+    """
+    Test that the export serves the real forecast for the requested horizon.
+    """
+    from app.utils.dataset_cache import CountryTable
+
+    table = CountryTable(["JPN", "JPN"], [2020, 2021], [10.0, 11.0])
+    monkeypatch.setattr("app.routers.predictions.dataset_cache.peek", lambda name: table)
+
+    response = client.get("/energy/export/forecast?country=JPN&years=3&format=csv")
+    assert response.status_code == 200
+    assert response.text.splitlines() == ["year,predicted_consumption", "2022,12.0", "2023,13.0", "2024,14.0"]
+
+    response = client.get("/energy/export/forecast?country=XYZ&years=3&format=csv")
+    assert response.status_code == 404
+
+
+def test_export_forecast_documents_are_built_in_memory(monkeypatch, tmp_path):
+    """
+    Test that Excel and PDF exports are returned without writing to the export folder.
+    """
+    from app.utils.dataset_cache import CountryTable
+
+    table = CountryTable(["JPN", "JPN"], [2020, 2021], [10.0, 11.0])
+    monkeypatch.setattr("app.routers.predictions.dataset_cache.peek", lambda name: table)
+    monkeypatch.chdir(tmp_path)
+
+    response = client.get("/energy/export/forecast?country=JPN&years=3&format=excel")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    assert 'filename="JPN_forecast.xlsx"' in response.headers["content-disposition"]
+    assert response.content.startswith(b"PK")
+
+    response = client.get("/energy/export/forecast?country=JPN&years=3&format=pdf")
+    assert response.status_code == 200
+    assert 'filename="JPN_forecast.pdf"' in response.headers["content-disposition"]
+    assert response.content.startswith(b"%PDF")
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,31 @@
+import pytest
+from app.utils.queries import build_query
+
+
+def test_query_text_is_stable_across_values():
+    """Test that user input is bound as parameters instead of changing the SQL text."""
+    jpn_sql, _ = build_query("climate", country="JPN")
+    injected_sql, injected_config = build_query("climate", country="'; DROP TABLE x; --")
+    assert jpn_sql == injected_sql
+    assert "country = @country" in jpn_sql
+    assert "JPN" not in jpn_sql
+    assert {p.name: p.value for p in injected_config.query_parameters}["country"] == "'; DROP TABLE x; --"
+
+
+def test_optional_parameters_are_bound_as_null():
+    """Test that unused filters keep the same text and bind NULL."""
+    sql, config = build_query("climate")
+    filtered_sql, filtered_config = build_query("climate", year=2020, country="USA")
+    assert sql == filtered_sql
+    assert {p.name: p.value for p in config.query_parameters} == {"year": None, "country": None}
+    assert {p.name: p.value for p in filtered_config.query_parameters} == {"year": 2020, "country": "USA"}
+
+
+def test_column_projection():
+    """Test selecting a subset of columns and rejecting unknown ones."""
+    sql, _ = build_query("renewable_energy", ["Year", "Renewable_Energy_Consumption"])
+    assert "SELECT `Year`, `Renewable_Energy_Consumption`" in sql
+    with pytest.raises(ValueError):
+        build_query("renewable_energy", ["Year; DROP TABLE x"])
+    with pytest.raises(ValueError):
+        build_query("renewable_energy", country="JPN")
@@ -0,0 +1,42 @@
+import gzip
+import json
+from fastapi.testclient import TestClient
+from app.api_server import app
+from app.utils.dataset_cache import CountryTable
+from app.utils.report_utils import iter_csv, iter_ndjson, iter_gzip
+
+client = TestClient(app)
+
+ROWS = [{"year": 2020 + i, "consumption": float(i)} for i in range(5)]
+
+
+def test_iter_csv_chunks_rows():
+    """Test that CSV output is produced in bounded chunks."""
+    chunks = list(iter_csv(iter(ROWS), ["year", "consumption"], chunk_rows=2))
+    assert len(chunks) == 3
+    assert b"".join(chunks).decode().splitlines() == ["year,consumption"] + [f"{r['year']},{r['consumption']}" for r in ROWS]
+
+
+def test_iter_ndjson_and_gzip_round_trip():
+    """Test that gzip-compressed NDJSON decodes back to the original rows."""
+    data = gzip.decompress(b"".join(iter_gzip(iter_ndjson(iter(ROWS), chunk_rows=2))))
+    assert [json.loads(line) for line in data.decode().splitlines()] == ROWS
+
+
+def test_export_renewable_energy_streams_from_cache(monkeypatch):
+    """Test streaming the cached renewable energy table as gzip-compressed NDJSON."""
+    table = CountryTable(["JPN", "USA", "JPN"], [2021, 2021, 2020], [11.0, 12.0, 10.0], {"JPN": "Japan", "USA": "United States"})
+    monkeypatch.setattr("app.routers.energy.dataset_cache.peek", lambda name: table)
+
+    response = client.get("/energy/export/renewable-energy?country=JPN&format=ndjson&compress=gzip")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert 'filename="JPN_renewable_energy.ndjson.gz"' in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in gzip.decompress(response.content).decode().splitlines()]
+    assert rows == [
+        {"country": "JPN", "country_name": "Japan", "year": 2020, "consumption": 10.0},
+        {"country": "JPN", "country_name": "Japan", "year": 2021, "consumption": 11.0},
+    ]
+
+    response = client.get("/energy/export/renewable-energy?format=xml")
+    assert response.status_code == 400
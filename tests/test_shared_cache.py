@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+import numpy as np
+from app import serve
+from app.utils.dataset_cache import CountryTable, DatasetCache
+from app.utils.shared_cache import FileSharedCache
+
+ROWS = [
+    {"country": "USA", "year": 2020, "value": 10.5, "name": "United States"},
+    {"country": "JPN", "year": 2021, "value": 8.5, "name": "Japan"},
+    {"country": "JPN", "year": 2020, "value": None, "name": "Japan"},
+]
+
+
+def test_file_shared_cache_get_set_delete(tmp_path):
+    """Test that values round-trip, expire after their TTL and can be deleted."""
+    cache = FileSharedCache(str(tmp_path / "shared"))
+    assert cache.get("a") is None
+    cache.set("a", b"value")
+    cache.set("b", b"short-lived", ttl=0.05)
+    assert cache.get("a") == b"value"
+    assert cache.get("b") == b"short-lived"
+    time.sleep(0.1)
+    assert cache.get("b") is None
+    cache.delete("a")
+    cache.delete("missing")
+    assert cache.get("a") is None
+
+
+def test_file_shared_cache_lock_is_exclusive(tmp_path):
+    """Test that only one holder at a time enters the locked section."""
+    cache = FileSharedCache(str(tmp_path))
+    inside, overlaps = [], []
+
+    def work():
+        with cache.lock("table"):
+            inside.append(1)
+            overlaps.append(len(inside))
+            time.sleep(0.02)
+            inside.pop()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps == [1, 1, 1, 1]
+
+
+def test_country_table_bytes_round_trip():
+    """Test that a table survives serialization for the shared cache."""
+    table = CountryTable.from_rows(ROWS, "country", "year", "value", "name")
+    restored = CountryTable.from_bytes(table.to_bytes())
+    assert restored.version == table.version
+    assert restored.country_codes() == ["JPN", "USA"]
+    np.testing.assert_array_equal(restored.slice("JPN")[0], table.slice("JPN")[0])
+    assert restored.labels["USA"] == "United States"
+
+
+def test_dataset_caches_share_one_load(tmp_path):
+    """Test that two workers sharing a cache query the backend once and agree on Last-Modified."""
+    shared = FileSharedCache(str(tmp_path))
+    calls = []
+
+    def load():
+        calls.append(1)
+        return CountryTable.from_rows(ROWS, "country", "year", "value", "name")
+
+    first = DatasetCache(loaders={"t": load}, shared=shared)
+    second = DatasetCache(loaders={"t": load}, shared=shared)
+    assert first.get("t").version == second.get("t").version
+    assert len(calls) == 1
+    assert first.last_modified("t") == second.last_modified("t")
+
+    first.invalidate("t")
+    second.invalidate()
+    second.get("t")
+    assert len(calls) == 2
+
+
+def test_available_cpus_and_worker_settings(monkeypatch):
+    """Test that CPU detection returns a usable count and several workers share their caches."""
+    assert serve.available_cpus() >= 1
+    for name in ("SHARED_CACHE_BACKEND", "DATASET_SNAPSHOTS", "CHART_RENDER_WORKERS", "PROMETHEUS_MULTIPROC_DIR"):
+        monkeypatch.delenv(name, raising=False)
+    assert serve.configure_workers(1, 8) is None
+    assert "SHARED_CACHE_BACKEND" not in os.environ
+    metrics_dir = serve.configure_workers(4, 8)
+    assert os.environ["SHARED_CACHE_BACKEND"] == "file"
+    assert os.environ["DATASET_SNAPSHOTS"] == "true"
+    assert os.environ["CHART_RENDER_WORKERS"] == "2"
+    assert os.environ["PROMETHEUS_MULTIPROC_DIR"] == metrics_dir
+    assert os.path.isdir(metrics_dir)
+    os.rmdir(metrics_dir)
+
+    # An explicit directory belongs to whoever set it and is never returned for removal
+    assert serve.configure_workers(4, 8) is None
@@ -0,0 +1,77 @@
+import time
+import asyncio
+import threading
+from io import BytesIO
+from app.utils.chart_cache import ChartCache
+from app.utils.single_flight import SingleFlight, single_flight_stats
+
+
+def test_do_coalesces_concurrent_threads():
+    """Test that threads asking for the same key share one execution."""
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return "value"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", work))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 5, "executions": 1, "coalesced": 4, "in_flight": 0}
+
+    # Once finished, the key runs again
+    flight.do("key", work)
+    assert len(calls) == 2
+
+
+def test_run_shares_errors_and_survives_cancelled_callers():
+    """Test that waiters see the leader's error and a cancelled caller does not cancel the work."""
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.05)
+        raise ValueError("boom")
+
+    async def slow():
+        await asyncio.sleep(0.1)
+        return 42
+
+    async def run():
+        outcomes = await asyncio.gather(flight.run("a", fail), flight.run("a", fail), return_exceptions=True)
+        assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+
+        leader = asyncio.ensure_future(flight.run("b", slow))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(flight.run("b", slow))
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(run()) == 42
+
+
+def test_chart_cache_renders_identical_concurrent_requests_once(tmp_path):
+    """Test that concurrent misses for one chart trigger a single render."""
+    renders = []
+    cache = ChartCache(folder=str(tmp_path), flight=SingleFlight("test_chart_render"))
+
+    async def render():
+        renders.append(1)
+        await asyncio.sleep(0.05)
+        return BytesIO(b"png")
+
+    async def run():
+        return await asyncio.gather(*[cache.get_or_render_async("key", render) for _ in range(4)])
+
+    results = asyncio.run(run())
+    assert len(renders) == 1
+    assert [data for data, _ in results] == [b"png"] * 4
+    assert sum(rendered for _, rendered in results) == 1
+    assert single_flight_stats()["test_chart_render"]["coalesced"] == 3
@@ -0,0 +1,93 @@
+import os
+import numpy as np
+import pytest
+from app.utils.dataset_cache import CountryTable, DatasetCache
+from app.utils.snapshot import ALIGNMENT, SnapshotStore, read_snapshot, write_snapshot
+
+ROWS = [
+    {"country": "USA", "year": 2021, "value": 11.0, "name": "United States"},
+    {"country": "JPN", "year": 2021, "value": 8.5, "name": "Japan"},
+    {"country": "USA", "year": 2020, "value": 10.5, "name": "United States"},
+    {"country": "JPN", "year": 2019, "value": 7.9, "name": "Japan"},
+]
+
+
+def build_table(rows=ROWS):
+    return CountryTable.from_rows(rows, "country", "year", "value", "name")
+
+
+def test_snapshot_round_trip_is_mapped_and_aligned(tmp_path):
+    """Test that arrays come back as aligned, read-only views of the file."""
+    path = str(tmp_path / "table.snap")
+    write_snapshot(path, {"years": np.arange(5), "codes": np.array(["A", "BC"])}, {"version": "v1"})
+    snapshot = read_snapshot(path)
+    assert snapshot.meta == {"version": "v1"}
+    np.testing.assert_array_equal(snapshot.arrays["years"], np.arange(5))
+    assert snapshot.arrays["codes"].tolist() == ["A", "BC"]
+    for array in snapshot.arrays.values():
+        assert not array.flags.writeable
+        assert array.__array_interface__["data"][0] % ALIGNMENT == 0
+
+    with open(path, "r+b") as f:
+        f.write(b"NOTASNAP")
+    with pytest.raises(ValueError):
+        read_snapshot(path)
+
+
+def test_country_table_from_snapshot(tmp_path):
+    """Test that a mapped table answers queries like the table it was written from."""
+    store = SnapshotStore(str(tmp_path))
+    table = build_table()
+    store.publish("t", table.version, table.snapshot_arrays(), table.snapshot_meta(1.0, 2.0))
+    mapped = CountryTable.from_snapshot(store.open("t"))
+    assert mapped.version == table.version
+    assert mapped.source == store.current("t")
+    assert mapped.country_codes() == ["JPN", "USA"]
+    assert mapped.labels["JPN"] == "Japan"
+    for key in ("JPN", "USA"):
+        np.testing.assert_array_equal(mapped.slice(key)[1], table.slice(key)[1])
+    np.testing.assert_array_equal(mapped.select(start_year=2020)[2], table.select(start_year=2020)[2])
+
+
+def test_publish_swaps_pointer_and_prunes_old_versions(tmp_path):
+    """Test that publishing switches readers to the new version and keeps only the newest files."""
+    store = SnapshotStore(str(tmp_path), keep=2, check_interval=0)
+    paths = []
+    for version in ("a", "b", "c"):
+        paths.append(store.publish("t", version, {"values": np.zeros(1)}, {"version": version}))
+        assert store.current("t") == paths[-1]
+    assert not os.path.exists(paths[0])
+    assert os.path.exists(paths[1])
+    assert store.changed("t", paths[1])
+    assert not store.changed("t", paths[2])
+    store.withdraw("t")
+    assert store.open("t") is None
+
+
+def test_dataset_caches_share_snapshots(tmp_path):
+    """Test that one worker's load is mapped by the others and new versions are picked up."""
+    calls = []
+
+    def load():
+        calls.append(1)
+        return build_table(ROWS[: len(ROWS) - len(calls) + 1])
+
+    first = DatasetCache(loaders={"t": load}, snapshots=SnapshotStore(str(tmp_path), check_interval=0))
+    second = DatasetCache(loaders={"t": load}, snapshots=SnapshotStore(str(tmp_path), check_interval=0))
+    table = first.get("t")
+    assert table.source is not None
+    assert second.get("t").version == table.version
+    assert second.get("t").source == table.source
+    assert len(calls) == 1
+    assert first.last_modified("t") == second.last_modified("t")
+
+    second.refresh("t")
+    assert len(calls) == 2
+    assert first.peek("t") is None
+    assert first.get("t").version == second.get("t").version != table.version
+    assert len(calls) == 2
+
+    first.invalidate("t")
+    second.invalidate("t")
+    second.get("t")
+    assert len(calls) == 3
@@ -0,0 +1,55 @@
+import os
+import sys
+import json
+import asyncio
+import subprocess
+from app.utils import startup
+from app.utils.dataset_cache import CountryTable, DatasetCache
+
+# Seconds importing app.api_server may take in a fresh interpreter
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "2.5"))
+
+# Libraries that must only be imported on first use
+HEAVY_MODULES = ["pandas", "sklearn", "matplotlib", "fpdf", "google.cloud.bigquery", "pyarrow"]
+
+IMPORT_SCRIPT = f"""
+import sys, json, time
+started = time.perf_counter()
+import app.api_server
+print(json.dumps({{
+    "seconds": time.perf_counter() - started,
+    "loaded": [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+}}))
+"""
+
+
+def test_import_time_budget():
+    """Test that importing the app stays fast and leaves heavy libraries unloaded."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], cwd=root, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    assert result["loaded"] == []
+    assert result["seconds"] < IMPORT_TIME_BUDGET_SECONDS
+
+
+def test_ensure_folders(tmp_path, monkeypatch):
+    """Test that the output folders are created at startup rather than on import."""
+    monkeypatch.chdir(tmp_path)
+    startup.ensure_folders()
+    for folder in startup.OUTPUT_FOLDERS:
+        assert (tmp_path / folder).is_dir()
+
+
+def test_warm_up_loads_tables_and_tolerates_failures(monkeypatch):
+    """Test that warm-up loads every table and only logs failures."""
+    def broken():
+        raise RuntimeError("no credentials")
+
+    cache = DatasetCache(loaders={"ok": lambda: CountryTable(["JPN"], [2020], [1.0]), "broken": broken})
+    monkeypatch.setattr(startup, "dataset_cache", cache)
+    monkeypatch.setattr(startup, "WARMUP_MODULES", ["json", "no_such_module"])
+    asyncio.run(startup.warm_up())
+    assert cache.peek("ok") is not None
+    assert cache.peek("broken") is None